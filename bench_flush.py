@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the casino's flush of dirty games.
+
+Times writing N table snapshots the old way (one save_game() and commit
+per table) against the group commit the casino now does (one save_games()
+call: a single transaction with batched upserts), for 10, 100 and 1000
+tables. Each table is a hand in progress with four seats.
+
+SQLite runs on a temporary file, so commits pay for the journal like they
+do in production. Pass --mysql to run against the MySQL server configured
+by the same MYSQL_* environment variables as server.py.
+
+Usage:
+    python bench_flush.py [--tables 10 100 1000] [--repeat N] [--mysql]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from unittest.mock import MagicMock
+
+from cardgames.blackjack import Blackjack
+from cardgames.player import Player
+from cardgames.sqlite_database import SqliteDatabase
+
+
+def make_snapshots(n):
+    """n mid-hand tables' snapshots, as _snapshot_dirty_games() returns them."""
+    casino = MagicMock()
+    casino.get_wallet.return_value = 100000
+    snapshots = []
+    for i in range(n):
+        game = Blackjack(f"bench-{i:05d}", casino)
+        for seat in range(4):
+            player = Player(f"Player{i}-{seat}")
+            game.players.append(player)
+            game.bets[player.name] = 1000
+        game.new_hand()
+        snapshots.append((game.game_id, game.to_dict(), None))
+    return snapshots
+
+
+def open_db(use_mysql, path):
+    if not use_mysql:
+        return SqliteDatabase(path)
+    from cardgames.database import Database
+    return Database(
+        host=os.getenv("MYSQL_HOST", "localhost"),
+        port=os.getenv("MYSQL_PORT", 3306),
+        user=os.getenv("MYSQL_USER", "saloonbot"),
+        password=os.getenv("MYSQL_PASSWORD", ""),
+        database=os.getenv("MYSQL_DATABASE", "saloonbot"),
+    )
+
+
+def one_by_one(db, snapshots):
+    for game_id, game_data, _ in snapshots:
+        db.save_game(game_id, game_data)
+
+
+def grouped(db, snapshots):
+    db.save_games(snapshots)
+
+
+def best_of(repeat, fn, db, snapshots):
+    times = []
+    for _ in range(repeat):
+        # Every flush writes tables that changed since the last one
+        for _, game_data, _ in snapshots:
+            game_data['time_last_event'] += 1
+        start = time.perf_counter()
+        fn(db, snapshots)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is reported")
+    parser.add_argument("--mysql", action="store_true", help="benchmark MySQL instead of SQLite")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = open_db(args.mysql, os.path.join(tmp, "bench.db"))
+        try:
+            print(f"{'tables':>7}  {'one by one':>12}  {'group commit':>12}  {'speed-up':>8}")
+            for n in args.tables:
+                snapshots = make_snapshots(n)
+                grouped(db, snapshots)  # first writes insert; measure the steady-state upserts
+                old = best_of(args.repeat, one_by_one, db, snapshots)
+                new = best_of(args.repeat, grouped, db, snapshots)
+                print(f"{n:>7}  {old * 1000:>10.1f}ms  {new * 1000:>10.1f}ms  {old / new:>7.1f}x")
+                for game_id, _, _ in snapshots:
+                    db.delete_game(game_id)
+        finally:
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the stored form of a game's cards, seats and bets.
+
+Compares the legacy format (six JSON text columns of card strings) with
+the packed BLOB from cardgames/snapshot_codec.py: bytes per game, and the
+time to encode and decode one, for a table between hands (full deck) and
+tables mid-hand with 1 to 7 seats.
+
+Usage:
+    python bench_snapshot.py [--repeat N]
+"""
+
+import argparse
+import json
+import timeit
+from unittest.mock import MagicMock
+
+from cardgames.blackjack import Blackjack
+from cardgames.player import Player
+from cardgames.snapshot_codec import PACKED_FIELDS, pack_snapshot, unpack_snapshot
+
+
+def make_snapshot(seats):
+    """A table's to_dict() with `seats` players; mid-hand if any are seated."""
+    casino = MagicMock()
+    casino.get_wallet.return_value = 100000
+    game = Blackjack("bench", casino)
+    for seat in range(seats):
+        player = Player(f"Player{seat}")
+        game.players.append(player)
+        game.bets[player.name] = 1000
+    if seats:
+        game.new_hand()
+    return game.to_dict()
+
+
+def json_encode(game_data):
+    return [json.dumps(game_data[key]) for key in PACKED_FIELDS]
+
+
+def json_decode(columns):
+    return {key: json.loads(column) for key, column in zip(PACKED_FIELDS, columns)}
+
+
+def per_call_us(repeat, fn, arg):
+    number = 2000
+    return min(timeit.repeat(lambda: fn(arg), number=number, repeat=repeat)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'seats':>5}  {'JSON':>6}  {'packed':>6}  {'encode JSON/packed':>20}  {'decode JSON/packed':>20}")
+    for seats in (0, 1, 4, 7):
+        game_data = make_snapshot(seats)
+        columns = json_encode(game_data)
+        packed = pack_snapshot(game_data)
+        assert unpack_snapshot(packed) == json_decode(columns)
+        size = sum(len(column) for column in columns)
+        enc = (per_call_us(args.repeat, json_encode, game_data), per_call_us(args.repeat, pack_snapshot, game_data))
+        dec = (per_call_us(args.repeat, json_decode, columns), per_call_us(args.repeat, unpack_snapshot, packed))
+        print(f"{seats:>5}  {size:>5}B  {len(packed):>5}B  "
+              f"{enc[0]:>7.1f} / {enc[1]:>5.1f}µs ({enc[0] / enc[1]:.1f}x)  "
+              f"{dec[0]:>7.1f} / {dec[1]:>5.1f}µs ({dec[0] / dec[1]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
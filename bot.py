@@ -3,7 +3,6 @@ import logging
 import os
 import subprocess
 import sys
-import uuid
 from enum import Enum
 
 import asyncio
@@ -13,8 +12,13 @@ import redis.asyncio
 import redis.exceptions
 from nextcord.ext import commands, tasks
 
+from cardgames.command_stream import send_command
+from cardgames.game_events import render_event
 from cardgames.money import dollars_to_cents, format_cents
+from cardgames.rpc import REPLY_CHANNEL, RpcClient, RpcTimeout
 from changelog import parse_changelog, select_recent_entries
+from live_table import LiveTable
+from send_scheduler import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, OutboundMessage, SendScheduler
 from wwnames.wwnames import WildWestNames
 
 _wwnames = WildWestNames()
@@ -47,6 +51,9 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 SALOON_NAME = os.getenv("SALOON_NAME", "The Rusty Spur")
 SALOON_TOWN = os.getenv("SALOON_TOWN", "Redemption, Texas")
 
+# Show each hand as one embed edited in place instead of a message per event
+LIVE_TABLE_VIEW = os.getenv("LIVE_TABLE_VIEW")
+
 logging.basicConfig(
     level=LOG_LEVEL,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -61,7 +68,49 @@ if not DISCORD_TOKEN:
 
 GUILD_IDS = [int(x) for x in GUILD_IDS_STR.split(",")] if GUILD_IDS_STR else None
 
-MESSAGE_PACING_DELAY = 1.2  # seconds between game messages sent to Discord
+MESSAGE_PACING_DELAY = 1.2  # seconds between game messages sent to a channel
+
+# Every table publishes on game_updates_<game_id>; the bot takes them all with
+# one pattern subscription and routes by game id.
+GAME_UPDATES_PREFIX = "game_updates_"
+GAME_UPDATES_PATTERN = GAME_UPDATES_PREFIX + "*"
+
+# Table event type -> (embed colour, dramatic pause in seconds before it's
+# sent). Event types not listed go out as plain messages with no pause.
+GAME_EVENT_STYLES = {
+    'quip': (0xc8a96e, 0),            # Sepia
+    'bust': (0xff0000, 0),            # Red
+    'showdown': (0x4169e1, 1.0),      # Royal blue
+    'hand_started': (0x9370db, 0),    # Medium purple
+    'betting_opened': (0xff8c00, 0),  # Dark orange
+    'hole_card': (None, 1.5),
+}
+HAND_RESULT_COLORS = {'win': 0xffd700, 'bust': 0xff0000}  # Gold, red
+
+# Dramatic beats: always a message of their own, never folded into a burst
+# of table lines (events with a pause are beats too).
+GAME_EVENT_BEATS = {'dealer_blackjack', 'hole_card', 'dealer_hand', 'showdown', 'hand_result'}
+
+# Event types that jump ahead of (or may be shed before) the rest when
+# Discord's rate limits bite; everything else is PRIORITY_NORMAL.
+GAME_EVENT_PRIORITIES = {
+    'your_turn': PRIORITY_HIGH,
+    'turn_reminder': PRIORITY_HIGH,
+    'betting_opened': PRIORITY_HIGH,
+    'showdown': PRIORITY_HIGH,
+    'hand_result': PRIORITY_HIGH,
+    'game_stopped': PRIORITY_HIGH,
+    'error': PRIORITY_HIGH,
+    'quip': PRIORITY_LOW,
+    'npc_arrivals': PRIORITY_LOW,
+}
+
+# Live table view: seconds of events folded into each redraw of the embed,
+# and the events still posted as messages of their own (what happens
+# between hands, or that the embed has nowhere to show).
+LIVE_TABLE_DEBOUNCE = 1.0
+LIVE_TABLE_COLOR = 0x2e8b57  # Sea green, the felt
+LIVE_TABLE_MESSAGES = {'player_joined', 'player_left', 'npc_arrivals', 'betting_opened', 'game_stopped', 'error'}
 
 VERSION = None
 
@@ -84,6 +133,7 @@ logging.info(f"  Redis: {REDIS_HOST}:{REDIS_PORT}")
 logging.info(f"  DISCORD_TOKEN: {'set' if DISCORD_TOKEN else 'not set'}")
 logging.info(f"  DISCORD_GUILDS: {GUILD_IDS_STR or '(all guilds)'}")
 logging.info(f"  Debug logging: {'enabled' if DEBUG_LOGGING else 'disabled'}")
+logging.info(f"  Live table view: {'enabled' if LIVE_TABLE_VIEW else 'disabled'}")
 logging.info(f"  Version: {VERSION or 'unknown'}")
 logging.info("=========================")
 
@@ -128,13 +178,13 @@ class BlackjackGame:
         self.channel = channel
         self.state = state
         self.game_id = None
-        self.request_id = None
-
-    def generate_request_id(self):
-        self.request_id = str(uuid.uuid4())
-
-    def topic(self):
-        return f"game_updates_{self.game_id}"
+        # Live table view: the hand's state, its embed, and the task redrawing it
+        self.live = LiveTable() if LIVE_TABLE_VIEW else None
+        self.live_message = None
+        self.live_fresh = True     # the next redraw posts a new embed (a new hand)
+        self.live_dirty = False    # events arrived since the last redraw
+        self.live_summary = None   # the hand's summary, posted after its final redraw
+        self.live_editor = None
 
 
 class BlackjackCog(commands.Cog):
@@ -142,22 +192,29 @@ class BlackjackCog(commands.Cog):
         self.bot = bot
         self.redis = redis.asyncio.Redis(host=REDIS_HOST, port=REDIS_PORT)
         self.pubsub = self.redis.pubsub()
-        self.games = []
+        self.games = {}  # (guild_id, channel_id) -> BlackjackGame
+        self._games_by_id = {}  # game_id -> BlackjackGame
+        self.rpc = RpcClient(self.redis)
         self.subscribed = asyncio.Event()
         self.subscribe_task = None
-        self._list_games_request_id = None
-        self._pending_usage_interactions = {}  # request_id -> interaction
-        self._pending_stats_interactions = {}  # request_id -> interaction
-        self._pending_debug_interactions = {}  # request_id -> interaction
-        self._pending_wallet_interactions = {}  # request_id -> interaction
-        self._pending_checkwallet_interactions = {}  # request_id -> interaction
-        self._pending_setwallet_interactions = {}  # request_id -> interaction (set + adjust)
-        self._pending_npclimits_interactions = {}  # request_id -> interaction
+        self.restore_task = None
+        # Each Discord channel gets its own send worker, so one table's pacing
+        # and dramatic pauses never hold up another's; the scheduler keeps
+        # the queues and the rate limits.
+        self.sender = SendScheduler(channel_rate=1 / MESSAGE_PACING_DELAY)
+        self._send_workers = {}  # channel_id -> task draining that channel's queue
 
     def cog_unload(self):
         self.listen.stop()
         if self.subscribe_task:
             self.subscribe_task.cancel()
+        if self.restore_task:
+            self.restore_task.cancel()
+        for worker in self._send_workers.values():
+            worker.cancel()
+        for game in self._games_by_id.values():
+            if game.live_editor:
+                game.live_editor.cancel()
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -166,25 +223,36 @@ class BlackjackCog(commands.Cog):
         if not self.listen.is_running():
             self.listen.start()
 
-        # Request list of active games for recovery
-        await self._request_list_games()
+        # Ask for the list of active games for recovery
+        if self.restore_task is None or self.restore_task.done():
+            self.restore_task = asyncio.create_task(self._restore_games())
 
         logging.info("Blackjack cog initialized.")
 
-    async def _request_list_games(self):
-        """Request list of active games from server for recovery."""
-        request_id = str(uuid.uuid4())
-        self._list_games_request_id = request_id
-        message = {
-            'event_type': 'casino_action',
-            'action': 'list_games',
-            'request_id': request_id
-        }
+    async def _restore_games(self):
+        """Ask the server for its active games and restore their wrappers."""
+        # The reply is published, so it's only seen once we're subscribed
+        await self.subscribed.wait()
+        logging.info("Requesting list of active games for recovery")
+        try:
+            reply = await self.rpc.call('list_games')
+        except Exception as e:
+            logging.error(f"Failed to list games for recovery: {e}")
+            return
+        await self._handle_list_games_response(reply.get('games', []))
+
+    async def _call_casino(self, interaction, action, **params):
+        """Make a casino call for a deferred interaction. Returns the reply,
+        or None once the user has been told the call failed."""
         try:
-            await self.redis.publish("casino", json.dumps(message))
-            logging.info("Requested list of active games for recovery")
-        except redis.exceptions.ConnectionError as e:
-            logging.error(f"Failed to request list of games: {e}")
+            return await self.rpc.call(action, **params)
+        except RpcTimeout as e:
+            logging.warning(f"{action}: {e}")
+            await interaction.followup.send("⌛ The game server didn't answer in time.", ephemeral=True)
+        except Exception as e:
+            logging.error(f"{action} call failed: {e}")
+            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        return None
 
     async def _handle_list_games_response(self, games_info):
         """Handle list_games response and restore game wrappers."""
@@ -213,18 +281,12 @@ class BlackjackCog(commands.Cog):
             # Create game wrapper
             game = BlackjackGame(guild_id, channel_id, channel, GameState.ACTIVE)
             game.game_id = game_id
-            self.games.append(game)
+            self._track_game(game)
+            restored_count += 1
+            logging.info(f"Restored game {game_id} in channel {channel_id}")
 
-            # Subscribe to game topic
-            try:
-                await self.pubsub.subscribe(game.topic())
-                restored_count += 1
-                logging.info(f"Restored game {game_id} in channel {channel_id}")
-
-                # Announce reconnection
-                await channel.send("🔄 Bot reconnected. Game in progress.")
-            except Exception as e:
-                logging.error(f"Failed to subscribe to game {game_id} topic: {e}")
+            # Announce reconnection
+            await channel.send("🔄 Bot reconnected. Game in progress.")
 
         if restored_count > 0:
             logging.info(f"Restored {restored_count} active games")
@@ -293,7 +355,7 @@ class BlackjackCog(commands.Cog):
     @nextcord.slash_command(name="saloon", guild_ids=GUILD_IDS,
                             description="Show info about the saloon")
     async def saloon_info(self, interaction: nextcord.Interaction):
-        active_games = [g for g in self.games if g.state == GameState.ACTIVE]
+        active_games = [g for g in self.games.values() if g.state == GameState.ACTIVE]
         if active_games:
             table_lines = []
             for g in active_games:
@@ -337,38 +399,18 @@ class BlackjackCog(commands.Cog):
                             default_member_permissions=nextcord.Permissions(administrator=True))
     async def usage_stats(self, interaction: nextcord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        request_id = str(uuid.uuid4())
-        self._pending_usage_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'get_usage',
-            'request_id': request_id,
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for get_usage: {e}")
-            self._pending_usage_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'get_usage')
+        if reply is not None:
+            await self._handle_usage_stats_response(interaction, reply.get('rows', []))
 
     @nextcord.slash_command(name="debug", guild_ids=GUILD_IDS,
                             description="Show full internal state for debugging (admin only)",
                             default_member_permissions=nextcord.Permissions(administrator=True))
     async def debug_state(self, interaction: nextcord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        request_id = str(uuid.uuid4())
-        self._pending_debug_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'get_debug',
-            'request_id': request_id,
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for get_debug: {e}")
-            self._pending_debug_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'get_debug')
+        if reply is not None:
+            await self._handle_debug_response(interaction, reply)
 
     async def _handle_debug_response(self, interaction, data):
         """Format and send full debug state as ephemeral embeds."""
@@ -376,7 +418,7 @@ class BlackjackCog(commands.Cog):
 
         # --- Bot-side state ---
         bot_lines = []
-        for g in self.games:
+        for g in self.games.values():
             bot_lines.append(
                 f"`{g.game_id or '(pending)'}` ch=<#{g.channel_id}> state={g.state.value}"
             )
@@ -414,6 +456,95 @@ class BlackjackCog(commands.Cog):
         if not data.get('games'):
             embeds.append(nextcord.Embed(title="Games", description="No active games", color=0xc8a96e))
 
+        # --- Casino ingress ---
+        ingress = data.get('ingress')
+        output = data.get('output') or {}
+        if ingress:
+            avg = ingress['messages'] / ingress['batches'] if ingress['batches'] else 0
+            shard = f" (shard {data['shard']})" if data.get('shard') else ""
+            embeds.append(nextcord.Embed(
+                title=f"Casino ingress{shard}",
+                description=(
+                    f"Messages: {ingress['messages']} in {ingress['batches']} batches (avg {avg:.1f})\n"
+                    f"Last batch: {ingress['last_batch']} | Largest: {ingress['max_batch']} | "
+                    f"Cap: {ingress['batch_cap']} (hit {ingress['capped_batches']}x)\n"
+                    f"Queued now: {ingress.get('queue_depth', 0)} | Deepest: {ingress.get('max_queue_depth', 0)}\n"
+                    f"Output: {output.get('events', 0)} events in {output.get('frames', 0)} frames, "
+                    f"{output.get('flushes', 0)} publishes"
+                ),
+                color=0x888888,
+            ))
+
+        wallets = data.get('wallet_cache')
+        if wallets:
+            lookups = wallets['hits'] + wallets['misses']
+            rate = f" ({wallets['hits'] / lookups:.0%} hits)" if lookups else ""
+            writes = data.get('writes') or {}
+            embeds.append(nextcord.Embed(
+                title="Wallets",
+                description=(
+                    f"Cached: {wallets['cached']} | Hits: {wallets['hits']} | Misses: {wallets['misses']}{rate}\n"
+                    f"Invalidations: {wallets['invalidations']}\n"
+                    f"Hand commits: {writes.get('commits', 0)} for {writes.get('deferred_writes', 0)} writes | "
+                    f"Failed: {writes.get('failed_commits', 0)} | Tables pending: {writes.get('pending_tables', 0)}\n"
+                    f"Snapshots: {writes.get('checkpoints', 0)} checkpoints | "
+                    f"{writes.get('journaled_snapshots', 0)} journaled | "
+                    f"{writes.get('skipped_snapshots', 0)} unchanged"
+                ),
+                color=0x888888,
+            ))
+
+        pool = data.get('db_pool')
+        if pool:
+            avg_wait = pool['wait_seconds'] / pool['checkouts'] * 1000 if pool['checkouts'] else 0
+            embeds.append(nextcord.Embed(
+                title="DB pool",
+                description=(
+                    f"In use: {pool['in_use']}/{pool['size']} | Open: {pool['open']} | Waiting now: {pool['waiters']}\n"
+                    f"Checkouts: {pool['checkouts']} | Waited: {pool['waits']}x | "
+                    f"Avg wait: {avg_wait:.1f} ms | Max wait: {pool['max_wait_seconds'] * 1000:.0f} ms\n"
+                    f"Opened: {pool['opened']} | Discarded: {pool['discarded']}"
+                ),
+                color=0x888888,
+            ))
+
+        behind = data.get('write_behind')
+        if behind:
+            embeds.append(nextcord.Embed(
+                title="Write-behind queue",
+                description=(
+                    f"Depth: {behind['depth']}/{behind['max_depth']} | Deepest: {behind['max_depth_seen']}\n"
+                    f"Written: {behind['written']} in {behind['batches']} batches | Failed: {behind['failed']}\n"
+                    f"Dropped: {behind['dropped']} | Spilled: {behind['spilled']}\n"
+                    f"Flush latency: {behind['last_flush_ms']:.0f} ms last, {behind['max_flush_ms']:.0f} ms max"
+                ),
+                color=0x888888,
+            ))
+
+        # --- RPC latency, as seen by the bot and by the casino ---
+        rpc_lines = [f"In flight: {self.rpc.in_flight}"]
+        for side, stats in (("bot", self.rpc.stats.as_dict()), ("casino", data.get('rpc') or {})):
+            for action, s in sorted(stats.items()):
+                rpc_lines.append(
+                    f"{side} `{action}`: {s['calls']} calls, avg {s['avg_ms']:.0f} ms, max {s['max_ms']:.0f} ms"
+                    f" | {s['timeouts']} timeouts, {s['errors']} errors"
+                )
+        embeds.append(nextcord.Embed(title="RPC", description="\n".join(rpc_lines), color=0x888888))
+
+        # --- Outbound Discord messages ---
+        sends = self.sender.snapshot()
+        queued = ", ".join(f"<#{channel_id}>: {depth}" for channel_id, depth in sends['queued'].items())
+        embeds.append(nextcord.Embed(
+            title="Discord sends",
+            description=(
+                f"Sent: {sends['sent']} messages carrying {sends['lines']} lines\n"
+                f"Wait: avg {sends['avg_wait']:.1f}s, max {sends['max_wait']:.1f}s\n"
+                f"Queued: {queued or 'nothing'} | Waiting on global limit: {sends['waiting_global']}\n"
+                f"Shed under backlog: {sends['merged']} merged, {sends['dropped']} dropped"
+            ),
+            color=0x888888,
+        ))
+
         # --- NPC Roster ---
         npc_lines = []
         for npc in data.get('npcs', []):
@@ -485,20 +616,9 @@ class BlackjackCog(commands.Cog):
                             default_member_permissions=nextcord.Permissions(administrator=True))
     async def check_wallet(self, interaction: nextcord.Interaction, target: str):
         await interaction.response.defer(ephemeral=True)
-        request_id = str(uuid.uuid4())
-        self._pending_checkwallet_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'lookup_wallet',
-            'request_id': request_id,
-            'target': target,
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for lookup_wallet: {e}")
-            self._pending_checkwallet_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'lookup_wallet', target=target)
+        if reply is not None:
+            await self._handle_wallet_info_response(interaction, reply)
 
     @nextcord.slash_command(name="setwallet", guild_ids=GUILD_IDS,
                             description="Set any player's or NPC's wallet to an exact amount (admin only)",
@@ -506,22 +626,10 @@ class BlackjackCog(commands.Cog):
     async def set_wallet(self, interaction: nextcord.Interaction, target: str, amount: int):
         """amount is entered in dollars; converted to cents before publishing."""
         await interaction.response.defer(ephemeral=True)
-        request_id = str(uuid.uuid4())
-        self._pending_setwallet_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'set_wallet',
-            'request_id': request_id,
-            'target': target,
-            'mode': 'set',
-            'amount': dollars_to_cents(amount),
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for set_wallet: {e}")
-            self._pending_setwallet_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'set_wallet', target=target, mode='set',
+                                        amount=dollars_to_cents(amount))
+        if reply is not None:
+            await self._handle_wallet_set_response(interaction, reply)
 
     @nextcord.slash_command(name="givechips", guild_ids=GUILD_IDS,
                             description="Adjust any player's or NPC's wallet by a delta (admin only)",
@@ -529,62 +637,35 @@ class BlackjackCog(commands.Cog):
     async def give_chips(self, interaction: nextcord.Interaction, target: str, amount: int):
         """Positive amount adds chips; negative takes them away. amount is in dollars."""
         await interaction.response.defer(ephemeral=True)
-        request_id = str(uuid.uuid4())
-        self._pending_setwallet_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'set_wallet',
-            'request_id': request_id,
-            'target': target,
-            'mode': 'adjust',
-            'amount': dollars_to_cents(amount),
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for givechips: {e}")
-            self._pending_setwallet_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'set_wallet', target=target, mode='adjust',
+                                        amount=dollars_to_cents(amount))
+        if reply is not None:
+            await self._handle_wallet_set_response(interaction, reply)
 
     @nextcord.slash_command(name="stats", guild_ids=GUILD_IDS,
                             description="View your stats at the saloon")
     async def player_stats(self, interaction: nextcord.Interaction):
         await interaction.response.defer(ephemeral=True)
         player_name = sanitize_username(interaction.user.name)
-        request_id = str(uuid.uuid4())
-        self._pending_stats_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'get_stats',
-            'request_id': request_id,
-            'player': player_name,
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for get_stats: {e}")
-            self._pending_stats_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'get_stats', player=player_name)
+        if reply is not None:
+            await self._handle_stats_response(interaction, reply.get('player', ''), reply.get('stats'))
 
     @nextcord.slash_command(name="wad", guild_ids=GUILD_IDS,
                             description="Check your current wad (only you can see this)")
     async def check_wad(self, interaction: nextcord.Interaction):
         await interaction.response.defer(ephemeral=True)
         player_name = sanitize_username(interaction.user.name)
-        request_id = str(uuid.uuid4())
-        self._pending_wallet_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'get_wallet',
-            'request_id': request_id,
-            'player': player_name,
-        }
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for get_wallet: {e}")
-            self._pending_wallet_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+        reply = await self._call_casino(interaction, 'get_wallet', player=player_name)
+        if reply is None:
+            return
+        balance = reply.get('balance_cents')
+        if balance is None:
+            await interaction.followup.send(
+                "No record found. Join a game and place a bet first!", ephemeral=True
+            )
+        else:
+            await interaction.followup.send(f"💰 Your wad: **${format_cents(balance)}**", ephemeral=True)
 
     async def _handle_npc_limits_response(self, interaction, data):
         """Format and send NPC limits response as an ephemeral followup."""
@@ -625,23 +706,14 @@ class BlackjackCog(commands.Cog):
     ):
         """View current NPC autofill limits (no args) or set new ones."""
         await interaction.response.defer(ephemeral=True)
-        request_id = str(uuid.uuid4())
-        self._pending_npclimits_interactions[request_id] = interaction
-        message = {
-            'event_type': 'casino_action',
-            'action': 'npc_limits',
-            'request_id': request_id,
-        }
+        limits = {}
         if min is not None:
-            message['min'] = min
+            limits['min'] = min
         if max is not None:
-            message['max'] = max
-        try:
-            await self.redis.publish("casino", json.dumps(message))
-        except Exception as e:
-            logging.error(f"Redis publish error for npc_limits: {e}")
-            self._pending_npclimits_interactions.pop(request_id, None)
-            await interaction.followup.send("❌ Could not reach game server.", ephemeral=True)
+            limits['max'] = max
+        reply = await self._call_casino(interaction, 'npc_limits', **limits)
+        if reply is not None:
+            await self._handle_npc_limits_response(interaction, reply)
 
     @nextcord.slash_command(name="addnpc", guild_ids=GUILD_IDS,
                             description="Add NPC(s) to the current game (admin only)",
@@ -671,7 +743,7 @@ class BlackjackCog(commands.Cog):
             "count": count,
         }
         try:
-            await self.redis.publish("casino", json.dumps(message))
+            await send_command(self.redis, message)
         except Exception as e:
             logging.error(f"Redis publish error for addnpc: {e}")
             await interaction.send("❌ Could not reach game server.", ephemeral=True)
@@ -706,7 +778,7 @@ class BlackjackCog(commands.Cog):
         if name is not None:
             message["npc_name"] = name
         try:
-            await self.redis.publish("casino", json.dumps(message))
+            await send_command(self.redis, message)
         except Exception as e:
             logging.error(f"Redis publish error for removenpc: {e}")
             await interaction.send("❌ Could not reach game server.", ephemeral=True)
@@ -771,24 +843,29 @@ class BlackjackCog(commands.Cog):
             await interaction.send("⚠️ A game is already in progress in this channel.")
             return
 
+        # Tracked while the call is out, so the channel can't start a second game
         game = BlackjackGame(interaction.guild_id, interaction.channel_id, interaction.channel)
-        game.generate_request_id()
-        self.games.append(game)
-
-        message = {
-            'event_type': 'casino_action',
-            'action': 'new_game',
-            'request_id': game.request_id,
-            'guild_id': game.guild_id,
-            'channel_id': game.channel_id,
-            'num_bots': num_bots,
-        }
+        self._track_game(game)
+        await interaction.send("🎲 Starting new game...")
         try:
-            await self.redis.publish("casino", json.dumps(message))
-            await interaction.send("🎲 Starting new game...")
-        except redis.exceptions.ConnectionError as e:
-            logging.error(f"Redis publish error: {e}")
-            await interaction.send("❌ Failed to communicate with game server.")
+            reply = await self.rpc.call('new_game', guild_id=game.guild_id, channel_id=game.channel_id,
+                                        num_bots=num_bots)
+        except Exception as e:
+            logging.error(f"new_game call failed: {e}")
+            self._forget_game(game)
+            await interaction.followup.send("❌ Failed to communicate with game server.")
+            return
+
+        game.state = GameState.ACTIVE
+        game.game_id = reply['game_id']
+        self._track_game(game)
+        embed = nextcord.Embed(
+            title="🎲 New Blackjack Game",
+            description=f"Game {game.game_id} created.\n⏳ Waiting for players.",
+            color=0x00ff00  # Green
+        )
+        await game.channel.send(embed=embed)
+        logging.debug(f"Game created: {game.game_id}")
 
     @nextcord.slash_command(name="joingame", guild_ids=GUILD_IDS)
     async def join_game(self, interaction: nextcord.Interaction):
@@ -827,7 +904,7 @@ class BlackjackCog(commands.Cog):
             "game_id": game.game_id,
         }
         try:
-            await self.redis.publish("casino", json.dumps(message))
+            await send_command(self.redis, message)
         except Exception as e:
             logging.error(f"Redis publish error: {e}")
             await interaction.send("⚠️ Failed to stop game.", ephemeral=True)
@@ -910,143 +987,124 @@ class BlackjackCog(commands.Cog):
         data = json.loads(message['data'])
         topic = message['channel'].decode()
 
-        if topic == "casino_update":
-            if data.get("event_type") == "new_game":
-                game = self.find_game_by_request_id(data.get("request_id"))
-                if game:
-                    if game.state != GameState.WAITING:
-                        logging.error(f"Got new-game message for game in state {game.state}")
-                        return
-                    game.state = GameState.ACTIVE
-                    game.game_id = data.get("game_id")
-
-                    # Use embed for game creation
-                    embed = nextcord.Embed(
-                        title="🎲 New Blackjack Game",
-                        description=f"Game {game.game_id} created.\n⏳ Waiting for players.",
-                        color=0x00ff00  # Green
-                    )
-                    await game.channel.send(embed=embed)
-                    logging.debug(f"Game created: {game.game_id}")
-                    try:
-                        await self.pubsub.subscribe(game.topic())
-                    except Exception as e:
-                        logging.error(f"Failed to subscribe to game topic: {e}")
-
-            elif data.get("event_type") == "list_games":
-                request_id = data.get("request_id")
-                if hasattr(self, '_list_games_request_id') and \
-                   request_id == self._list_games_request_id:
-                    await self._handle_list_games_response(data.get("games", []))
-
-            elif data.get("event_type") == "usage_stats":
-                request_id = data.get("request_id")
-                interaction = self._pending_usage_interactions.pop(request_id, None)
-                if interaction:
-                    await self._handle_usage_stats_response(interaction, data.get("rows", []))
-
-            elif data.get("event_type") == "debug_state":
-                request_id = data.get("request_id")
-                interaction = self._pending_debug_interactions.pop(request_id, None)
-                if interaction:
-                    await self._handle_debug_response(interaction, data)
-
-            elif data.get("event_type") == "player_stats":
-                request_id = data.get("request_id")
-                interaction = self._pending_stats_interactions.pop(request_id, None)
-                if interaction:
-                    await self._handle_stats_response(
-                        interaction, data.get("player", ""), data.get("stats")
-                    )
-            elif data.get("event_type") == "player_wallet":
-                request_id = data.get("request_id")
-                interaction = self._pending_wallet_interactions.pop(request_id, None)
-                if interaction:
-                    balance = data.get("balance_cents")
-                    if balance is None:
-                        await interaction.followup.send(
-                            "No record found. Join a game and place a bet first!", ephemeral=True
-                        )
-                    else:
-                        await interaction.followup.send(
-                            f"💰 Your wad: **${format_cents(balance)}**", ephemeral=True
-                        )
-            elif data.get("event_type") == "wallet_info":
-                request_id = data.get("request_id")
-                interaction = self._pending_checkwallet_interactions.pop(request_id, None)
-                if interaction:
-                    await self._handle_wallet_info_response(interaction, data)
-            elif data.get("event_type") == "wallet_set":
-                request_id = data.get("request_id")
-                interaction = self._pending_setwallet_interactions.pop(request_id, None)
-                if interaction:
-                    await self._handle_wallet_set_response(interaction, data)
-            elif data.get("event_type") == "npc_limits":
-                request_id = data.get("request_id")
-                interaction = self._pending_npclimits_interactions.pop(request_id, None)
-                if interaction:
-                    await self._handle_npc_limits_response(interaction, data)
+        if topic == REPLY_CHANNEL:
+            if not self.rpc.resolve(data):
+                logging.debug(f"Got reply to no call in flight: {data.get('event_type')}")
         else:
-            for game in self.games:
-                if game.topic() == topic:
-                    logging.debug("Got game message")
-
-                    if data.get('event_type') == 'game_over':
-                        game.state = GameState.FINISHED
-                        self.games.remove(game)
-                        try:
-                            await self.pubsub.unsubscribe(game.topic())
-                        except Exception as e:
-                            logging.error(f"Failed to unsubscribe from game topic: {e}")
-                        logging.info(f"Game {game.game_id} ended, removed from tracking")
-                        break
-
-                    text = data["text"]
-
-                    # Use embeds for special messages
-                    if text.startswith("🤠") and ': "' in text:
-                        msg_type = "npc_quip"
-                        embed = nextcord.Embed(description=text, color=0xc8a96e)  # Sepia
-                        await game.channel.send(embed=embed)
-                    elif "🏆 strikes gold" in text:
-                        msg_type = "win"
-                        embed = nextcord.Embed(description=text, color=0xffd700)  # Gold
-                        await game.channel.send(embed=embed)
-                    elif "💥" in text and ("bust" in text.lower() or "lost" in text.lower()):
-                        msg_type = "bust"
-                        embed = nextcord.Embed(description=text, color=0xff0000)  # Red
-                        await game.channel.send(embed=embed)
-                    elif "✨ ~*~ The dust settles" in text:
-                        msg_type = "hand_result"
-                        logging.debug(f"[{game.game_id[:8]}] Dramatic pause: 1.0s (hand_result)")
-                        async with game.channel.typing():
-                            await asyncio.sleep(1.0)
-                        embed = nextcord.Embed(description=text, color=0x4169e1)  # Royal blue
-                        await game.channel.send(embed=embed)
-                    elif "🃏 The dealer shuffles" in text:
-                        msg_type = "new_hand"
-                        embed = nextcord.Embed(description=text, color=0x9370db)  # Medium purple
-                        await game.channel.send(embed=embed)
-                    elif "💰 Ante up" in text:
-                        msg_type = "bet_prompt"
-                        embed = nextcord.Embed(description=text, color=0xff8c00)  # Dark orange
-                        await game.channel.send(embed=embed)
-                    elif "🔄 Dealer flips" in text:
-                        msg_type = "dealer_reveal"
-                        logging.debug(f"[{game.game_id[:8]}] Dramatic pause: 1.5s (dealer_reveal)")
-                        async with game.channel.typing():
-                            await asyncio.sleep(1.5)
-                        await game.channel.send(text)
-                    else:
-                        msg_type = "game_event"
-                        await game.channel.send(text)
-
-                    logging.info(f"[{game.game_id[:8]}] → Discord: {msg_type} | {text[:70]!r}")
-                    logging.debug(f"[{game.game_id[:8]}] Pacing: {MESSAGE_PACING_DELAY:.1f}s")
-                    await asyncio.sleep(MESSAGE_PACING_DELAY)
-                    break
-            else:
+            game = None
+            if topic.startswith(GAME_UPDATES_PREFIX):
+                game = self._games_by_id.get(topic[len(GAME_UPDATES_PREFIX):])
+            if game is None:
                 logging.debug(f"Got unknown message from channel {message['channel']}: {message}")
+                return
+            logging.debug("Got game message")
+
+            if data.get('event_type') == 'game_over':
+                game.state = GameState.FINISHED
+                self._forget_game(game)
+                logging.info(f"Game {game.game_id} ended, removed from tracking")
+                return
+
+            # One frame per table per server tick, events in order
+            for event in data.get("events", []):
+                self._queue_game_event(game, event)
+
+    def _queue_game_event(self, game, event):
+        """Render an event and hand it to the send scheduler, starting the
+        channel's send worker if it has none running. In live table view
+        most events only update the table's embed."""
+        if game.live is not None:
+            self._update_live_table(game, event)
+            if event['type'] not in LIVE_TABLE_MESSAGES:
+                return
+        text = render_event(event)
+        if text is None:
+            logging.debug(f"[{game.game_id[:8]}] Skipping unknown event: {event}")
+            return
+        event_type = event['type']
+        if event_type == 'hand_result':
+            color, pause = HAND_RESULT_COLORS.get(event['outcome']), 0
+        else:
+            color, pause = GAME_EVENT_STYLES.get(event_type, (None, 0))
+        message = OutboundMessage(game.channel, text, GAME_EVENT_PRIORITIES.get(event_type, PRIORITY_NORMAL),
+                                  color=color, pause=pause, kind=event_type, label=game.game_id[:8],
+                                  coalesce=not pause and event_type not in GAME_EVENT_BEATS)
+        self._submit_message(game.channel_id, message)
+
+    def _submit_message(self, channel_id, message):
+        if self.sender.submit(channel_id, message) != 'queued':
+            logging.debug(f"[{message.label}] Channel backed up, shed {message.kind}")
+        worker = self._send_workers.get(channel_id)
+        if worker is None or worker.done():
+            self._send_workers[channel_id] = asyncio.create_task(self._send_worker(channel_id))
+
+    def _update_live_table(self, game, event):
+        """Fold an event into a game's live table and have its embed redrawn."""
+        if event['type'] == 'hand_started':
+            game.live_fresh = True
+        if game.live.apply(event):
+            game.live_dirty = True
+            if game.live_editor is None:
+                game.live_editor = asyncio.create_task(self._live_table_editor(game))
+        if event['type'] == 'hand_over':
+            game.live_summary = game.live.summary()
+
+    async def _live_table_editor(self, game):
+        """Redraw a game's live table embed until it's caught up, at most
+        once per debounce window however many events arrive in it, then
+        post the hand's summary if it's over."""
+        label = game.game_id[:8]
+        while game.live_dirty:
+            await asyncio.sleep(LIVE_TABLE_DEBOUNCE)
+            game.live_dirty = False
+            fresh, game.live_fresh = game.live_fresh, False
+            embed = nextcord.Embed(description=game.live.render(), color=LIVE_TABLE_COLOR)
+            summary, game.live_summary = game.live_summary, None
+            try:
+                await self.sender.wait_turn(game.channel_id, OutboundMessage(game.channel, "", kind='live_table'))
+                if fresh or game.live_message is None:
+                    game.live_message = await game.channel.send(embed=embed)
+                else:
+                    await game.live_message.edit(embed=embed)
+                logging.debug(f"[{label}] → Discord: live table {'posted' if fresh else 'edited'}")
+            except Exception as e:
+                logging.error(f"[{label}] Failed to draw the live table: {e}")
+            if summary:
+                self._submit_message(game.channel_id, OutboundMessage(
+                    game.channel, summary, PRIORITY_HIGH, color=LIVE_TABLE_COLOR, kind='hand_summary',
+                    label=label, coalesce=False))
+        # No await between the check above and here, so the next event finds
+        # no editor and starts a fresh one.
+        game.live_editor = None
+
+    async def _send_worker(self, channel_id):
+        """Send a channel's queued messages in order until it runs dry."""
+        while (message := self.sender.next_message(channel_id)) is not None:
+            try:
+                await self._send_game_message(channel_id, message)
+            except Exception as e:
+                logging.error(f"[{message.label}] Failed to send {message.kind} to Discord: {e}")
+        # Nothing can be queued between the check above and here (no await), so
+        # the next event for this channel finds no worker and starts a fresh one.
+        del self._send_workers[channel_id]
+
+    async def _send_game_message(self, channel_id, message):
+        """Post one game message once the rate limits allow, after its
+        dramatic pause."""
+        if message.pause:
+            logging.debug(f"[{message.label}] Dramatic pause: {message.pause:.1f}s ({message.kind})")
+            async with message.channel.typing():
+                await asyncio.sleep(message.pause)
+        await self.sender.wait_turn(channel_id, message)
+        # Whatever queued up behind it while it waited goes out in the same message
+        self.sender.coalesce(channel_id, message)
+        if message.color is None:
+            await message.channel.send(message.text)
+        else:
+            await message.channel.send(embed=nextcord.Embed(description=message.text, color=message.color))
+        self.sender.record_sent(message)
+        lines = f" (+{message.parts - 1} lines)" if message.parts > 1 else ""
+        logging.info(f"[{message.label}] → Discord: {message.kind}{lines} | {message.text[:70]!r}")
 
     async def send_command(self, player_name, game, cmd, **kwargs):
         extra = f" ${format_cents(kwargs['amount'])}" if 'amount' in kwargs else ""
@@ -1059,7 +1117,7 @@ class BlackjackCog(commands.Cog):
         }
         message.update(kwargs)
         try:
-            await self.redis.publish("casino", json.dumps(message))
+            await send_command(self.redis, message)
         except Exception as e:
             logging.error(f"Redis publish error: {e}")
             if game.channel:
@@ -1069,10 +1127,8 @@ class BlackjackCog(commands.Cog):
         backoff = 2
         while True:
             try:
-                await self.pubsub.subscribe("casino_update")
-                for game in self.games:
-                    if game.game_id:
-                        await self.pubsub.subscribe(game.topic())
+                await self.pubsub.subscribe(REPLY_CHANNEL)
+                await self.pubsub.psubscribe(GAME_UPDATES_PATTERN)
                 self.subscribed.set()
                 logging.info("Subscribed to casino_update.")
                 return
@@ -1082,22 +1138,25 @@ class BlackjackCog(commands.Cog):
                 await asyncio.sleep(backoff)
                 backoff = min(backoff * 2, 60)  # Exponential backoff up to 60s
 
+    def _track_game(self, game):
+        self.games[(game.guild_id, game.channel_id)] = game
+        if game.game_id:
+            self._games_by_id[game.game_id] = game
+
+    def _forget_game(self, game):
+        if self.games.get((game.guild_id, game.channel_id)) is game:
+            del self.games[(game.guild_id, game.channel_id)]
+        self._games_by_id.pop(game.game_id, None)
+
     def find_game(self, guild_id, channel_id):
-        for game in self.games:
-            if (game.guild_id == guild_id and game.channel_id == channel_id
-                    and game.state != GameState.FINISHED):
-                return game
+        game = self.games.get((guild_id, channel_id))
+        if game is not None and game.state != GameState.FINISHED:
+            return game
         return None
 
     def find_game_by_interaction(self, interaction):
         return self.find_game(interaction.guild_id, interaction.channel_id)
 
-    def find_game_by_request_id(self, request_id):
-        for game in self.games:
-            if game.request_id == request_id:
-                return game
-        return None
-
 
 bot.add_cog(BlackjackCog(bot))
 bot.run(DISCORD_TOKEN)
@@ -64,8 +64,12 @@ def serialize_player(player):
     }
 
 
-def deserialize_player(data, casino=None):
-    """Deserialize a player from persisted state."""
+def deserialize_player(data, casino=None, npcs=None):
+    """Deserialize a player from persisted state.
+
+    npcs maps npc_db_id -> (NPC record, recent memories) fetched up front
+    for a batch of games; an NPC found there costs no queries.
+    """
     name = data['name']
     hand = deserialize_hand(data['hand'])
 
@@ -77,8 +81,10 @@ def deserialize_player(data, casino=None):
     npc_db_id = data.get('npc_db_id')
 
     # Load NPC record from DB if we have an id
-    npc_record = None
-    if npc_db_id is not None and casino is not None and getattr(casino, 'db', None) is not None:
+    npc_record = memories = None
+    if npcs is not None and npc_db_id in npcs:
+        npc_record, memories = npcs[npc_db_id]
+    elif npc_db_id is not None and casino is not None and getattr(casino, 'db', None) is not None:
         try:
             npc_record = casino.db.get_npc_by_id(npc_db_id)
         except Exception:
@@ -95,10 +101,11 @@ def deserialize_player(data, casino=None):
         if llm_client is not None:
             try:
                 personality = get_personality(personality_name)
-                memories = []
-                loader = getattr(casino, '_load_npc_memories', None)
-                if callable(loader):
-                    memories = loader(npc_db_id)
+                if memories is None:
+                    memories = []
+                    loader = getattr(casino, '_load_npc_memories', None)
+                    if callable(loader):
+                        memories = loader(npc_db_id)
                 player = LLMBlackjackNPC(name, personality, llm_client,
                                          npc_db_id=npc_db_id, backstory=backstory,
                                          memories=memories)
@@ -252,8 +259,14 @@ class Blackjack(CardGame):
         # Players who left mid-hand after acting; resolved at end_hand()
         self.departed_players = []
 
-    def output(self, output):
-        self.casino.game_output(self.game_id, output)
+        # Paced output still to come (see _run_steps): a generator parked on a
+        # dramatic pause, and the time.time() at which it's due to resume.
+        self._continuation = None
+        self._continuation_at = None
+
+    def emit(self, event_type, **fields):
+        """Queue a table event for the table's clients (see game_events.py)."""
+        self.casino.game_output(self.game_id, dict(fields, type=event_type))
 
     def _is_ambient(self):
         """True when every seated player is an NPC — nobody's actually watching this
@@ -261,16 +274,35 @@ class Blackjack(CardGame):
         return bool(self.players) and all(getattr(p, 'is_npc', False) for p in self.players)
 
     def _pause(self, base_seconds):
+        """Return how long a dramatic pause lasts at this table, in seconds."""
         multiplier = self.AMBIENT_SPEED_MULTIPLIER if self._is_ambient() else 1.0
-        time.sleep(base_seconds * multiplier)
+        return base_seconds * multiplier
 
-    def _output_player_result(self, player, result):
-        """Output a player's result with their current wallet balance."""
-        if player.is_npc:
-            self.output(f"{player} {result}")
-        else:
-            balance = self.casino.get_wallet(player)
-            self.output(f"{player} {result} 💰 Wad: ${format_cents(balance)}")
+    def _run_steps(self, steps):
+        """Drive a generator of paced table output.
+
+        Each value the generator yields is a pause in seconds. Zero pauses run
+        straight through; a positive one parks the generator as this table's
+        continuation, which tick() resumes once it's due. Nothing sleeps, so one
+        table's dealer reveal never holds up the casino loop or other tables.
+        """
+        self._continuation = None
+        self._continuation_at = None
+        self._dirty = True
+        for delay in steps:
+            if delay > 0:
+                self._continuation = steps
+                self._continuation_at = time.time() + delay
+                return
+
+    def _balance_for_display(self, player):
+        """A human's wallet balance for an event; NPC balances stay hidden."""
+        return None if player.is_npc else self.casino.get_wallet(player)
+
+    def _emit_player_result(self, player, outcome, amount_cents, departed):
+        """Announce a player's result with their current wallet balance."""
+        self.emit('hand_result', player=player.name, outcome=outcome, amount_cents=amount_cents,
+                  departed=departed, balance_cents=self._balance_for_display(player))
 
     def _check_turn(self, player):
         if self.players[self.current_player_idx] != player:
@@ -303,12 +335,14 @@ class Blackjack(CardGame):
 
         if self.state == HandState.BETTING:
             if announce:
-                self.output(f"🪑 {_player_label(player)} pulls up a chair. They're in for this round!")
+                self.emit('player_joined', player=player.name, npc_type=getattr(player, 'npc_type', None),
+                          this_round=True)
             self.players.append(player)
             logging.info(f"[{self.game_id[:8]}] {_player_label(player)} joins mid-hand")
         else:
             if announce:
-                self.output(f"🪑 {_player_label(player)} pulls up a chair. They'll join the next hand.")
+                self.emit('player_joined', player=player.name, npc_type=getattr(player, 'npc_type', None),
+                          this_round=False)
             self.players_waiting.append(player)
             logging.info(f"[{self.game_id[:8]}] {_player_label(player)} joins (next hand)")
 
@@ -317,7 +351,7 @@ class Blackjack(CardGame):
             if player in self.players_waiting:
                 self._dirty = True
                 self.players_waiting.remove(player)
-                self.output(f"👋 {player} tips their hat and moseys on.")
+                self.emit('player_left', player=player.name, reason='waiting')
                 self._fire_departure_hook(player)
                 return
             raise CardGameError(f"{player} is not at the table")
@@ -334,25 +368,17 @@ class Blackjack(CardGame):
                 # Cards not yet dealt; bet is unlocked and returned
                 self.casino.update_wallet(player, bet_amount)
                 del self.bets[player.name]
-                self.output(
-                    f"💨 {player} hightails it before the deal! Their ${format_cents(bet_amount)} bet is returned."
-                )
+                self.emit('player_left', player=player.name, reason='bet_returned', amount_cents=bet_amount)
             elif already_played or self.state in (HandState.DEALER_TURN, HandState.RESOLVING):
                 # Already acted or waiting on dealer: hand resolves at end_hand()
                 self.departed_players.append(player)
-                self.output(f"💨 {player} hightails it outta here! Their hand will be settled when the dust clears.")
+                self.emit('player_left', player=player.name, reason='settle_later')
             else:
                 # Haven't played yet (or it's their turn now): bet forfeited
                 del self.bets[player.name]
-                self.output(
-                    f"💨 {player} hightails it outta here! Their ${format_cents(bet_amount)} stays with the house."
-                )
-        elif reason == 'broke':
-            self.output(f"💸 {player} is tapped out and tips their hat goodbye.")
-        elif reason == 'night':
-            self.output(f"🌙 {player} reckons it's time to call it a night and heads for the door.")
+                self.emit('player_left', player=player.name, reason='bet_forfeited', amount_cents=bet_amount)
         else:
-            self.output(f"👋 {player} tips their hat and leaves the table.")
+            self.emit('player_left', player=player.name, reason=reason)
 
         self.players.remove(player)
         logging.info(f"[{self.game_id[:8]}] {_player_label(player)} leaves (state: {self.state.value})")
@@ -364,7 +390,7 @@ class Blackjack(CardGame):
                 self.current_player_idx -= 1
             if self.current_player_idx >= len(self.players):
                 if not self.players and not self.departed_players:
-                    self.output("🌵 Table's empty. Everyone's skedaddled.")
+                    self.emit('table_empty', phase='playing')
                     self.state = HandState.WAITING
                 else:
                     self.state = HandState.DEALER_TURN
@@ -401,19 +427,11 @@ class Blackjack(CardGame):
         self.state = HandState.BETTING
         logging.info(f"[{self.game_id[:8]}] Betting opens — {', '.join(_player_label(p) for p in self.players)}")
 
-        self.output("💰 Ante up, folks! Place your bets!")
-        self.output(f"🎰 Table limits: ${format_cents(self.MIN_BET)} to ${format_cents(self.MAX_BET)}")
-        self.output(f"⏱️ You've got {self.TIME_FOR_BETTING} seconds before the cards fly.")
-
-        # Output all players' wallets before betting (NPC balances hidden)
-        wallet_lines = []
-        for p in self.players:
-            if p.is_npc:
-                wallet_lines.append(f"{p}: ???")
-            else:
-                balance = self.casino.get_wallet(p)
-                wallet_lines.append(f"{p}: ${format_cents(balance)}")
-        self.output("💰 Wads: " + ", ".join(wallet_lines))
+        self.emit('betting_opened', min_bet_cents=self.MIN_BET, max_bet_cents=self.MAX_BET,
+                  seconds=self.TIME_FOR_BETTING)
+        # Everyone's wallet before betting (NPC balances hidden)
+        self.emit('wallets', wallets=[{'player': p.name, 'balance_cents': self._balance_for_display(p)}
+                                      for p in self.players])
 
     def bet(self, player, amount_cents):
         """Place a bet for a player. amount_cents is in cents."""
@@ -435,7 +453,7 @@ class Blackjack(CardGame):
 
         # Atomically deduct bet; returns False if wallet has insufficient funds
         if not self.casino.update_wallet(player, -amount_cents):
-            balance = self.casino.get_wallet(player)
+            balance = self.casino.get_wallet(player, committed=True)
             raise InsufficientFundsError(player, balance, amount_cents)
 
         self.bets[player.name] = amount_cents
@@ -444,23 +462,17 @@ class Blackjack(CardGame):
         logging.info(f"[{self.game_id[:8]}] {_player_label(player)} bets ${format_cents(amount_cents)}")
         self._notify_table_event(f"{player} bet ${format_cents(amount_cents)}")
 
-        # Output bet (NPC balance hidden)
-        if player.is_npc:
-            self.output(f"💵 {player} throws ${format_cents(amount_cents)} on the table.")
-        else:
-            new_balance = self.casino.get_wallet(player)
-            self.output(
-                f"💵 {player} throws ${format_cents(amount_cents)} on the table. "
-                f"💰 Wad: ${format_cents(new_balance)}"
-            )
+        self.emit('bet_placed', player=player.name, amount_cents=amount_cents,
+                  balance_cents=self._balance_for_display(player))
 
     def new_hand(self):
         if not self.players:
             raise CardGameError("No players")
-        self._dirty = True
+        self._run_steps(self._new_hand_steps())
 
-        self.output("🃏 The dealer shuffles and deals...")
-        self.output(f"🎲 At the table: {', '.join([_player_label(x) for x in self.players])}")
+    def _new_hand_steps(self):
+        self.emit('hand_started', players=[{'name': p.name, 'npc_type': getattr(p, 'npc_type', None)}
+                                           for p in self.players])
 
         for player in self.players:
             self.discard_all(player)
@@ -472,14 +484,12 @@ class Blackjack(CardGame):
         for player in self.players:
             self.deal(player, 2)
 
-        self.output(f"👀 Dealer's showing {self.dealer.hand[0]}")
+        self.emit('dealer_showing', card=card_to_str(self.dealer.hand[0]))
 
         if self.get_score(self.dealer) == 21:
             for player in self.players:
-                self.output(f"🎴 {player} has {player.hand_str()}")
-            self.output(
-                f"🎰 Dealer flips {self.dealer.hand[1]}. Blackjack! House wins."
-            )
+                self.emit('hand_dealt', player=player.name, cards=serialize_hand(player.hand), score=None)
+            self.emit('dealer_blackjack', card=card_to_str(self.dealer.hand[1]))
             logging.info(
                 f"[{self.game_id[:8]}] Hand begins — dealer blackjack {self.dealer.hand_str()} | "
                 + " | ".join(f"{_player_label(p)}: {p.hand_str()} ({self.get_score(p)})" for p in self.players)
@@ -497,24 +507,28 @@ class Blackjack(CardGame):
         )
 
         for player in self.players:
-            self.output(f"🎴 {player} has {player.hand_str()} ({self.get_score(player)})")
+            self.emit('hand_dealt', player=player.name, cards=serialize_hand(player.hand),
+                      score=self.get_score(player))
 
-        self._pause(self.DRAMATIC_PAUSE)
+        yield self._pause(self.DRAMATIC_PAUSE)
+        # The first player may have acted or left while the table paused
+        if self.state != HandState.PLAYING or self.current_player_idx != 0:
+            return
         first_player = self.players[0]
-        self.output(f"👉 {first_player}, you're up, partner. Hit or stand?")
+        self.emit('your_turn', player=first_player.name)
 
     def _resolve_player(self, player, departed=False):
         """Resolve a single player's hand against the dealer and update their wallet."""
-        tag = "(already left) " if departed else ""
         bet_amount = self.bets.get(player.name)
         if bet_amount is None:
+            # Already settled: there's nothing left to pay or record
             logging.error(f"Player {player.name} has no bet at resolution time")
-            bet_amount = 0
+            return
 
         won = lost = 0
         outcome_event = None
         if self.get_score(player) > 21:
-            self._output_player_result(player, f"💥 {tag}went bust! ${format_cents(bet_amount)} lost to the house.")
+            self._emit_player_result(player, 'bust', bet_amount, departed)
             logging.info(f"[{self.game_id[:8]}] {_player_label(player)}: bust — loses ${format_cents(bet_amount)}")
             lost = bet_amount
             outcome_event = f"{player} busted and lost ${format_cents(bet_amount)}"
@@ -522,7 +536,7 @@ class Blackjack(CardGame):
             if self.get_score(self.dealer) > 21 or self.get_score(player) > self.get_score(self.dealer):
                 winnings = bet_amount * 2
                 self.casino.update_wallet(player, winnings)
-                self._output_player_result(player, f"🏆 {tag}strikes gold! Payout: ${format_cents(winnings)}")
+                self._emit_player_result(player, 'win', winnings, departed)
                 logging.info(
                     f"[{self.game_id[:8]}] {_player_label(player)}: wins ${format_cents(winnings)}"
                     f" (held {self.get_score(player)} vs dealer {self.get_score(self.dealer)})"
@@ -531,13 +545,11 @@ class Blackjack(CardGame):
                 outcome_event = f"{player} won ${format_cents(winnings)}"
             elif self.get_score(player) == self.get_score(self.dealer):
                 self.casino.update_wallet(player, bet_amount)
-                self._output_player_result(
-                    player, f"🤝 {tag}pushes with the dealer. ${format_cents(bet_amount)} returned."
-                )
+                self._emit_player_result(player, 'push', bet_amount, departed)
                 logging.info(f"[{self.game_id[:8]}] {_player_label(player)}: push at {self.get_score(player)}")
                 outcome_event = f"{player} pushed with the dealer"
             else:
-                self._output_player_result(player, f"❌ {tag}loses to the house. ${format_cents(bet_amount)} gone.")
+                self._emit_player_result(player, 'lose', bet_amount, departed)
                 logging.info(
                     f"[{self.game_id[:8]}] {_player_label(player)}: loses ${format_cents(bet_amount)}"
                     f" (held {self.get_score(player)} vs dealer {self.get_score(self.dealer)})"
@@ -549,16 +561,22 @@ class Blackjack(CardGame):
 
     def end_hand(self):
         """Resolve the hand: compare scores and announce winners."""
-        self._dirty = True
-        self.output("✨ ~*~ The dust settles... ~*~ ✨")
-        self.output(f"Dealer's sitting at {self.get_score(self.dealer)}.")
+        self._run_steps(self._end_hand_steps())
+
+    def _end_hand_steps(self):
+        self.emit('showdown', dealer_score=self.get_score(self.dealer))
         ambient = self._is_ambient()
-        for player in self.players:
-            self._pause(self.RESULT_PAUSE)
-            self._resolve_player(player)
-        for player in self.departed_players:
-            self._pause(self.RESULT_PAUSE)
-            self._resolve_player(player, departed=True)
+        # Snapshot who's being settled: anyone leaving between results moves to
+        # departed_players, and must not be settled twice. Those with no bet
+        # on the table were settled before a restore in the middle of this.
+        to_resolve = ([(p, False) for p in self.players if p.name in self.bets]
+                      + [(p, True) for p in self.departed_players if p.name in self.bets])
+        for player, departed in to_resolve:
+            yield self._pause(self.RESULT_PAUSE)
+            self._resolve_player(player, departed=departed)
+            # Settled bets come off the table right away, so a snapshot saved
+            # mid-resolution can't pay anyone twice on restore.
+            self.bets.pop(player.name, None)
 
         self.bets = {}
         self.departed_players = []
@@ -571,6 +589,7 @@ class Blackjack(CardGame):
             )
         else:
             self.time_between_hands_duration = self.TIME_BETWEEN_HANDS
+        self.emit('hand_over')
         self._roll_npc_departures()
 
     def _npc_departure_chance(self, npc):
@@ -594,8 +613,8 @@ class Blackjack(CardGame):
         self._dirty = True
         self._update_time_last_event()
         self.deal(player)
-        self.output(f"🃏 {player} draws... {player.hand[-1]}")
-        self.output(f"🎴 {player}'s showing {player.hand_str()}")
+        self.emit('card_dealt', player=player.name, card=card_to_str(player.hand[-1]),
+                  cards=serialize_hand(player.hand), score=self.get_score(player))
         logging.info(
             f"[{self.game_id[:8]}] {_player_label(player)} hits — draws {player.hand[-1]},"
             f" hand: {player.hand_str()} ({self.get_score(player)})"
@@ -607,10 +626,10 @@ class Blackjack(CardGame):
         else:
             self._notify_table_event(f"{player} hit, drew {player.hand[-1]}, now at {score}")
         if score == 21:
-            self.output(f"🎯 {player} hits 21!")
+            self.emit('hit_21', player=player.name)
             self.next_turn()
         elif score > 21:
-            self.output(f"💥 {player} busts! Too greedy, partner.")
+            self.emit('bust', player=player.name)
             self.next_turn()
         # else: score < 21, player can hit again
 
@@ -619,7 +638,7 @@ class Blackjack(CardGame):
         self._check_turn(player)
         self._dirty = True
         self._update_time_last_event()
-        self.output(f"✋ {player} stands pat.")
+        self.emit('stand', player=player.name, score=self.get_score(player))
         logging.info(f"[{self.game_id[:8]}] {_player_label(player)} stands at {self.get_score(player)}")
         self._notify_table_event(f"{player} stood at {self.get_score(player)}")
         self.next_turn()
@@ -645,8 +664,8 @@ class Blackjack(CardGame):
             self.current_player_idx = None
         elif not self.players[self.current_player_idx].is_npc:
             player = self.players[self.current_player_idx]
-            self.output(f"🎴 {player}'s got {player.hand_str()} ({self.get_score(player)})")
-            self.output(f"👉 {player}, you're up, partner. Hit or stand?")
+            self.emit('your_turn', player=player.name, cards=serialize_hand(player.hand),
+                      score=self.get_score(player))
 
     def get_score(self, player):
         sorted_hand = sorted(player.hand, key=lambda card: card.value)
@@ -668,33 +687,35 @@ class Blackjack(CardGame):
         """Execute dealer's play: hit until 17 or higher."""
         if self.state != HandState.DEALER_TURN:
             raise CardGameError("Not dealer's turn")
-        self._dirty = True
+        self._run_steps(self._dealer_turn_steps())
 
-        self.output(f"👀 Dealer's showing {self.dealer.hand[0]}.")
-        self.output("🔄 Dealer flips the hole card...")
-        self._pause(self.DEALER_CARD_PAUSE)
-        self.output(f"🎴 Dealer's got {self.dealer.hand_str()}")
+    def _dealer_turn_steps(self):
+        self.emit('dealer_showing', card=card_to_str(self.dealer.hand[0]))
+        self.emit('hole_card')
+        yield self._pause(self.DEALER_CARD_PAUSE)
+        self.emit('dealer_hand', cards=serialize_hand(self.dealer.hand), score=self.get_score(self.dealer))
         logging.info(f"[{self.game_id[:8]}] Dealer reveals {self.dealer.hand_str()} ({self.get_score(self.dealer)})")
 
         while self.get_score(self.dealer) < 17:
-            self._pause(self.DEALER_CARD_PAUSE)
+            yield self._pause(self.DEALER_CARD_PAUSE)
             self.deal(self.dealer)
-            self.output(f"🃏 Dealer draws... {self.dealer.hand[-1]}")
+            self.emit('card_dealt', player=None, card=card_to_str(self.dealer.hand[-1]),
+                      cards=serialize_hand(self.dealer.hand), score=self.get_score(self.dealer))
             logging.info(
                 f"[{self.game_id[:8]}] Dealer draws {self.dealer.hand[-1]}"
                 f" → {self.dealer.hand_str()} ({self.get_score(self.dealer)})"
             )
 
         if self.get_score(self.dealer) == 21:
-            self.output("🎯 Dealer hits 21!")
+            self.emit('hit_21', player=None)
             logging.info(f"[{self.game_id[:8]}] Dealer hits 21")
             self._notify_table_event("the dealer hit 21")
         elif self.get_score(self.dealer) > 21:
-            self.output("💥 Dealer busts! The house crumbles!")
+            self.emit('bust', player=None)
             logging.info(f"[{self.game_id[:8]}] Dealer busts at {self.get_score(self.dealer)}")
             self._notify_table_event(f"the dealer busted at {self.get_score(self.dealer)}")
         else:
-            self.output(f"✋ Dealer stands at {self.get_score(self.dealer)}.")
+            self.emit('stand', player=None, score=self.get_score(self.dealer))
             logging.info(f"[{self.game_id[:8]}] Dealer stands at {self.get_score(self.dealer)}")
             self._notify_table_event(f"the dealer stood at {self.get_score(self.dealer)}")
 
@@ -730,9 +751,50 @@ class Blackjack(CardGame):
                     raise CardGameError("Bet amount is required")
                 self.bet(player, data['amount'])
 
+    def next_deadline(self):
+        """When tick() next has something to do, as a time.time() timestamp.
+
+        Returns None while the table can only be moved on by a player (nobody
+        seated in WAITING) or by an NPC's background decision landing, which
+        the casino is told about separately. Lets the casino sleep until the
+        earliest deadline across its tables rather than ticking every table
+        on a fixed poll.
+        """
+        now = time.time()
+        if self._continuation is not None:
+            return self._continuation_at
+
+        if self.state == HandState.WAITING:
+            if self.players or (self.players_waiting and self.time_first_player_joined is None):
+                return now
+            if self.players_waiting:
+                return self.time_first_player_joined + self.TIME_WAIT_FOR_PLAYERS
+            return None
+        elif self.state == HandState.BETTING:
+            if not self.players or all(p.name in self.bets for p in self.players):
+                return now
+            if any(p.is_npc and p.name not in self.bets and not p.decision_pending for p in self.players):
+                return now
+            return self.time_betting_started + self.TIME_FOR_BETTING
+        elif self.state == HandState.PLAYING:
+            current_player = self.players[self.current_player_idx]
+            if current_player.is_npc:
+                return None if current_player.decision_pending else now
+            return self.time_last_event + self.PERIOD_REMINDER_PLAYER_TURN
+        elif self.state == HandState.BETWEEN_HANDS:
+            return self.time_last_hand_ended + self.time_between_hands_duration
+        # DEALER_TURN and RESOLVING move on at the next tick
+        return now
+
     def tick(self):
         logging.debug(f"tick: state={self.state.value}")
 
+        # Finish any paced output before the state machine moves on
+        if self._continuation is not None:
+            if time.time() >= self._continuation_at:
+                self._run_steps(self._continuation)
+            return
+
         if self.state == HandState.WAITING:
             self._tick_waiting()
         elif self.state == HandState.BETTING:
@@ -756,14 +818,14 @@ class Blackjack(CardGame):
             if self.time_first_player_joined is None:
                 self.time_first_player_joined = time.time()
                 if self.TIME_WAIT_FOR_PLAYERS > 0:
-                    self.output(f"🕐 Betting starts in {self.TIME_WAIT_FOR_PLAYERS} seconds — get your chips ready!")
+                    self.emit('betting_soon', seconds=self.TIME_WAIT_FOR_PLAYERS)
             if time.time() >= self.time_first_player_joined + self.TIME_WAIT_FOR_PLAYERS:
                 self.start_betting()
 
     def _tick_betting(self):
         """Handle BETTING state: wait for bets or timeout."""
         if not self.players:
-            self.output("🌵 The table's gone quiet... everyone's vamoosed.")
+            self.emit('table_empty', phase='betting')
             self._dirty = True
             self.state = HandState.WAITING
             self.time_first_player_joined = None
@@ -777,13 +839,17 @@ class Blackjack(CardGame):
                 if wallet < self.MIN_BET:
                     broke_npcs.append(player)
                     continue
+                # Winnings that haven't committed yet can't be staked
+                wallet = self.casino.get_wallet(player, committed=True)
+                if wallet < self.MIN_BET:
+                    continue
                 amount = player.decide_bet(self.MIN_BET, self.MAX_BET, wallet)
                 if amount is None:
                     logging.info(f"[{self.game_id[:8]}] NPC {player.name}: bet pending (LLM thinking)")
                     continue
                 quip = getattr(player, 'last_quip', None)
                 if quip:
-                    self.output(f"🤠 {player.name}: \"{quip}\"")
+                    self.emit('quip', player=player.name, text=quip)
                     self._notify_table_event(f'{player.name} said: "{quip}"')
                     player.last_quip = None
                 amount = max(self.MIN_BET, min(amount, self.MAX_BET, int(wallet)))
@@ -802,20 +868,20 @@ class Blackjack(CardGame):
             if all_bet:
                 logging.info(f"[{self.game_id[:8]}] All {len(self.players)} players bet — starting hand")
             if time_expired and not all_bet:
-                self.output("⏰ Time's up! The clock don't wait for nobody.")
+                self.emit('betting_closed')
                 logging.info(f"[{self.game_id[:8]}] Betting timeout — {len(self.bets)}/{len(self.players)} players bet")
                 # Players who didn't bet sit out this hand but stay at the table —
                 # park them in players_waiting so they're picked up again next hand
                 # without having to rejoin.
                 players_without_bets = [p for p in self.players if p.name not in self.bets]
                 for player in players_without_bets:
-                    self.output(f"⏭️ {player} didn't put up any coin. They're sittin' this one out.")
+                    self.emit('sitting_out', player=player.name)
                 self._dirty = True
                 self.players = [p for p in self.players if p.name in self.bets]
                 self.players_waiting.extend(players_without_bets)
 
             if not self.players:
-                self.output("⏸️ Nobody's got skin in the game. Dealer waits...")
+                self.emit('no_bets')
                 self._dirty = True
                 self.state = HandState.WAITING
                 return
@@ -837,7 +903,7 @@ class Blackjack(CardGame):
                 return
             quip = getattr(current_player, 'last_quip', None)
             if quip:
-                self.output(f"🤠 {current_player.name}: \"{quip}\"")
+                self.emit('quip', player=current_player.name, text=quip)
                 self._notify_table_event(f'{current_player.name} said: "{quip}"')
                 current_player.last_quip = None
             if action == "hit":
@@ -848,14 +914,17 @@ class Blackjack(CardGame):
 
         # Remind current player if they're taking too long
         if time.time() > self.time_last_event + self.PERIOD_REMINDER_PLAYER_TURN:
-            self.output(f"⏱️ Hey {current_player}! We ain't got all day. Hit or stand?")
+            self.emit('turn_reminder', player=current_player.name)
             self._update_time_last_event()
 
     def _tick_dealer_turn(self):
         """Handle DEALER_TURN state: execute dealer's turn."""
-        self.output("👁️ All eyes on the dealer...")
-        self._pause(self.DRAMATIC_PAUSE)
-        self.dealer_turn()
+        self._run_steps(self._tick_dealer_turn_steps())
+
+    def _tick_dealer_turn_steps(self):
+        self.emit('dealer_turn')
+        yield self._pause(self.DRAMATIC_PAUSE)
+        yield from self._dealer_turn_steps()
 
     def _tick_resolving(self):
         """Handle RESOLVING state: resolve the hand."""
@@ -888,8 +957,9 @@ class Blackjack(CardGame):
         }
 
     @classmethod
-    def from_dict(cls, data, casino, on_npc_departed=None):
-        """Restore game from serialized state."""
+    def from_dict(cls, data, casino, on_npc_departed=None, npcs=None):
+        """Restore game from serialized state. npcs is passed on to
+        deserialize_player()."""
         game = cls(data['game_id'], casino, on_npc_departed=on_npc_departed)
 
         # Restore state
@@ -920,9 +990,9 @@ class Blackjack(CardGame):
         game.dealer.hand = deserialize_hand(data['dealer_hand'])
 
         # Restore players
-        game.players = [deserialize_player(p, casino) for p in data['players']]
-        game.players_waiting = [deserialize_player(p, casino) for p in data['players_waiting']]
-        game.departed_players = [deserialize_player(p, casino) for p in data.get('departed_players', [])]
+        game.players = [deserialize_player(p, casino, npcs) for p in data['players']]
+        game.players_waiting = [deserialize_player(p, casino, npcs) for p in data['players_waiting']]
+        game.departed_players = [deserialize_player(p, casino, npcs) for p in data.get('departed_players', [])]
 
         # Restore bets
         game.bets = data['bets'].copy()
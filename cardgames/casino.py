@@ -1,19 +1,33 @@
+import asyncio
+import functools
+import heapq
 import json
 import logging
+import math
 import os
 import random
 import time
 import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 import redis
+import redis.asyncio
 
 from .blackjack import Blackjack, HandState, deserialize_hand
 from .card_game import CardGameError
+from .command_stream import COMMAND_GROUP, COMMAND_STREAM, send_command
+from .leases import LEASE_TTL_MS, GameLeases, shard_stream
 from .llm_client import create_llm_client, LLMError
 from .llm_npc import LLMBlackjackNPC, MEMORY_RECALL_BY_DETAIL
 from .money import format_cents
-from .personalities import get_personality, get_random as get_random_personality
+from .rpc import RpcServer
+from .personalities import get_all_names as get_personality_names, get_personality, get_random as get_random_personality
 from .simple_npc import SimpleBlackjackNPC
+from .snapshot_codec import PACKED_FIELDS
+from .unit_of_work import UnitOfWork
 from wwnames.wwnames import WildWestNames
 
 NPC_TYPES = {
@@ -32,7 +46,34 @@ AUTOFILL_INTERVAL = 15         # seconds between autofill checks per game
 MAX_MEMORIES_PER_NPC = 20      # npc_memories retention cap, pruned on insert
 SESSION_MEMORY_MIN_EVENTS = 3  # skip condensation for sessions shorter than this
 
+LISTEN_MAX_SLEEP = 30.0    # max seconds serve() sleeps when no table has anything due
+LISTEN_BATCH_MAX = int(os.environ.get("LISTEN_BATCH_MAX", "100"))  # messages applied per tick, at most
+DB_EXECUTOR_WORKERS = 1    # one writer keeps game snapshots landing in order
+
+# Each casino process is a shard, owning the games it holds leases on (see
+# leases.py). The id names its command stream and its consumer on the shared
+# one, so it should be stable across restarts: a restarted shard picks its
+# own leases and unacknowledged commands back up.
+SHARD_ID = os.environ.get("CASINO_SHARD", "casino-1")
+LEASE_RENEW_INTERVAL = LEASE_TTL_MS / 3000  # seconds between lease renewals and load heartbeats
+LEASE_SWEEP_INTERVAL = 10             # seconds between looks for games and commands left by dead shards
+SHARD_MAX_HOPS = 3                    # forwards between shards before a command is applied wherever it is
+COMMAND_BLOCK_MS = 5000               # longest a stream read blocks before checking for reclaims
+COMMAND_RECLAIM_INTERVAL = 30         # seconds between sweeps for other consumers' stalled commands
+COMMAND_RECLAIM_IDLE_MS = 60000       # a command unacknowledged this long is taken over
+COMMAND_DEDUP_TTL = 86400             # seconds an applied command_id is remembered in Redis
+COMMAND_DEDUP_MEMORY = 10000          # applied command_ids remembered in-process
+TICK_ERROR_RETRY = 1.0     # seconds before re-ticking a game whose tick raised
+
 WALLET_REPLENISH_INTERVAL = int(os.environ.get("WALLET_REPLENISH_INTERVAL", "300"))
+# Wallet balances are cached in-process and kept in step with this process's
+# own writes; the TTL bounds how stale a balance can get when another shard
+# moves the same user's money (the DB still refuses any overdraft).
+WALLET_CACHE_TTL = 60.0
+# A table's flushes append what changed to its journal; every this many
+# entries the next flush writes a whole snapshot (a checkpoint) instead.
+JOURNAL_CHECKPOINT_ENTRIES = 100
+RESTORE_PAGE_SIZE = 200  # games loaded per query when restoring from the database
 LLM_HEALTHCHECK_INTERVAL = int(os.environ.get("LLM_HEALTHCHECK_INTERVAL", "300"))
 REPLENISH_PROB_MIN = 0.15         # chance per cycle at the low wealth reference point
 REPLENISH_PROB_RANGE = 0.35       # added on top of REPLENISH_PROB_MIN at the high reference point
@@ -67,13 +108,57 @@ def _fame_label(games_played):
     return "notorious gambler"
 
 
+def _seats_a_human(game_data):
+    return any(not seat.get('is_npc') for seat in game_data['players'] + game_data['players_waiting'])
+
+
 class Casino:
-    def __init__(self, redis_host, redis_port, db=None):
+    def __init__(self, redis_host, redis_port, db=None, shard_id=SHARD_ID):
         self.games = {}
+        self.shard_id = shard_id
+        self.redis_host = redis_host
+        self.redis_port = redis_port
         self.redis = redis.Redis(host=redis_host, port=redis_port)
         self.db = db
         self._pending_bots = {}  # game_id -> num_bots to add on first human join
         self._dirty_games = set()  # game_ids pending a DB write
+        self._dormant_games = {}  # game_id -> (game_data, npcs) restored but not yet rebuilt (see _hydrate_game())
+        self._schedule = []  # heap of (deadline, game_id); entries not matching _deadlines are stale
+        self._deadlines = {}  # game_id -> deadline of its live _schedule entry (None: idle)
+        self._ingress_stats = {
+            'batches': 0,         # non-empty batches drained
+            'messages': 0,        # messages drained in total
+            'last_batch': 0,
+            'max_batch': 0,
+            'capped_batches': 0,  # batches cut off at LISTEN_BATCH_MAX, leaving a backlog
+            'queue_depth': 0,     # messages still queued after the last batch
+            'max_queue_depth': 0,
+        }
+        # Set while serve() is running: its event loop, the event that wakes the
+        # table scheduler early, and the bounded executor for blocking DB work.
+        self._loop = None
+        self._wakeup = None
+        self._db_executor = None
+        self._chores = {}  # chore name -> future while it runs in the background
+        self._flush_lock = asyncio.Lock()  # held while a flush is under way (see _handle_set_wallet())
+        self._spawning = {}  # game_id -> NPCs being drafted for it off the loop
+        self._spawns = set()  # their tasks
+        self._new_channels = {}  # game_id -> (guild_id, channel_id) to record once the game is saved
+        self._watched_decisions = weakref.WeakSet()  # NPC decision futures with a wake-up attached
+        self._applied_commands = OrderedDict()  # command_id -> None, oldest first
+        # Table output waiting for the end of the pass: game_id -> events, in
+        # order, published as one frame per table (see _flush_output()).
+        self._outbox = {}
+        self._finished_tables = set()  # tables whose game_over follows their last frame
+        self._output_stats = {'frames': 0, 'events': 0, 'flushes': 0}
+        # Set while serve() is running: this shard's game leases. Leases for
+        # games created or deleted during a pass are taken/handed back after it.
+        self.leases = None
+        self._unleased_games = set()
+        self._released_games = set()
+        self._dead_shards = set()  # shards whose leftover commands are still to be taken over
+        self._last_lease_renewal = 0
+        self._last_lease_sweep = 0
         self._llm_client = None
         self._llm_client_tried = False
         self._name_generator = WildWestNames()
@@ -82,6 +167,38 @@ class Casino:
         self._last_autofill = {}  # game_id -> timestamp of last autofill check
         self._last_wallet_replenish = 0
         self._last_llm_healthcheck = 0
+        self._wallets = {}  # ('player', username) or ('npc', npc_db_id) -> (balance in cents, expiry)
+        self._wallet_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        # Wallet credits and stats a table makes while its commands are
+        # applied and it ticks wait here for its next snapshot, and commit
+        # with it (see unit_of_work.py).
+        self._pending_writes = {}     # game_id -> UnitOfWork
+        self._writes_for = None       # the game_id whose writes are being collected, if any
+        self._unflushed_credits = {}  # wallet key -> cents credited but not yet committed
+        # The games whose writes the flush under way holds; a game dropped
+        # meanwhile leaves it, so they're thrown away if the commit fails
+        self._writes_in_flight = set()
+        self._write_stats = {'commits': 0, 'deferred_writes': 0, 'failed_commits': 0,
+                             'checkpoints': 0, 'journaled_snapshots': 0, 'skipped_snapshots': 0}
+        # A flush journals only what changed since a table's last save: each
+        # table's snapshot as last committed, and those of the flush under way.
+        self._saved_snapshots = {}     # game_id -> to_dict() as last saved
+        self._flushing_snapshots = {}  # game_id -> to_dict() being written
+        self._journal_lengths = {}     # game_id -> journal entries since its last checkpoint
+        self.rpc = RpcServer(self.publish_event)
+        self._register_rpc_handlers()
+
+    def _register_rpc_handlers(self):
+        """Casino actions answered with a reply on casino_update (see rpc.py)."""
+        self.rpc.register('new_game', 'new_game', self._handle_new_game)
+        self.rpc.register('list_games', 'list_games', self._handle_list_games)
+        self.rpc.register('get_usage', 'usage_stats', self._handle_get_usage)
+        self.rpc.register('get_debug', 'debug_state', self._handle_get_debug)
+        self.rpc.register('get_stats', 'player_stats', self._handle_get_stats, required=('player',))
+        self.rpc.register('get_wallet', 'player_wallet', self._handle_get_wallet, required=('player',))
+        self.rpc.register('lookup_wallet', 'wallet_info', self._handle_lookup_wallet, required=('target',))
+        self.rpc.register('set_wallet', 'wallet_set', self._handle_set_wallet, required=('target',))
+        self.rpc.register('npc_limits', 'npc_limits', self._handle_npc_limits)
 
     @property
     def llm_client(self):
@@ -131,14 +248,51 @@ class Casino:
             except Exception:
                 pass  # still unavailable; already logged when it first failed
 
-    def get_wallet(self, player):
-        """Get a player's wallet balance in cents (routes to users or npcs table)."""
-        if self.db is None:
-            return 0
+    @staticmethod
+    def _wallet_key(player):
+        """The wallet a player's money lives in: ('npc', npc_db_id) or ('player', username)."""
         npc_db_id = getattr(player, 'npc_db_id', None)
         if getattr(player, 'is_npc', False) and npc_db_id is not None:
-            return self.db.get_npc_wallet(npc_db_id) or 0
-        return self.db.get_user_wallet(player.name) or 0
+            return ('npc', npc_db_id)
+        return ('player', player.name)
+
+    def _read_wallet(self, kind, ref):
+        """A wallet's balance in cents, from the cache if it's there and
+        fresh, else from the DB. None if there's no such wallet."""
+        cached = self._wallets.get((kind, ref))
+        if cached is not None and cached[1] > time.monotonic():
+            self._wallet_stats['hits'] += 1
+            return cached[0]
+        self._wallet_stats['misses'] += 1
+        balance = self.db.get_npc_wallet(ref) if kind == 'npc' else self.db.get_user_wallet(ref)
+        if balance is not None:
+            balance += self._unflushed_credits.get((kind, ref), 0)
+        if balance is None:
+            self._wallets.pop((kind, ref), None)
+        else:
+            self._wallets[(kind, ref)] = (balance, time.monotonic() + WALLET_CACHE_TTL)
+        return balance
+
+    def invalidate_wallet(self, kind, ref):
+        """Forget a cached balance, so the next read goes to the DB. Call
+        after changing a wallet other than through update_wallet()."""
+        if self._wallets.pop((kind, ref), None) is not None:
+            self._wallet_stats['invalidations'] += 1
+
+    def get_wallet(self, player, committed=False):
+        """Get a player's wallet balance in cents (routes to users or npcs table).
+
+        committed leaves out credits still waiting to commit with their
+        table's snapshot: it's the balance a debit is checked against, as
+        those credits may yet fail to commit.
+        """
+        if self.db is None:
+            return 0
+        key = self._wallet_key(player)
+        balance = self._read_wallet(*key) or 0
+        if committed:
+            balance = max(0, balance - self._unflushed_credits.get(key, 0))
+        return balance
 
     def update_wallet(self, player, amount_cents):
         """Update a player's wallet by an amount in cents (routes to users or npcs table).
@@ -147,10 +301,31 @@ class Casino:
         """
         if self.db is None:
             return True
-        npc_db_id = getattr(player, 'npc_db_id', None)
-        if getattr(player, 'is_npc', False) and npc_db_id is not None:
-            return self.db.update_npc_wallet(npc_db_id, amount_cents)
-        return self.db.update_wallet(player.name, amount_cents)
+        key = self._wallet_key(player)
+        writes = self._collecting_writes() if amount_cents > 0 else None
+        if writes is not None:
+            # A credit can't be refused, so it waits to commit with the table's snapshot
+            writes.credit(*key, amount_cents)
+            self._unflushed_credits[key] = self._unflushed_credits.get(key, 0) + int(amount_cents)
+            cached = self._wallets.get(key)
+            if cached is not None:
+                self._wallets[key] = (cached[0] + int(amount_cents), cached[1])
+            return True
+        try:
+            if key[0] == 'npc':
+                ok = self.db.update_npc_wallet(key[1], amount_cents)
+            else:
+                ok = self.db.update_wallet(key[1], amount_cents)
+        except Exception:
+            self.invalidate_wallet(*key)
+            raise
+        cached = self._wallets.get(key)
+        if ok and cached is not None:
+            self._wallets[key] = (cached[0] + int(amount_cents), cached[1])
+        elif not ok:
+            # Refused as an overdraft: the cached balance was evidently wrong
+            self.invalidate_wallet(*key)
+        return ok
 
     def _log_usage(self, purpose, model, input_tokens, output_tokens, npc_id=None, game_id=None):
         """Write an LLM usage record to DB. Silently ignores failures."""
@@ -205,6 +380,10 @@ class Casino:
         """Record a hand outcome (in cents) for a human player. Fire-and-forget; ignores failures."""
         if getattr(player, 'is_npc', False) or self.db is None:
             return
+        writes = self._collecting_writes()
+        if writes is not None:
+            writes.record_hand(player.name, won_cents, lost_cents)
+            return
         try:
             self.db.update_player_stats(player.name, won_cents=won_cents, lost_cents=lost_cents)
         except Exception as e:
@@ -232,38 +411,83 @@ class Casino:
             logging.warning(f"Error resolving wallet target {name!r} as NPC: {e}")
         return (None, None)
 
-    def _handle_lookup_wallet(self, request_id, target):
-        """Handle a lookup_wallet request: search users then NPCs and publish wallet_info."""
-        kind, ref = self._resolve_wallet_target(target)
+    def _run_db(self, fn, *args):
+        """Run blocking DB work on the DB executor, to be awaited on the loop."""
+        return asyncio.get_running_loop().run_in_executor(self._db_executor, fn, *args)
+
+    async def _read_wallet_async(self, kind, ref):
+        """_read_wallet() for calls answered beside the tables: a cache miss
+        reads the DB on the executor. The balance read isn't cached, as a
+        flush may commit credits still counted as unflushed meanwhile."""
+        cached = self._wallets.get((kind, ref))
+        if cached is not None and cached[1] > time.monotonic():
+            self._wallet_stats['hits'] += 1
+            return cached[0]
+        self._wallet_stats['misses'] += 1
+        balance = await self._run_db(self.db.get_npc_wallet if kind == 'npc' else self.db.get_user_wallet, ref)
+        if balance is None:
+            return None
+        return balance + self._unflushed_credits.get((kind, ref), 0)
+
+    async def _handle_lookup_wallet(self, request):
+        """Answer a lookup_wallet call: search users then NPCs for the target's wallet."""
+        target = request['target']
+        kind, ref = await self._run_db(self._resolve_wallet_target, target)
         balance = None
-        if kind == 'player':
+        if kind is not None:
             try:
-                balance = self.db.get_user_wallet(ref)
+                balance = await self._read_wallet_async(kind, ref)
             except Exception as e:
-                logging.error(f"Error getting player wallet for {target}: {e}")
-        elif kind == 'npc':
-            try:
-                balance = self.db.get_npc_wallet(ref)
-            except Exception as e:
-                logging.error(f"Error getting NPC wallet for {target}: {e}")
-
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'wallet_info',
-                'request_id': request_id,
-                'target': target,
-                'kind': kind,
-                'balance_cents': balance,
-            }
-        )
-
-    def _handle_set_wallet(self, request_id, target, mode, amount_cents):
-        """Handle a set_wallet request: resolve target, apply change, publish wallet_set.
-
-        amount_cents is in cents.
-        """
-        kind, ref = self._resolve_wallet_target(target)
+                logging.error(f"Error getting {kind} wallet for {target}: {e}")
+
+        return {'target': target, 'kind': kind, 'balance_cents': balance}
+
+    def _drop_unflushed_credits(self, kind, ref):
+        """Forget the credits to a wallet that tables are still holding for
+        their next snapshot: a balance set outright replaces them, and they'd
+        otherwise land on top of it. Call holding _flush_lock, so that every
+        such credit is in _pending_writes. Returns {game_id: cents dropped}."""
+        dropped = {}
+        for game_id, writes in self._pending_writes.items():
+            cents = writes.drop_credit(kind, ref)
+            if cents:
+                dropped[game_id] = cents
+        self._unflushed_credits.pop((kind, ref), None)
+        return dropped
+
+    def _restore_unflushed_credits(self, kind, ref, dropped):
+        """Put back credits _drop_unflushed_credits() took, when the balance
+        they were dropped for couldn't be set."""
+        for game_id, cents in dropped.items():
+            writes = self._pending_writes.get(game_id)
+            if writes is None:
+                writes = self._pending_writes[game_id] = UnitOfWork()
+            writes.credit(kind, ref, cents)
+            self._unflushed_credits[(kind, ref)] = self._unflushed_credits.get((kind, ref), 0) + cents
+
+    def _write_wallet(self, kind, ref, mode, amount_cents, target):
+        """Set ('set') or adjust ('adjust') a wallet in the DB. Blocking.
+        Returns True on success; False if it failed or, adjusting, would
+        have gone negative."""
+        try:
+            if mode == 'set':
+                if kind == 'player':
+                    return self.db.set_user_wallet(ref, amount_cents)
+                return self.db.set_npc_wallet(ref, amount_cents)
+            if kind == 'player':
+                return self.db.update_wallet(ref, amount_cents)
+            return self.db.update_npc_wallet(ref, amount_cents)
+        except Exception as e:
+            logging.error(f"Error {'setting' if mode == 'set' else 'adjusting'} wallet for {target}: {e}")
+            return False
+
+    async def _handle_set_wallet(self, request):
+        """Answer a set_wallet call: resolve the target and set or adjust
+        their wallet by the call's amount, in cents."""
+        target = request['target']
+        mode = request.get('mode', 'set')
+        amount_cents = request.get('amount', 0)
+        kind, ref = await self._run_db(self._resolve_wallet_target, target)
         ok = False
         message = ''
         new_balance = None
@@ -274,30 +498,25 @@ class Casino:
             if amount_cents < 0:
                 message = "Cannot set wallet to a negative amount."
             else:
-                try:
-                    if kind == 'player':
-                        ok = self.db.set_user_wallet(ref, amount_cents)
-                    else:
-                        ok = self.db.set_npc_wallet(ref, amount_cents)
-                except Exception as e:
-                    logging.error(f"Error setting wallet for {target}: {e}")
+                # No flush may start until the set lands: credits it took
+                # with it would commit on one side of the set or the other
+                async with self._flush_lock:
+                    dropped = self._drop_unflushed_credits(kind, ref)
+                    ok = await self._run_db(self._write_wallet, kind, ref, mode, amount_cents, target)
+                    if not ok:
+                        self._restore_unflushed_credits(kind, ref, dropped)
+                self.invalidate_wallet(kind, ref)
                 if ok:
                     new_balance = int(amount_cents)
                     message = f"Wallet set to ${format_cents(amount_cents)}."
                 else:
                     message = "Failed to update wallet."
         elif mode == 'adjust':
-            try:
-                if kind == 'player':
-                    ok = self.db.update_wallet(ref, amount_cents)
-                else:
-                    ok = self.db.update_npc_wallet(ref, amount_cents)
-            except Exception as e:
-                logging.error(f"Error adjusting wallet for {target}: {e}")
+            ok = await self._run_db(self._write_wallet, kind, ref, mode, amount_cents, target)
+            self.invalidate_wallet(kind, ref)
             if ok:
                 try:
-                    new_balance = (self.db.get_user_wallet(ref) if kind == 'player'
-                                   else self.db.get_npc_wallet(ref))
+                    new_balance = await self._read_wallet_async(kind, ref)
                 except Exception:
                     pass
                 sign = '+' if amount_cents >= 0 else '-'
@@ -308,58 +527,39 @@ class Casino:
         else:
             message = f"Unknown mode '{mode}'."
 
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'wallet_set',
-                'request_id': request_id,
-                'target': target,
-                'kind': kind,
-                'new_balance_cents': new_balance,
-                'ok': ok,
-                'message': message,
-            }
-        )
+        return {
+            'target': target,
+            'kind': kind,
+            'new_balance_cents': new_balance,
+            'ok': ok,
+            'message': message,
+        }
 
-    def _handle_get_stats(self, request_id, player_name):
-        """Handle a get_stats request: query DB and publish player stats."""
+    async def _handle_get_stats(self, request):
+        """Answer a get_stats call with the player's stats from the DB."""
+        player_name = request['player']
         stats = None
         if self.db is not None:
             try:
-                stats = self.db.get_player_stats(player_name)
+                stats = await self._run_db(self.db.get_player_stats, player_name)
                 if stats:
                     stats['fame'] = _fame_label(stats['games_played'])
             except Exception as e:
                 logging.error(f"Error getting player stats for {player_name}: {e}")
 
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'player_stats',
-                'request_id': request_id,
-                'player': player_name,
-                'stats': stats,
-            }
-        )
+        return {'player': player_name, 'stats': stats}
 
-    def _handle_get_wallet(self, request_id, player_name):
-        """Handle a get_wallet request: query DB and publish user wallet balance."""
+    async def _handle_get_wallet(self, request):
+        """Answer a get_wallet call with the user's wallet balance."""
+        player_name = request['player']
         balance = None
         if self.db is not None:
             try:
-                balance = self.db.get_user_wallet(player_name)
+                balance = await self._read_wallet_async('player', player_name)
             except Exception as e:
                 logging.error(f"Error getting wallet for {player_name}: {e}")
 
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'player_wallet',
-                'request_id': request_id,
-                'player': player_name,
-                'balance_cents': balance,
-            }
-        )
+        return {'player': player_name, 'balance_cents': balance}
 
     def _make_table_context_fn(self, game_id, npc_name):
         """Return a callable that yields other players at the table when invoked."""
@@ -400,23 +600,32 @@ class Casino:
             return []
 
     def _load_npc_limits(self):
-        """Load npc_autofill_min/max from settings, clamping to valid range."""
+        """Read npc_autofill_min/max from settings, clamped to the valid
+        range. Touches only the database; returns (min, max), or None if
+        they can't be read. _set_npc_limits() applies them."""
         if self.db is None:
-            return
+            return None
         try:
             raw_min = self.db.get_setting('npc_autofill_min')
             raw_max = self.db.get_setting('npc_autofill_max')
             npc_min = int(raw_min) if raw_min is not None else DEFAULT_NPC_AUTOFILL_MIN
             npc_max = int(raw_max) if raw_max is not None else DEFAULT_NPC_AUTOFILL_MAX
-            npc_min = max(0, min(npc_min, MAX_NPCS_PER_TABLE))
-            npc_max = max(0, min(npc_max, MAX_NPCS_PER_TABLE))
-            if npc_min > npc_max:
-                npc_min = npc_max
-            self.npc_min = npc_min
-            self.npc_max = npc_max
-            logging.info(f"NPC autofill limits loaded: min={npc_min}, max={npc_max}")
         except Exception as e:
             logging.warning(f"Failed to load NPC limits from settings: {e}")
+            return None
+        npc_min = max(0, min(npc_min, MAX_NPCS_PER_TABLE))
+        npc_max = max(0, min(npc_max, MAX_NPCS_PER_TABLE))
+        return min(npc_min, npc_max), npc_max
+
+    def _set_npc_limits(self, limits):
+        """Apply limits from _load_npc_limits(). Returns whether they changed."""
+        if limits is None:
+            return False
+        changed = limits != (self.npc_min, self.npc_max)
+        self.npc_min, self.npc_max = limits
+        log = logging.info if changed else logging.debug
+        log(f"NPC autofill limits loaded: min={self.npc_min}, max={self.npc_max}")
+        return changed
 
     def _ensure_npc_roster(self):
         """Fill the NPC roster up to MIN_NPC_ROSTER if it's below that threshold."""
@@ -469,24 +678,40 @@ class Casino:
 
         return available[:n]
 
-    def _load_games_from_db(self):
-        """Load all active games from database on startup."""
+    def _load_games_from_db(self, game_ids=None):
+        """Load active games from database on startup.
+
+        game_ids limits the restore to the games this shard holds leases on;
+        None restores every game. Tables with a human seated are rebuilt
+        straight away; the rest wait in _dormant_games until their first
+        tick or command.
+        """
         if self.db is None:
             return
 
+        started = time.monotonic()
         try:
-            game_data_list = self.db.load_all_active_games()
-            for game_data in game_data_list:
+            ids = self.db.list_game_ids() if game_ids is None else game_ids
+            for game_data, npcs in self._load_game_pages(ids):
                 game_id = game_data['game_id']
-                game = Blackjack.from_dict(game_data, self, on_npc_departed=self._on_npc_departed)
-                self.games[game_id] = game
-                logging.info(f"Restored game {game_id} in state {game.state.value}")
+                if _seats_a_human(game_data):
+                    self.games[game_id] = self._restore_game(game_data, npcs)
+                else:
+                    self._dormant_games[game_id] = (game_data, npcs)
+                self._wake_game(game_id)
         except Exception as e:
             logging.error(f"Error loading games from database: {e}")
+        logging.info(f"Loaded {len(self.games) + len(self._dormant_games)} game(s) in "
+                     f"{time.monotonic() - started:.2f}s; {len(self._dormant_games)} without humans "
+                     f"will be rebuilt on first use")
 
         # Clear current_game_id for NPCs in games that no longer exist
         try:
-            self.db.clear_stale_npc_games(set(self.games.keys()))
+            if game_ids is None:
+                active = self.games.keys() | self._dormant_games.keys()
+            else:
+                active = set(self.db.list_game_ids())
+            self.db.clear_stale_npc_games(active)
         except Exception as e:
             logging.error(f"Error clearing stale NPC games: {e}")
 
@@ -497,7 +722,80 @@ class Casino:
             logging.error(f"Error ensuring NPC roster: {e}")
 
         # Load persisted NPC autofill limits
-        self._load_npc_limits()
+        self._set_npc_limits(self._load_npc_limits())
+
+    def _load_game_pages(self, game_ids):
+        """(game_data, npcs) for each of the games that exist, loaded
+        RESTORE_PAGE_SIZE games per query along with their journals and
+        seated NPCs."""
+        game_ids = list(game_ids)
+        for start in range(0, len(game_ids), RESTORE_PAGE_SIZE):
+            page = game_ids[start:start + RESTORE_PAGE_SIZE]
+            game_data_list = self._replay_journal(self.db.load_games(page), self.db.load_journal(page))
+            npcs = self._load_seated_npcs(game_data_list)
+            for game_data in game_data_list:
+                yield game_data, npcs
+
+    def _load_seated_npcs(self, game_data_list):
+        """npc_db_id -> (NPC record, recent memories) for every NPC seated at
+        these games, or departed with a bet still to settle: one query for
+        the records and one for the memories, instead of two per seat (see
+        deserialize_player())."""
+        npc_ids = {seat['npc_db_id'] for game_data in game_data_list
+                   for seat in (game_data['players'] + game_data['players_waiting']
+                                + game_data['departed_players'])
+                   if seat.get('npc_db_id') is not None}
+        if not npc_ids:
+            return {}
+        records = self.db.get_npcs_by_ids(npc_ids)
+        memories = {}
+        limit = MEMORY_RECALL_BY_DETAIL.get(SALOON_DETAIL_LEVEL, 1)
+        if limit:
+            try:
+                memories = self.db.get_recent_npc_memories(npc_ids, limit)
+            except Exception as e:
+                logging.error(f"Error loading memories for {len(npc_ids)} NPCs: {e}")
+        return {npc_id: (records.get(npc_id), [m['session_summary'] for m in memories.get(npc_id, [])])
+                for npc_id in npc_ids}
+
+    @staticmethod
+    def _replay_journal(game_data_list, journal):
+        """Bring each game's last checkpoint up to date with the changes
+        journaled since, in order."""
+        for game_data in game_data_list:
+            entries = journal.get(game_data['game_id'], ())
+            for changes in entries:
+                game_data.update(changes)
+            if entries:
+                logging.info(f"Replayed {len(entries)} journal entries for game {game_data['game_id']}")
+        return game_data_list
+
+    def _restore_game(self, game_data, npcs=None):
+        game = Blackjack.from_dict(game_data, self, on_npc_departed=self._on_npc_departed, npcs=npcs)
+        logging.info(f"Restored game {game.game_id} in state {game.state.value}")
+        return game
+
+    def _restore_games(self, game_ids):
+        """Rebuild games taken over from another shard. Runs on the DB
+        executor; the caller installs the returned games on the loop."""
+        games = []
+        for game_data, npcs in self._load_game_pages(game_ids):
+            try:
+                games.append(self._restore_game(game_data, npcs))
+            except Exception as e:
+                logging.error(f"Error restoring game {game_data['game_id']}: {e}")
+        return games
+
+    def _hydrate_game(self, game_id):
+        """The running game for game_id, rebuilt first if it was left
+        dormant at startup; None if there's no such game."""
+        dormant = self._dormant_games.pop(game_id, None)
+        if dormant is not None:
+            try:
+                self.games[game_id] = self._restore_game(*dormant)
+            except Exception as e:
+                logging.error(f"Error restoring game {game_id}: {e}")
+        return self.games.get(game_id)
 
     def _on_npc_departed(self, game, player):
         """Shared hook, fired by Blackjack.leave() whenever an NPC leaves a table —
@@ -508,6 +806,8 @@ class Casino:
                 self.db.clear_npc_game(npc_db_id)
             except Exception as e:
                 logging.error(f"Error clearing NPC game for {player.name}: {e}")
+            # Idle NPCs' wallets are replenished behind the cache's back
+            self.invalidate_wallet('npc', npc_db_id)
         self._condense_npc_session(game.game_id, player)
 
     def _condense_npc_session(self, game_id, npc):
@@ -535,17 +835,218 @@ class Casino:
         except Exception as e:
             logging.error(f"Error saving session memory for NPC {npc_db_id}: {e}")
 
+    @contextmanager
+    def _table_writes(self, game_id):
+        """Collect the wallet credits and stats a table makes in this block
+        into its UnitOfWork, to commit with its next snapshot."""
+        outer, self._writes_for = self._writes_for, game_id
+        try:
+            yield
+        finally:
+            self._writes_for = outer
+
+    def _collecting_writes(self):
+        """The UnitOfWork of the table whose writes are being collected, or
+        None outside _table_writes() (or without a DB): write straight away."""
+        if self._writes_for is None or self.db is None:
+            return None
+        writes = self._pending_writes.get(self._writes_for)
+        if writes is None:
+            writes = self._pending_writes[self._writes_for] = UnitOfWork()
+        self._write_stats['deferred_writes'] += 1
+        return writes
+
     def _mark_dirty(self, game_id):
         """Mark a game as needing a DB write on the next flush."""
         self._dirty_games.add(game_id)
 
+    def _schedule_game(self, game_id, deadline):
+        """Set when a game is next due for a tick; None leaves it idle until woken."""
+        self._deadlines[game_id] = deadline
+        if deadline is not None:
+            heapq.heappush(self._schedule, (deadline, game_id))
+
+    def _wake_game(self, game_id):
+        """Make a game due on the next _tick_games(), e.g. after a player acts."""
+        self._schedule_game(game_id, time.time())
+
+    def _game_deadline(self, game_id, game):
+        """The earliest of the game's own next deadline and the casino's
+        per-table chores (NPC autofill, reaping an idle empty table)."""
+        deadlines = [game.next_deadline()]
+        if game.state in (HandState.WAITING, HandState.BETWEEN_HANDS):
+            all_players = game.players + game.players_waiting
+            spawning = self._spawning.get(game_id, 0)
+            npc_count = sum(1 for p in all_players if getattr(p, 'is_npc', False)) + spawning
+            if ((npc_count < self.npc_min and len(all_players) + spawning < MAX_NPCS_PER_TABLE)
+                    or npc_count > self.npc_max):
+                deadlines.append(self._last_autofill.get(game_id, 0) + AUTOFILL_INTERVAL)
+        if game.state == HandState.WAITING and not game.players and not game.players_waiting:
+            deadlines.append(game.time_last_event + self.EMPTY_GAME_TIMEOUT)
+        deadlines = [d for d in deadlines if d is not None]
+        return min(deadlines) if deadlines else None
+
+    def _next_wake(self):
+        """Earliest time anything in the casino is due: a table's deadline or
+        one of the casino-wide periodic chores."""
+        while self._schedule:
+            deadline, game_id = self._schedule[0]
+            if ((game_id in self.games or game_id in self._dormant_games)
+                    and self._deadlines.get(game_id) == deadline):
+                break
+            heapq.heappop(self._schedule)  # stale entry
+        wakes = []
+        if 'llm_health' not in self._chores:
+            wakes.append(self._last_llm_healthcheck + LLM_HEALTHCHECK_INTERVAL)
+        if self.db is not None and 'replenish' not in self._chores:
+            wakes.append(self._last_wallet_replenish + WALLET_REPLENISH_INTERVAL)
+        if self.leases is not None and 'leases' not in self._chores:
+            wakes.append(self._last_lease_renewal + LEASE_RENEW_INTERVAL)
+        if self._schedule:
+            wakes.append(self._schedule[0][0])
+        return min(wakes, default=time.time() + LISTEN_MAX_SLEEP)
+
+    def _pop_due_games(self, now):
+        """Pop and return the ids of games whose deadline has passed."""
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            deadline, game_id = heapq.heappop(self._schedule)
+            if self._deadlines.get(game_id) == deadline and self._hydrate_game(game_id) is not None:
+                del self._deadlines[game_id]
+                due.append(game_id)
+        return due
+
     def _flush_dirty_games(self):
         """Write all dirty games to DB and clear the dirty set."""
-        if self.db is None or not self._dirty_games:
-            return
-        for game_id in list(self._dirty_games):
-            self._save_game(game_id)
+        snapshots = self._snapshot_dirty_games()
+        if snapshots:
+            channels = self._take_new_channels(snapshots)
+            self._settle_writes(snapshots, self._write_game_snapshots(snapshots, channels), channels)
+
+    def _snapshot_dirty_games(self):
+        """Serialize every dirty game and clear the dirty set, taking each
+        table's pending writes with it.
+
+        Returns (game_id, game_data, writes) for _write_game_snapshots(),
+        which may then run off the event loop without touching live game
+        state. game_data holds only the fields that changed since the
+        table's last save (all of them if it has none yet), and is None for
+        a table that's gone but still has writes to commit; writes is None
+        for a table with none. A table that changed nothing and has no
+        writes is left out.
+        """
+        if self.db is None or not (self._dirty_games or self._pending_writes):
+            return []
+        snapshots = []
+        for game_id in self._dirty_games | self._pending_writes.keys():
+            writes = self._pending_writes.pop(game_id, None) or None
+            game = self.games.get(game_id)
+            changes = None
+            if game is not None:
+                try:
+                    game_data = game.to_dict()
+                except Exception as e:
+                    logging.error(f"Error saving game {game_id}: {e}")
+                else:
+                    changes = self._snapshot_changes(game_id, game_data)
+                    if changes:
+                        self._flushing_snapshots[game_id] = game_data
+                    else:
+                        changes = None
+                        self._write_stats['skipped_snapshots'] += 1
+            if writes:
+                self._writes_in_flight.add(game_id)
+            if changes is not None or writes:
+                snapshots.append((game_id, changes, writes))
         self._dirty_games.clear()
+        return snapshots
+
+    def _snapshot_changes(self, game_id, game_data):
+        """The fields of a game's snapshot that differ from its last saved
+        one, none if nothing changed. It's game_data itself, a checkpoint,
+        if the game hasn't been saved or its journal is due one."""
+        saved = self._saved_snapshots.get(game_id)
+        if saved is None or self._journal_lengths.get(game_id, 0) >= JOURNAL_CHECKPOINT_ENTRIES:
+            self._write_stats['checkpoints'] += 1
+            return game_data
+        changes = {key: value for key, value in game_data.items() if saved.get(key) != value}
+        if any(key in changes for key in PACKED_FIELDS):  # stored as one column
+            changes.update((key, game_data[key]) for key in PACKED_FIELDS)
+        if changes:
+            self._write_stats['journaled_snapshots'] += 1
+        return changes
+
+    def _take_new_channels(self, snapshots):
+        """The channels of new tables among the snapshots, to record once
+        their first snapshot is written."""
+        return {game_id: self._new_channels.pop(game_id) for game_id, _, _ in snapshots
+                if game_id in self._new_channels}
+
+    def _write_game_snapshots(self, snapshots, channels=None):
+        """Write every snapshot, with the tables' pending writes, as one
+        group commit, then the channels of new tables among them. Returns
+        the game_ids that weren't saved."""
+        try:
+            self.db.save_games(snapshots)
+        except Exception as e:
+            logging.error(f"Error saving {len(snapshots)} games: {e}")
+            return [game_id for game_id, _, _ in snapshots]
+        for game_id, (guild_id, channel_id) in (channels or {}).items():
+            try:
+                self.db.save_game_channel(game_id, guild_id, channel_id)
+            except Exception as e:
+                logging.error(f"Error saving game channel {game_id}: {e}")
+        return []
+
+    def _settle_writes(self, snapshots, failed, channels=None):
+        """After a flush, remember the saved snapshots to diff the next
+        against, put the tables that failed back in the dirty set with
+        their writes (and their channels, if new), and stop counting the
+        committed credits as unflushed. A failed table dropped meanwhile
+        loses its writes instead (see _drop_game())."""
+        for game_id, changes, writes in snapshots:
+            game_data = self._flushing_snapshots.pop(game_id, None)
+            if game_id in failed:
+                if channels and game_id in channels and game_id in self.games:
+                    self._new_channels[game_id] = channels[game_id]
+                # Their next snapshot is diffed against the last one saved,
+                # so it carries these changes too
+                if game_id in self.games:
+                    self._dirty_games.add(game_id)
+                if not writes:
+                    continue
+                self._write_stats['failed_commits'] += 1
+                if game_id not in self._writes_in_flight:
+                    # Another shard owns the table now and replays from its
+                    # last snapshot; committing these later would pay twice
+                    self._uncount_credits(writes)
+                    continue
+                queued = self._pending_writes.get(game_id)
+                if queued is not None:
+                    writes.absorb(queued)
+                self._pending_writes[game_id] = writes
+                continue
+            if game_data is not None and game_id in self.games:
+                self._saved_snapshots[game_id] = game_data
+                if changes is game_data:  # a checkpoint
+                    self._journal_lengths[game_id] = 0
+                else:
+                    self._journal_lengths[game_id] = self._journal_lengths.get(game_id, 0) + 1
+            if not writes:
+                continue
+            self._write_stats['commits'] += 1
+            self._uncount_credits(writes)
+        self._writes_in_flight.clear()
+
+    def _uncount_credits(self, writes):
+        """Stop counting a unit's credits as unflushed: they've committed,
+        or been thrown away."""
+        for key, cents in writes.credited():
+            remaining = self._unflushed_credits.get(key, 0) - cents
+            if remaining:
+                self._unflushed_credits[key] = remaining
+            else:
+                self._unflushed_credits.pop(key, None)
 
     def _save_game(self, game_id):
         """Save a game's current state to database."""
@@ -559,13 +1060,22 @@ class Casino:
         try:
             game_data = game.to_dict()
             self.db.save_game(game_id, game_data)
+            self._saved_snapshots[game_id] = game_data
+            self._journal_lengths[game_id] = 0
         except Exception as e:
             logging.error(f"Error saving game {game_id}: {e}")
 
     def _delete_game(self, game_id):
         """Delete a game from database."""
         self._dirty_games.discard(game_id)  # no point writing then deleting
+        self._new_channels.pop(game_id, None)
+        self._saved_snapshots.pop(game_id, None)
+        self._journal_lengths.pop(game_id, None)
+        self._deadlines.pop(game_id, None)
         self._last_autofill.pop(game_id, None)
+        if self.leases is not None:
+            self._unleased_games.discard(game_id)
+            self._released_games.add(game_id)
 
         game = self.games.get(game_id)
         if game is not None:
@@ -580,6 +1090,7 @@ class Casino:
                     # shutdown(wait=False) still runs already-queued work, so a
                     # just-submitted condensation completes before threads exit
                     player.shutdown()
+                self.invalidate_wallet(*self._wallet_key(player))
                 npc_db_id = getattr(player, 'npc_db_id', None)
                 if npc_db_id is not None and self.db is not None:
                     try:
@@ -596,6 +1107,35 @@ class Casino:
         except Exception as e:
             logging.error(f"Error deleting game {game_id}: {e}")
 
+    def _drop_game(self, game_id):
+        """Forget a game another shard has taken over. Its database rows are
+        left alone: the new owner carries on from the last snapshot, so the
+        writes made since are thrown away rather than committed on top."""
+        game = self.games.pop(game_id, None)
+        writes = self._pending_writes.pop(game_id, None)
+        if writes is not None:
+            self._uncount_credits(writes)
+        self._writes_in_flight.discard(game_id)
+        self._dormant_games.pop(game_id, None)
+        self._dirty_games.discard(game_id)
+        self._saved_snapshots.pop(game_id, None)
+        self._journal_lengths.pop(game_id, None)
+        self._deadlines.pop(game_id, None)
+        self._last_autofill.pop(game_id, None)
+        self._pending_bots.pop(game_id, None)
+        self._new_channels.pop(game_id, None)
+        self._unleased_games.discard(game_id)
+        if game is not None:
+            self._shutdown_npcs(game)
+            # The new owner moves these players' money from now on
+            for player in game.players + game.players_waiting + game.departed_players:
+                self.invalidate_wallet(*self._wallet_key(player))
+
+    def _shutdown_npcs(self, game):
+        for player in game.players + game.players_waiting + game.departed_players:
+            if isinstance(player, LLMBlackjackNPC):
+                player.shutdown()
+
     def new_game(self, guild_id=None, channel_id=None, num_bots=0, initial_deck=None):
         while True:
             game_id = str(uuid.uuid4())
@@ -605,32 +1145,33 @@ class Casino:
             game_id, self, initial_deck=initial_deck, on_npc_departed=self._on_npc_departed
         )
         logging.info(f"New game {game_id[:8]} created (bots: {num_bots})")
+        self._wake_game(game_id)
+        if self.leases is not None:
+            self._unleased_games.add(game_id)
 
         if num_bots > 0:
             self._pending_bots[game_id] = num_bots
 
-        # Save game and channel info to database
-        self._save_game(game_id)
+        # The next flush saves the game, then its channel
+        self._mark_dirty(game_id)
         if guild_id is not None and channel_id is not None and self.db is not None:
-            try:
-                self.db.save_game_channel(game_id, guild_id, channel_id)
-            except Exception as e:
-                logging.error(f"Error saving game channel {game_id}: {e}")
+            self._new_channels[game_id] = (guild_id, channel_id)
 
         return game_id
 
     def _spawn_npcs_into_game(self, game_id, count, exclude_personalities=None):
         """Spawn `count` roster NPCs into a game.
 
-        Draws from the persistent NPC roster (via `_get_or_create_npcs`), builds
-        the appropriate NPC objects, assigns them to the game in the DB, and calls
-        `game.join`. Caller is responsible for marking the game dirty.
+        Draws from the persistent NPC roster (via `_draft_npcs`), then seats
+        them with `_seat_npcs`. While serving, the drafting (roster queries,
+        new NPCs' backstories from the LLM) runs on an executor and the NPCs
+        are seated when it's done; otherwise it all happens here. Caller is
+        responsible for marking the game dirty.
         """
         game = self.games.get(game_id)
         if game is None or count <= 0:
             return
 
-        llm_client = self.llm_client
         all_players = game.players + game.players_waiting
         used_names = {p.name for p in all_players}
         used_personalities: set[str] = {
@@ -641,8 +1182,47 @@ class Casino:
         if exclude_personalities:
             used_personalities |= set(exclude_personalities)
 
+        if self._loop is None:
+            unseated = self._seat_npcs(game_id, self._draft_npcs(game_id, count, used_names, used_personalities))
+            self._release_npcs(unseated)
+            return
+        self._spawning[game_id] = self._spawning.get(game_id, 0) + count
+        task = asyncio.ensure_future(self._spawn_npcs_async(game_id, count, used_names, used_personalities))
+        self._spawns.add(task)
+        task.add_done_callback(self._spawned)
+
+    async def _spawn_npcs_async(self, game_id, count, used_names, used_personalities):
+        try:
+            # Not the DB executor: a backstory can take the LLM seconds, and
+            # the tables' flushes would queue behind it
+            drafted = await self._loop.run_in_executor(None, self._draft_npcs, game_id, count,
+                                                       used_names, used_personalities)
+        finally:
+            remaining = self._spawning.pop(game_id, 0) - count
+            if remaining > 0:
+                self._spawning[game_id] = remaining
+        unseated = self._seat_npcs(game_id, drafted)
+        if game_id in self.games:
+            self._mark_dirty(game_id)
+            self._wake_game(game_id)
+            self._wakeup.set()
+        if unseated:
+            await self._run_db(self._release_npcs, unseated)
+
+    def _spawned(self, task):
+        self._spawns.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logging.error(f"Error spawning NPCs: {task.exception()}")
+
+    def _draft_npcs(self, game_id, count, used_names, used_personalities):
+        """Pick `count` roster NPCs for a game, give them the game in the DB
+        and load their memories. Blocking, and touches no casino state, so
+        it can run off the loop. Returns what _seat_npcs() needs of each."""
+        used_names = set(used_names)
+        used_personalities = set(used_personalities)
         npc_records = self._get_or_create_npcs(count, used_personalities)
-        arrivals = []
+        memories = self._load_drafted_memories([r['id'] for r in npc_records if r.get('id') is not None])
+        drafted = []
 
         for npc_record in npc_records:
             used_personalities.add(npc_record['personality_name'])
@@ -655,8 +1235,6 @@ class Casino:
             used_names.add(name)
 
             npc_db_id = npc_record.get('id')
-            backstory = npc_record.get('backstory', '')
-
             if npc_db_id is not None and self.db is not None:
                 try:
                     self.db.set_npc_game(npc_db_id, game_id)
@@ -668,27 +1246,78 @@ class Casino:
             except ValueError:
                 personality = get_random_personality(exclude_names=used_personalities)
 
+            drafted.append({
+                'name': name,
+                'npc_db_id': npc_db_id,
+                'backstory': npc_record.get('backstory', ''),
+                'personality': personality,
+                'memories': memories.get(npc_db_id, []),
+            })
+        return drafted
+
+    def _load_drafted_memories(self, npc_ids):
+        """npc_db_id -> recent session summaries, for NPCs about to be seated."""
+        limit = MEMORY_RECALL_BY_DETAIL.get(SALOON_DETAIL_LEVEL, 1)
+        if not limit or not npc_ids or self.db is None:
+            return {}
+        try:
+            rows = self.db.get_recent_npc_memories(npc_ids, limit)
+        except Exception as e:
+            logging.error(f"Error loading memories for {len(npc_ids)} NPCs: {e}")
+            return {}
+        return {npc_id: [r['session_summary'] for r in memories] for npc_id, memories in rows.items()}
+
+    def _seat_npcs(self, game_id, drafted):
+        """Build drafted NPCs, seat them at their game and announce them.
+        Returns the npc_db_ids of those that found no seat (the game went
+        away or filled up while they were drafted)."""
+        game = self.games.get(game_id)
+        llm_client = self.llm_client
+        arrivals = []
+        unseated = []
+
+        for npc_info in drafted:
+            name, npc_db_id = npc_info['name'], npc_info['npc_db_id']
+            personality = npc_info['personality']
+            if game is None:
+                unseated.append(npc_db_id)
+                continue
             if llm_client is not None:
                 table_ctx = self._make_table_context_fn(game_id, name)
                 npc = LLMBlackjackNPC(
                     name, personality, llm_client,
-                    npc_db_id=npc_db_id, backstory=backstory,
+                    npc_db_id=npc_db_id, backstory=npc_info['backstory'],
                     saloon_name=SALOON_NAME, saloon_town=SALOON_TOWN,
                     detail_level=SALOON_DETAIL_LEVEL,
                     table_context_fn=table_ctx,
                     usage_callback=self._log_usage,
-                    memories=self._load_npc_memories(npc_db_id),
+                    memories=npc_info['memories'],
                 )
             else:
-                npc = SimpleBlackjackNPC(name, npc_db_id=npc_db_id, backstory=backstory)
-            game.join(npc, announce=False)
-            arrivals.append(f"{personality.emoji} {name}")
+                npc = SimpleBlackjackNPC(name, npc_db_id=npc_db_id, backstory=npc_info['backstory'])
+            try:
+                game.join(npc, announce=False)
+            except CardGameError as e:
+                logging.warning(f"[{game_id[:8]}] Couldn't seat NPC {name}: {e}")
+                if isinstance(npc, LLMBlackjackNPC):
+                    npc.shutdown()
+                unseated.append(npc_db_id)
+                continue
+            arrivals.append({'name': name, 'emoji': personality.emoji})
 
         if arrivals:
-            if game.state == HandState.BETTING:
-                game.output(f"🎭 New arrivals: {', '.join(arrivals)}. They're in for this round!")
-            else:
-                game.output(f"🎭 New arrivals: {', '.join(arrivals)}. They'll join the next hand.")
+            game.emit('npc_arrivals', players=arrivals, this_round=game.state == HandState.BETTING)
+        return [npc_db_id for npc_db_id in unseated if npc_db_id is not None]
+
+    def _release_npcs(self, npc_db_ids):
+        """Send NPCs drafted for a game they never sat at back to the roster."""
+        if self.db is None:
+            return
+        for npc_db_id in npc_db_ids:
+            try:
+                self.db.clear_npc_game(npc_db_id)
+            except Exception as e:
+                logging.error(f"Error clearing NPC game for NPC {npc_db_id}: {e}")
 
     def _add_pending_bots(self, game_id):
         """Add any pending bots to the game when the first human player joins."""
@@ -713,9 +1342,11 @@ class Casino:
             return
         self._last_autofill[game_id] = now
 
+        # NPCs still being drafted for the table count as seated
         all_players = game.players + game.players_waiting
-        npc_count = sum(1 for p in all_players if getattr(p, 'is_npc', False))
-        total_count = len(all_players)
+        spawning = self._spawning.get(game_id, 0)
+        npc_count = sum(1 for p in all_players if getattr(p, 'is_npc', False)) + spawning
+        total_count = len(all_players) + spawning
 
         changed = False
 
@@ -748,7 +1379,9 @@ class Casino:
 
         Throttled to at most once per WALLET_REPLENISH_INTERVAL seconds; runs
         regardless of whether any games are active, mirroring _autofill_npcs's
-        per-game throttling shape but at the Casino level.
+        per-game throttling shape but at the Casino level. The server runs it
+        as _replenish_npc_wallets_async() instead, with the DB work on the
+        executor.
         """
         if self.db is None:
             return
@@ -757,40 +1390,58 @@ class Casino:
         if now - self._last_wallet_replenish < WALLET_REPLENISH_INTERVAL:
             return
         self._last_wallet_replenish = now
-
+        self._settle_replenishment(self._credit_idle_npc_wallets())
+
+    async def _replenish_npc_wallets_async(self):
+        """_replenish_npc_wallets() as a chore: the DB work on the executor,
+        the wallet cache and the throttle touched only here on the loop."""
+        self._last_wallet_replenish = time.time()
+        result = await self._loop.run_in_executor(self._db_executor, self._credit_idle_npc_wallets)
+        self._settle_replenishment(result)
+
+    def _credit_idle_npc_wallets(self):
+        """Roll for each idle NPC short of its target and pay the winners.
+        Touches only the database, so it's safe off the loop. Returns
+        (credits, NPCs credited, NPCs short), or None if nothing was paid."""
+        # One query finds the idle NPCs short of their target, the rolls are
+        # made here, and one bulk UPDATE pays out the winners
+        targets = {name: get_personality(name).starting_wallet_cents for name in get_personality_names()}
         span = REPLENISH_PROB_HIGH_CENTS - REPLENISH_PROB_LOW_CENTS
-        for npc in self.db.get_all_npcs():
-            if npc.get('current_game_id') is not None:
-                continue
+        chances = {name: REPLENISH_PROB_MIN + REPLENISH_PROB_RANGE * (target - REPLENISH_PROB_LOW_CENTS) / span
+                   for name, target in targets.items()}
+        short = self.db.get_npcs_below_target(targets)
+        credits = {}
+        for npc in short:
+            name = npc['personality_name']
+            if random.random() < chances[name]:
+                delta = round(REPLENISH_GAP_FRACTION * (targets[name] - npc['wallet_cents']))
+                if delta > 0:
+                    credits[npc['id']] = delta
+        if not credits:
+            return None
 
-            try:
-                personality = get_personality(npc['personality_name'])
-            except ValueError:
-                continue
-
-            target = personality.starting_wallet_cents
-            wallet = npc['wallet_cents']
-            if wallet >= target:
-                continue
-
-            prob = REPLENISH_PROB_MIN + REPLENISH_PROB_RANGE * (target - REPLENISH_PROB_LOW_CENTS) / span
-            if random.random() >= prob:
-                continue
-
-            delta = round(REPLENISH_GAP_FRACTION * (target - wallet))
-            if delta <= 0:
-                continue
-            try:
-                self.db.update_npc_wallet(npc['id'], delta)
-                logging.info(
-                    f"Wallet replenishment: {npc['name']!r} +{delta}c "
-                    f"({wallet}c -> {wallet + delta}c, target {target}c)"
-                )
-            except Exception as e:
-                logging.error(f"Error replenishing wallet for NPC {npc['name']!r}: {e}")
+        try:
+            credited = self.db.credit_idle_npc_wallets(credits)
+        except Exception as e:
+            logging.error(f"Error replenishing {len(credits)} NPC wallets: {e}")
+            return None
+        return credits, credited, len(short)
 
-    def _handle_npc_limits(self, request_id, min_val=None, max_val=None):
-        """Handle an npc_limits request: view or update autofill min/max."""
+    def _settle_replenishment(self, result):
+        """Drop the credited NPCs' cached wallets and log the pass."""
+        if result is None:
+            return
+        credits, credited, short = result
+        for npc_id in credits:
+            self.invalidate_wallet('npc', npc_id)
+        logging.info(f"Wallet replenishment: topped up {credited} of {short} idle NPCs below target, "
+                     f"+{sum(credits.values())}c in all")
+
+    async def _handle_npc_limits(self, request):
+        """Answer an npc_limits call: view the autofill min/max, or update
+        them when the call carries new ones."""
+        min_val = request.get('min')
+        max_val = request.get('max')
         ok = True
         message = ''
 
@@ -805,85 +1456,93 @@ class Casino:
                 ok = False
                 message = f"min ({new_min}) cannot exceed max ({new_max})."
             else:
-                self.npc_min = new_min
-                self.npc_max = new_max
                 if self.db is not None:
                     try:
-                        self.db.set_setting('npc_autofill_min', str(new_min))
-                        self.db.set_setting('npc_autofill_max', str(new_max))
+                        await self._run_db(self._save_npc_limits, new_min, new_max)
                     except Exception as e:
                         logging.error(f"Error persisting NPC limits: {e}")
                         ok = False
                         message = "Limits updated in memory but failed to persist to DB."
+                # Set once they're saved, so a lease sweep reading the
+                # settings meanwhile can't put back the old ones
+                self.npc_min = new_min
+                self.npc_max = new_max
                 if ok:
                     message = f"NPC limits set: min={new_min}, max={new_max}."
                     logging.info(message)
-
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'npc_limits',
-                'request_id': request_id,
-                'min': self.npc_min,
-                'max': self.npc_max,
-                'ok': ok,
-                'message': message,
-            }
+                # Tables may now be under or over the limits
+                for game_id in self.games:
+                    self._wake_game(game_id)
+
+        return {'min': self.npc_min, 'max': self.npc_max, 'ok': ok, 'message': message}
+
+    def _save_npc_limits(self, npc_min, npc_max):
+        self.db.set_setting('npc_autofill_min', str(npc_min))
+        self.db.set_setting('npc_autofill_max', str(npc_max))
+
+    def _handle_new_game(self, request):
+        """Answer a new_game call: open a table (dealt from the call's deck,
+        if it brings one) and reply with its game_id."""
+        deck_data = request.get('deck')
+        game_id = self.new_game(
+            request.get('guild_id'), request.get('channel_id'),
+            num_bots=int(request.get('num_bots', 0)),
+            initial_deck=deserialize_hand(deck_data) if deck_data else None,
         )
+        return {'game_id': game_id}
 
-    def _handle_list_games(self, request_id):
-        """Handle a list_games request from the bot."""
+    async def _handle_list_games(self, request):
+        """Answer a list_games call from the bot."""
         games_info = []
 
         # Get channel info from database
         channel_map = {}
         if self.db is not None:
             try:
-                channels = self.db.load_game_channels()
+                channels = await self._run_db(self.db.load_game_channels)
                 channel_map = {c['game_id']: c for c in channels}
             except Exception as e:
                 logging.error(f"Error loading game channels: {e}")
 
-        for game_id, game in self.games.items():
+        states = {game_id: game.state.value for game_id, game in self.games.items()}
+        states.update((game_id, game_data['state']) for game_id, (game_data, _) in self._dormant_games.items())
+        for game_id, state in states.items():
             game_info = {
                 'game_id': game_id,
-                'state': game.state.value,
+                'state': state,
             }
             if game_id in channel_map:
                 game_info['guild_id'] = channel_map[game_id]['guild_id']
                 game_info['channel_id'] = channel_map[game_id]['channel_id']
             games_info.append(game_info)
 
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'list_games',
-                'request_id': request_id,
-                'games': games_info
-            }
-        )
+        if self.leases is not None:
+            # Other shards' games: every active game has its channel on record
+            for game_id, channel in channel_map.items():
+                if game_id not in self.games:
+                    games_info.append({
+                        'game_id': game_id,
+                        'state': None,  # known only to the owning shard
+                        'guild_id': channel['guild_id'],
+                        'channel_id': channel['channel_id'],
+                    })
+
         logging.info(f"Responded to list_games with {len(games_info)} games")
+        return {'games': games_info}
 
-    def _handle_get_usage(self, request_id):
-        """Handle a get_usage request: query DB and publish 7-day summary."""
+    async def _handle_get_usage(self, request):
+        """Answer a get_usage call with the 7-day LLM usage summary."""
         rows = []
         if self.db is not None:
             try:
-                rows = self.db.get_llm_usage_summary(days=7)
+                rows = await self._run_db(functools.partial(self.db.get_llm_usage_summary, days=7))
             except Exception as e:
                 logging.error(f"Error getting LLM usage summary: {e}")
 
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'usage_stats',
-                'request_id': request_id,
-                'rows': [dict(r) for r in rows],
-            }
-        )
+        return {'rows': [dict(r) for r in rows]}
 
-    def _handle_get_debug(self, request_id):
-        """Gather full internal state and publish as debug_state response."""
+    async def _handle_get_debug(self, request):
+        """Answer a get_debug call with the casino's full internal state."""
         from .blackjack import serialize_hand
 
         games_debug = []
@@ -918,20 +1577,25 @@ class Casino:
                 def sanitize(row):
                     return {k: v.isoformat() if isinstance(v, datetime) else v
                             for k, v in row.items()}
-                npcs = [sanitize(dict(r)) for r in self.db.get_all_npcs()]
+                npcs = [sanitize(dict(r)) for r in await self._run_db(self.db.get_all_npcs)]
             except Exception as e:
                 logging.error(f"Error fetching NPC roster for debug: {e}")
 
-        self.publish_event(
-            'casino_update',
-            {
-                'event_type': 'debug_state',
-                'request_id': request_id,
-                'games': games_debug,
-                'npcs': npcs,
-                'dirty_games': list(self._dirty_games),
-            }
-        )
+        return {
+            'shard': self.shard_id,
+            'games': games_debug,
+            'npcs': npcs,
+            'dirty_games': list(self._dirty_games),
+            'dormant_games': list(self._dormant_games),
+            'ingress': dict(self._ingress_stats, batch_cap=LISTEN_BATCH_MAX),
+            'output': dict(self._output_stats),
+            'rpc': self.rpc.stats.as_dict(),
+            'wallet_cache': dict(self._wallet_stats, cached=len(self._wallets)),
+            'writes': dict(self._write_stats, pending_tables=len(self._pending_writes)),
+            # Only the MySQL backend pools its connections
+            'db_pool': self.db.pool_stats() if hasattr(self.db, 'pool_stats') else None,
+            'write_behind': self.db.write_behind_stats() if hasattr(self.db, 'write_behind_stats') else None,
+        }
 
     def add_npc(self, game_id, count=1):
         """Add `count` roster NPCs to a game, respecting MAX_NPCS_PER_TABLE.
@@ -943,7 +1607,7 @@ class Casino:
             raise CardGameError(f"Game {game_id} not found")
 
         game = self.games[game_id]
-        total = len(game.players) + len(game.players_waiting)
+        total = len(game.players) + len(game.players_waiting) + self._spawning.get(game_id, 0)
         available = max(0, MAX_NPCS_PER_TABLE - total)
         to_add = min(count, available)
         if to_add <= 0:
@@ -986,151 +1650,131 @@ class Casino:
         logging.debug(f"Publishing event {event_type}: {data}")
         self.redis.publish(event_type, json.dumps(data))
 
-    def game_output(self, game_id, output):
-        self.publish_event(
-            f"game_updates_{game_id}",
-            {'game_id': game_id, 'text': output}
-        )
+    def game_output(self, game_id, event):
+        """Queue a table event for the next frame."""
+        self._outbox.setdefault(game_id, []).append(event)
+
+    def _end_table_output(self, game_id):
+        """Send game_over to the table's clients, after any events still queued."""
+        self._outbox.setdefault(game_id, [])
+        self._finished_tables.add(game_id)
+
+    def _take_output_frames(self):
+        """Empty the outbox into (channel, payload) pairs: one frame of events
+        per table, plus game_over for tables that have finished."""
+        outbox, self._outbox = self._outbox, {}
+        finished, self._finished_tables = self._finished_tables, set()
+        messages = []
+        for game_id, events in outbox.items():
+            if events:
+                messages.append((f"game_updates_{game_id}", {'game_id': game_id, 'events': events}))
+                self._output_stats['frames'] += 1
+                self._output_stats['events'] += len(events)
+            if game_id in finished:
+                messages.append((f"game_updates_{game_id}", {'game_id': game_id, 'event_type': 'game_over'}))
+        if messages:
+            self._output_stats['flushes'] += 1
+        return messages
+
+    def _flush_output(self):
+        """Publish all queued table output in one pipelined round trip."""
+        messages = self._take_output_frames()
+        if not messages:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for channel, payload in messages:
+            pipe.publish(channel, json.dumps(payload))
+        pipe.execute()
+
+    async def _flush_output_async(self, client):
+        messages = self._take_output_frames()
+        if not messages:
+            return
+        pipe = client.pipeline(transaction=False)
+        for channel, payload in messages:
+            pipe.publish(channel, json.dumps(payload))
+        await pipe.execute()
 
     EMPTY_GAME_TIMEOUT = 600  # seconds before an idle empty game is removed
 
     def _process_message(self, data):
         game_id = data.get('game_id')
+        if game_id in self._dormant_games:
+            self._hydrate_game(game_id)
 
         if game_id is None:
             logging.debug(f"Got casino message: {data}")
             if data['event_type'] == 'casino_action':
-                if data['action'] == 'new_game':
-                    request_id = data.get('request_id')
-                    if request_id:
-                        guild_id = data.get('guild_id')
-                        channel_id = data.get('channel_id')
-                        num_bots = int(data.get('num_bots', 0))
-                        deck_data = data.get('deck')
-                        initial_deck = deserialize_hand(deck_data) if deck_data else None
-                        game_id = self.new_game(guild_id, channel_id, num_bots=num_bots,
-                                                initial_deck=initial_deck)
-                        self.publish_event(
-                            'casino_update',
-                            {
-                                'event_type': 'new_game',
-                                'request_id': request_id,
-                                'game_id': game_id
-                            }
-                        )
-                elif data['action'] == 'list_games':
-                    request_id = data.get('request_id')
-                    if request_id:
-                        self._handle_list_games(request_id)
-                elif data['action'] == 'get_usage':
-                    request_id = data.get('request_id')
-                    if request_id:
-                        self._handle_get_usage(request_id)
-                elif data['action'] == 'get_debug':
-                    request_id = data.get('request_id')
-                    if request_id:
-                        self._handle_get_debug(request_id)
-                elif data['action'] == 'get_stats':
-                    request_id = data.get('request_id')
-                    player_name = data.get('player')
-                    if request_id and player_name:
-                        self._handle_get_stats(request_id, player_name)
-                elif data['action'] == 'get_wallet':
-                    request_id = data.get('request_id')
-                    player_name = data.get('player')
-                    if request_id and player_name:
-                        self._handle_get_wallet(request_id, player_name)
-                elif data['action'] == 'lookup_wallet':
-                    request_id = data.get('request_id')
-                    target = data.get('target')
-                    if request_id and target:
-                        self._handle_lookup_wallet(request_id, target)
-                elif data['action'] == 'set_wallet':
-                    request_id = data.get('request_id')
-                    target = data.get('target')
-                    mode = data.get('mode', 'set')
-                    amount = data.get('amount', 0)
-                    if request_id and target:
-                        self._handle_set_wallet(request_id, target, mode, amount)
-                elif data['action'] == 'npc_limits':
-                    request_id = data.get('request_id')
-                    if request_id:
-                        self._handle_npc_limits(
-                            request_id,
-                            min_val=data.get('min'),
-                            max_val=data.get('max'),
-                        )
+                if self.rpc.handles(data['action']):
+                    self.rpc.dispatch(data)
+                else:
+                    logging.warning(f"Unknown casino action: {data['action']}")
         elif game_id in self.games.keys():
             logging.debug(f"Got game message: {data}")
-            try:
-                if data['event_type'] == 'casino_action' and data.get('action') == 'stop_game':
-                    logging.info(f"Stopping game {game_id} by admin request — returning unresolved bets")
-                    game = self.games[game_id]
-                    all_players = {p.name: p for p in game.players + game.departed_players}
-                    refunded = []
-                    for player_name, bet_amount in game.bets.items():
-                        player = all_players.get(player_name)
-                        if player is not None:
-                            self.update_wallet(player, bet_amount)
-                            refunded.append(f"{player_name} (${format_cents(bet_amount)})")
-                            logging.info(
-                                f"[{game_id[:8]}] Refunded ${format_cents(bet_amount)} to {player_name}"
-                            )
-                    if refunded:
-                        game.output("🛑 Game called early! Returning bets: " + ", ".join(refunded))
+            self._wake_game(game_id)
+            with self._table_writes(game_id):
+                try:
+                    if data['event_type'] == 'casino_action' and data.get('action') == 'stop_game':
+                        logging.info(f"Stopping game {game_id} by admin request — returning unresolved bets")
+                        game = self.games[game_id]
+                        all_players = {p.name: p for p in game.players + game.departed_players}
+                        refunded = []
+                        for player_name, bet_amount in game.bets.items():
+                            player = all_players.get(player_name)
+                            if player is not None:
+                                self.update_wallet(player, bet_amount)
+                                refunded.append({'player': player_name, 'amount_cents': bet_amount})
+                                logging.info(
+                                    f"[{game_id[:8]}] Refunded ${format_cents(bet_amount)} to {player_name}"
+                                )
+                        game.emit('game_stopped', refunds=refunded)
+                        self._delete_game(game_id)
+                        del self.games[game_id]
+                        self._end_table_output(game_id)
+                        return
+                    if data['event_type'] == 'player_action' and data.get('action') == 'join':
+                        self._add_pending_bots(game_id)
+                    if data['event_type'] == 'npc_action':
+                        action = data['action']
+                        if action == 'add_npc':
+                            count = int(data.get('count', 1))
+                            self.add_npc(game_id, count)
+                        elif action == 'remove_npc':
+                            npc_name = data.get('npc_name')  # None = remove any NPC
+                            self.remove_npc(game_id, npc_name)
                     else:
-                        game.output("🛑 Game called early. No bets to return.")
-                    self._delete_game(game_id)
-                    del self.games[game_id]
-                    self.publish_event(
-                        f"game_updates_{game_id}",
-                        {'game_id': game_id, 'event_type': 'game_over'}
-                    )
-                    return
-                if data['event_type'] == 'player_action' and data.get('action') == 'join':
-                    self._add_pending_bots(game_id)
-                if data['event_type'] == 'npc_action':
-                    action = data['action']
-                    if action == 'add_npc':
-                        count = int(data.get('count', 1))
-                        self.add_npc(game_id, count)
-                    elif action == 'remove_npc':
-                        npc_name = data.get('npc_name')  # None = remove any NPC
-                        self.remove_npc(game_id, npc_name)
-                else:
-                    self.games[game_id].action(data)
-                    if (data['event_type'] == 'player_action'
-                            and data.get('action') == 'join'
-                            and self.db is not None):
-                        player_name = data.get('player')
-                        if player_name:
-                            try:
-                                self.db.increment_games_played(player_name)
-                            except Exception as e:
-                                logging.warning(f"Failed to increment games_played for {player_name}: {e}")
-                self._mark_dirty(game_id)
-            except CardGameError as e:
-                logging.warning(f"Game error: {e}")
-                self.game_output(game_id, e.user_message())
+                        self.games[game_id].action(data)
+                        if (data['event_type'] == 'player_action'
+                                and data.get('action') == 'join'
+                                and self.db is not None):
+                            player_name = data.get('player')
+                            if player_name:
+                                self._collecting_writes().record_join(player_name)
+                    self._mark_dirty(game_id)
+                except CardGameError as e:
+                    logging.warning(f"Game error: {e}")
+                    self.game_output(game_id, {'type': 'error', 'message': e.user_message()})
         else:
             logging.debug(f"Got unknown message: {data}")
 
     def _tick_games(self):
-        self._replenish_npc_wallets()
-        self._check_llm_health()
-
-        for game_id, game in list(self.games.items()):
-            try:
-                game.tick()
-            except CardGameError as e:
-                logging.error(f"[{game_id[:8]}] Error ticking game, skipping this cycle: {e}")
-                continue
+        """Tick every game that's due, then reschedule it. Dirty games are
+        marked for the next flush; writing them is left to the caller."""
+        for game_id in self._pop_due_games(time.time()):
+            game = self.games[game_id]
+            with self._table_writes(game_id):
+                try:
+                    game.tick()
+                except CardGameError as e:
+                    logging.error(f"[{game_id[:8]}] Error ticking game, skipping this cycle: {e}")
+                    self._schedule_game(game_id, time.time() + TICK_ERROR_RETRY)
+                    continue
 
-            if game._dirty:
-                self._mark_dirty(game_id)
-                game._dirty = False
+                if game._dirty:
+                    self._mark_dirty(game_id)
+                    game._dirty = False
 
-            self._autofill_npcs(game_id, game)
+                self._autofill_npcs(game_id, game)
 
             # Remove idle empty games
             if (game.state == HandState.WAITING
@@ -1140,50 +1784,486 @@ class Casino:
                 logging.info(f"Removing idle empty game {game_id}")
                 self._delete_game(game_id)
                 del self.games[game_id]
-                self.publish_event(
-                    f"game_updates_{game_id}",
-                    {'game_id': game_id, 'event_type': 'game_over'}
-                )
+                self._end_table_output(game_id)
+                continue
 
-        self._flush_dirty_games()
+            self._schedule_game(game_id, self._game_deadline(game_id, game))
+            self._watch_npc_decisions(game_id, game)
 
-    def listen(self):
-        db_loaded = False
-        while True:
-            pubsub = self.redis.pubsub()
-            backoff = 1
-            while True:
-                try:
-                    pubsub.subscribe("casino")
-                    break
-                except redis.exceptions.ConnectionError:
-                    logging.info(f"Couldn't connect to redis; sleeping for {backoff} seconds...")
-                    time.sleep(backoff)
-                    backoff = min(backoff * 2, 60)
+    def _watch_npc_decisions(self, game_id, game):
+        """Wake a table the moment an NPC's background decision lands.
 
-            if not db_loaded:
-                db_loaded = True
-                self._load_games_from_db()
-                self.llm_client  # trigger key detection and log result at startup
-
-            logging.info("Casino online.")
+        Tables don't poll NPCs that are still thinking (next_deadline() skips
+        them); instead each pending decision future gets a done-callback that
+        hops back onto the event loop and wakes the table.
+        """
+        if self._loop is None:
+            return
+        loop = self._loop
+        for player in game.players:
+            future = getattr(player, 'pending_decision', None)
+            if future is None or future in self._watched_decisions:
+                continue
+            self._watched_decisions.add(future)
+            future.add_done_callback(
+                lambda _f, gid=game_id: loop.call_soon_threadsafe(self._on_npc_decision_ready, gid)
+            )
 
+    def _on_npc_decision_ready(self, game_id):
+        if game_id in self.games:
+            self._wake_game(game_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _poll_timeout(self):
+        """How long serve() may sleep: until the earliest deadline across all
+        tables, unless new ingress or an NPC decision wakes it first."""
+        return max(0.0, min(LISTEN_MAX_SLEEP, self._next_wake() - time.time()))
+
+    def _drain_ingress(self, queue):
+        """Take every message already queued, up to LISTEN_BATCH_MAX, so a
+        burst of commands is applied together ahead of a single tick and flush."""
+        depth = queue.qsize()
+        messages = []
+        while len(messages) < LISTEN_BATCH_MAX and not queue.empty():
+            messages.append(queue.get_nowait())
+        if messages:
+            self._record_ingress_batch(len(messages), depth)
+        return messages
+
+    def _record_ingress_batch(self, size, depth):
+        stats = self._ingress_stats
+        stats['batches'] += 1
+        stats['messages'] += size
+        stats['last_batch'] = size
+        stats['max_batch'] = max(stats['max_batch'], size)
+        stats['queue_depth'] = depth - size
+        stats['max_queue_depth'] = max(stats['max_queue_depth'], depth)
+        if depth > size:
+            stats['capped_batches'] += 1
+            logging.info(f"Ingress batch hit the cap of {LISTEN_BATCH_MAX}; {depth - size} messages still queued")
+
+    def _start_chores(self):
+        """Kick off any due casino-wide chores in the background, so a slow
+        LLM probe or NPC roster pass never holds up the tables."""
+        now = time.time()
+        if (self.db is not None and 'replenish' not in self._chores
+                and now - self._last_wallet_replenish >= WALLET_REPLENISH_INTERVAL):
+            self._start_chore('replenish', None, self._replenish_npc_wallets_async)
+        if ('llm_health' not in self._chores
+                and now - self._last_llm_healthcheck >= LLM_HEALTHCHECK_INTERVAL):
+            self._start_chore('llm_health', None, self._check_llm_health)
+        if (self.leases is not None and 'leases' not in self._chores
+                and now - self._last_lease_renewal >= LEASE_RENEW_INTERVAL):
+            self._start_chore('leases', None, self._maintain_leases)
+
+    def _start_chore(self, name, executor, fn):
+        """Run fn in the background: on the executor, or as a task on the
+        loop if it's a coroutine function."""
+        def done(future):
+            self._chores.pop(name, None)
+            if not future.cancelled() and future.exception() is not None:
+                logging.error(f"Casino chore {name} failed: {future.exception()}")
+        if asyncio.iscoroutinefunction(fn):
+            future = asyncio.ensure_future(fn())
+        else:
+            future = self._loop.run_in_executor(executor, fn)
+        self._chores[name] = future
+        future.add_done_callback(done)
+
+    async def _flush_dirty_games_async(self):
+        """Snapshot dirty games on the loop, write them on the DB executor."""
+        async with self._flush_lock:
+            snapshots = self._snapshot_dirty_games()
+            if snapshots:
+                channels = self._take_new_channels(snapshots)
+                failed = await self._loop.run_in_executor(self._db_executor, self._write_game_snapshots,
+                                                          snapshots, channels)
+                self._settle_writes(snapshots, failed, channels)
+
+    async def _maintain_leases(self):
+        """Renew this shard's leases and advertise its load. Every
+        LEASE_SWEEP_INTERVAL, also look for shards that have died and take
+        over a share of their games."""
+        self._last_lease_renewal = time.time()
+        for game_id in await self.leases.renew(list(self.games.keys() | self._dormant_games.keys())):
+            logging.warning(f"[{game_id[:8]}] Lease lost to another shard; dropping game")
+            self._drop_game(game_id)
+        await self.leases.heartbeat(len(self.games) + len(self._dormant_games))
+
+        if time.time() - self._last_lease_sweep < LEASE_SWEEP_INTERVAL:
+            return
+        self._last_lease_sweep = time.time()
+        live, dead = await self.leases.shard_loads()
+        # The reader takes over their unacknowledged commands
+        self._dead_shards.update(shard for shard in dead if shard != self.shard_id)
+        if self.db is None:
+            return
+        # Limits set through another shard's /npclimits
+        limits = await self._loop.run_in_executor(self._db_executor, self._load_npc_limits)
+        if self._set_npc_limits(limits):
+            for game_id in self.games:
+                self._wake_game(game_id)
+
+        game_ids = await self._loop.run_in_executor(self._db_executor, self.db.list_game_ids)
+        owners = await self.leases.owners(game_id for game_id in game_ids
+                                          if game_id not in self.games and game_id not in self._dormant_games)
+        orphans = sorted(game_id for game_id, owner in owners.items() if owner is None)
+        if not orphans:
+            return
+        # Only the least-loaded shards take games, each a fair share, so the
+        # survivors of a dead shard split its tables between them.
+        live[self.shard_id] = len(self.games) + len(self._dormant_games)
+        if live[self.shard_id] > min(live.values()):
+            return
+        share = math.ceil(len(orphans) / len(live))
+        adopted = await self._adopt_games(orphans[:share])
+        if adopted:
+            logging.info(f"Took over {len(adopted)} of {len(orphans)} orphaned game(s)")
+
+    async def _adopt_games(self, game_ids):
+        """Claim the leases on unowned games and reload them from the
+        database. Returns the ids of the games now running here."""
+        claimed = await self.leases.claim(game_ids)
+        if not claimed:
+            return set()
+        games = await self._loop.run_in_executor(self._db_executor, self._restore_games, claimed)
+        adopted = set()
+        for game in games:
+            if game.game_id in self.games:
+                self._shutdown_npcs(game)  # adopted meanwhile by a concurrent claim
+                continue
+            self.games[game.game_id] = game
+            self._wake_game(game.game_id)
+            adopted.add(game.game_id)
+        # Claimed but gone from the database (deleted meanwhile, or a bogus id)
+        await self.leases.release(claimed - adopted - set(self.games))
+        return adopted
+
+    async def _sync_leases(self):
+        """Take leases on games created this pass, hand back deleted ones."""
+        if self.leases is None:
+            return
+        if self._released_games:
+            released, self._released_games = self._released_games, set()
+            await self.leases.release(released)
+        if self._unleased_games:
+            created, self._unleased_games = self._unleased_games, set()
+            for game_id in created - await self.leases.claim(created):
+                logging.error(f"[{game_id[:8]}] New game's lease is held by another shard; dropping it")
+                self._drop_game(game_id)
+
+    def _command_streams(self):
+        """The streams this shard reads: the shared one, and its own."""
+        return [COMMAND_STREAM, shard_stream(self.shard_id)]
+
+    def _command_applied(self, command_id):
+        return command_id is not None and command_id in self._applied_commands
+
+    def _remember_command(self, command_id):
+        if command_id is None:
+            return
+        self._applied_commands[command_id] = None
+        while len(self._applied_commands) > COMMAND_DEDUP_MEMORY:
+            self._applied_commands.popitem(last=False)
+
+    async def _ensure_command_group(self, client):
+        """Create the command streams and their consumer group if missing. A
+        new group starts from the beginning of the stream, so commands sent
+        before the casino first came up are still applied."""
+        for stream in self._command_streams():
+            try:
+                await client.xgroup_create(stream, COMMAND_GROUP, id='0', mkstream=True)
+            except redis.exceptions.ResponseError as e:
+                if 'BUSYGROUP' not in str(e):
+                    raise
+
+    async def _connect_ingress(self):
+        """Connect to Redis and make sure the command stream's consumer group
+        exists, backing off while Redis is down."""
+        backoff = 1
+        while True:
+            client = redis.asyncio.Redis(host=self.redis_host, port=self.redis_port)
             try:
-                while True:
-                    message = pubsub.get_message(ignore_subscribe_messages=True,
-                                                 timeout=2.0)
-                    if message:
-                        try:
-                            data = json.loads(message['data'])
-                        except json.JSONDecodeError as e:
-                            logging.error(f"Failed to parse Redis message: {e}")
-                            continue
-                        self._process_message(data)
-
-                    self._tick_games()
+                await self._ensure_command_group(client)
             except redis.exceptions.ConnectionError:
-                logging.warning("Lost Redis connection; reconnecting...")
+                await client.aclose()
+                logging.info(f"Couldn't connect to redis; sleeping for {backoff} seconds...")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+            return client
+
+    async def _read_ingress(self, client, queue):
+        """Move commands from the streams onto the ingress queue.
+
+        Starts with this shard's own unacknowledged commands, left over from
+        before a restart or reconnect, then reads new ones. Every
+        COMMAND_RECLAIM_INTERVAL it also takes over commands another shard
+        has held unacknowledged on the shared stream for
+        COMMAND_RECLAIM_IDLE_MS, and it drains the streams of dead shards.
+        """
+        try:
+            # '0' pages through our own pending entries; '>' is new ones
+            streams = {stream: '0' for stream in self._command_streams()}
+            last_reclaim = 0
+            while True:
                 try:
-                    pubsub.close()
+                    if time.time() - last_reclaim >= COMMAND_RECLAIM_INTERVAL:
+                        last_reclaim = time.time()
+                        reclaimed = await self._reclaim_commands(client, queue, COMMAND_STREAM,
+                                                                 COMMAND_RECLAIM_IDLE_MS)
+                        if reclaimed:
+                            logging.info(f"Reclaimed {reclaimed} stalled command(s)")
+                    for shard in list(self._dead_shards):
+                        await self._adopt_shard_commands(client, queue, shard)
+
+                    block = COMMAND_BLOCK_MS if all(last_id == '>' for last_id in streams.values()) else None
+                    response = await client.xreadgroup(
+                        COMMAND_GROUP, self.shard_id, streams, count=LISTEN_BATCH_MAX, block=block,
+                    )
+                except redis.exceptions.ResponseError as e:
+                    # The stream or group went away under us (Redis restarted
+                    # without persistence, or the key was deleted)
+                    if 'NOGROUP' not in str(e) and 'UNBLOCKED' not in str(e):
+                        raise
+                    logging.warning(f"Command stream reset ({e}); recreating consumer group")
+                    await self._ensure_command_group(client)
+                    streams = {stream: '0' for stream in streams}
+                    continue
+                received = {_stream_name(stream): entries for stream, entries in response or []}
+                for stream, last_id in streams.items():
+                    if last_id == '>':
+                        continue
+                    entries = received.get(stream)
+                    if entries:
+                        logging.info(f"Redelivering {len(entries)} unacknowledged command(s) from {stream}")
+                        streams[stream] = entries[-1][0]
+                    else:
+                        streams[stream] = '>'
+                for stream, entries in received.items():
+                    await self._enqueue_commands(client, queue, stream, entries)
+        finally:
+            self._wakeup.set()  # let the scheduler notice ingress has stopped
+
+    async def _reclaim_commands(self, client, queue, stream, min_idle_ms):
+        """Take over entries another consumer has left pending on a stream."""
+        _, entries, *_ = await client.xautoclaim(
+            stream, COMMAND_GROUP, self.shard_id,
+            min_idle_time=min_idle_ms, start_id='0-0', count=LISTEN_BATCH_MAX,
+        )
+        if entries:
+            await self._enqueue_commands(client, queue, stream, entries)
+        return len(entries)
+
+    async def _adopt_shard_commands(self, client, queue, shard):
+        """Take over a batch of the commands left on a dead shard's stream:
+        those it read but never acknowledged, then those it never got to.
+        They're routed like any other command, so the games they're for get
+        claimed. Once the stream is drained the shard is forgotten."""
+        stream = shard_stream(shard)
+        try:
+            reclaimed = await self._reclaim_commands(client, queue, stream, LEASE_TTL_MS)
+            response = await client.xreadgroup(
+                COMMAND_GROUP, self.shard_id, {stream: '>'}, count=LISTEN_BATCH_MAX,
+            )
+        except redis.exceptions.ResponseError as e:
+            if 'NOGROUP' not in str(e):
+                raise
+            reclaimed, response = 0, None  # the shard never read anything
+        entries = response[0][1] if response else []
+        if entries:
+            await self._enqueue_commands(client, queue, stream, entries)
+        if reclaimed or entries:
+            logging.info(f"Took over {reclaimed + len(entries)} command(s) from dead shard {shard}")
+            return
+        self._dead_shards.discard(shard)
+        await self.leases.forget(shard)
+
+    async def _enqueue_commands(self, client, queue, stream, entries):
+        """Queue (stream, entry_id, command) for the scheduler. Entries that
+        won't be applied here (trimmed, unparseable, already applied before a
+        restart, or forwarded to the shard that owns their game) are
+        acknowledged straight away."""
+        commands = []
+        done = []
+        for entry_id, fields in entries:
+            try:
+                commands.append((entry_id, json.loads(fields[b'data'])))
+            except (TypeError, KeyError, json.JSONDecodeError) as e:
+                logging.error(f"Dropping unreadable command {entry_id}: {e}")
+                done.append(entry_id)
+
+        if commands:
+            pipe = client.pipeline(transaction=False)
+            for _, data in commands:
+                pipe.exists(f"casino_command_done:{data.get('command_id')}")
+            applied = await pipe.execute()
+            fresh = []
+            for (entry_id, data), seen in zip(commands, applied):
+                if seen and data.get('command_id'):
+                    logging.info(f"Skipping command {data['command_id']}: already applied")
+                    done.append(entry_id)
+                else:
+                    fresh.append((entry_id, data))
+            if self.leases is not None:
+                fresh = await self._route_commands(client, stream, fresh, done)
+            for entry_id, data in fresh:
+                queue.put_nowait((stream, entry_id, data))
+                self._wakeup.set()
+
+        if done:
+            await client.xack(stream, COMMAND_GROUP, *done)
+
+    async def _route_commands(self, client, stream, commands, done):
+        """Keep the commands this shard should apply and forward the rest.
+
+        A game's commands go to the shard holding its lease; a game nobody
+        holds is claimed and reloaded here. New games read off the shared
+        stream go to the least-loaded shard. Forwarded entries are added to
+        `done`, to be acknowledged.
+        """
+        remote = {data['game_id'] for _, data in commands
+                  if data.get('game_id') and data['game_id'] not in self.games
+                  and data['game_id'] not in self._dormant_games}
+        owners = await self.leases.owners(remote)
+        orphans = [game_id for game_id, owner in owners.items() if owner is None]
+        if orphans:
+            for game_id in await self._adopt_games(orphans):
+                owners[game_id] = self.shard_id
+
+        keep = []
+        for entry_id, data in commands:
+            game_id = data.get('game_id')
+            target = owners.get(game_id) or self.shard_id
+            if (game_id is None and stream == COMMAND_STREAM
+                    and data.get('event_type') == 'casino_action' and data.get('action') == 'new_game'):
+                target = await self.leases.least_loaded()
+            hops = data.get('hops', 0)
+            if target == self.shard_id or hops >= SHARD_MAX_HOPS:
+                keep.append((entry_id, data))
+                continue
+            await send_command(client, dict(data, hops=hops + 1), stream=shard_stream(target))
+            done.append(entry_id)
+        return keep
+
+    async def _ack_commands(self, client, batch):
+        """Acknowledge applied commands and remember their ids, atomically,
+        so a resent command_id is skipped even after a restart."""
+        pipe = client.pipeline(transaction=True)
+        entry_ids = {}
+        for stream, entry_id, data in batch:
+            command_id = data.get('command_id')
+            if command_id:
+                pipe.set(f"casino_command_done:{command_id}", 1, ex=COMMAND_DEDUP_TTL)
+            entry_ids.setdefault(stream, []).append(entry_id)
+        for stream, ids in entry_ids.items():
+            pipe.xack(stream, COMMAND_GROUP, *ids)
+        await pipe.execute()
+
+    async def _run_tables(self, queue, reader, client):
+        """The table scheduler: apply queued commands, tick due tables,
+        publish their output, flush, then acknowledge the commands and sleep
+        until the next deadline or until something wakes it."""
+        while True:
+            # Cleared before looking at anything, so a wake-up that lands
+            # while this pass runs still cuts the sleep at the end short.
+            self._wakeup.clear()
+            if reader.done():
+                reader.result()  # re-raise whatever stopped ingress
+                return
+            batch = self._drain_ingress(queue)
+            for _, entry_id, data in batch:
+                command_id = data.get('command_id')
+                if self._command_applied(command_id):
+                    logging.info(f"Skipping command {command_id}: already applied")
+                    continue
+                try:
+                    self._process_message(data)
                 except Exception:
+                    # Acknowledged regardless: redelivering it would only fail again
+                    logging.exception(f"Error applying command {entry_id}: {data}")
+                self._remember_command(command_id)
+
+            self._tick_games()
+            await self._flush_output_async(client)
+            await self._sync_leases()
+            self._start_chores()
+            await self._flush_dirty_games_async()
+            # Only once their effects are written, so a crash before this
+            # point gets the commands redelivered rather than lost.
+            if batch:
+                await self._ack_commands(client, batch)
+
+            if queue.empty():
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_timeout())
+                except asyncio.TimeoutError:
                     pass
+
+    async def serve(self):
+        """Run the casino on the current event loop.
+
+        Commands are read from the command streams by their own task into a
+        queue; the table scheduler applies them in batches, ticks whatever is
+        due and sleeps until the next deadline. Blocking DB work runs on a
+        bounded executor.
+
+        Runs as one shard of the casino: it only runs the games it holds
+        leases on, and any number of shards with distinct CASINO_SHARD ids
+        can share Redis and the database.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS,
+                                               thread_name_prefix="casino-db")
+        queue = asyncio.Queue()
+        db_loaded = False
+        try:
+            while True:
+                client = await self._connect_ingress()
+                self.leases = GameLeases(client, self.shard_id)
+
+                if not db_loaded:
+                    db_loaded = True
+                    started = time.monotonic()
+                    await self._loop.run_in_executor(self._db_executor, self._load_games_from_db,
+                                                     await self._retake_leases())
+                    # trigger key detection and log result at startup
+                    await self._loop.run_in_executor(None, lambda: self.llm_client)
+                    logging.info(f"Startup took {time.monotonic() - started:.2f}s")
+
+                logging.info(f"Casino shard {self.shard_id} online with "
+                             f"{len(self.games) + len(self._dormant_games)} game(s).")
+
+                reader = asyncio.create_task(self._read_ingress(client, queue))
+                try:
+                    await self._run_tables(queue, reader, client)
+                except redis.exceptions.ConnectionError:
+                    logging.warning("Lost Redis connection; reconnecting...")
+                finally:
+                    reader.cancel()
+                    try:
+                        await client.aclose()
+                    except Exception:
+                        pass
+        finally:
+            self._db_executor.shutdown(wait=True)
+            self._loop = None
+            self.leases = None
+
+    async def _retake_leases(self):
+        """The games this shard still holds leases on, from before a quick
+        restart. Games nobody holds are picked up by the first lease sweep."""
+        if self.db is None:
+            return set()
+        try:
+            game_ids = await self._loop.run_in_executor(self._db_executor, self.db.list_game_ids)
+        except Exception as e:
+            logging.error(f"Error listing games in database: {e}")
+            return set()
+        return await self.leases.retake(game_ids)
+
+
+def _stream_name(stream):
+    return stream.decode() if isinstance(stream, bytes) else stream
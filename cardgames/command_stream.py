@@ -0,0 +1,33 @@
+"""The casino command stream: how clients hand commands to the Casino.
+
+Commands are appended to a Redis Stream that the Casino reads through a
+consumer group, so a command sent while the server restarts or reconnects
+waits in the stream instead of being lost, and is only acknowledged once
+it has been applied. Any casino shard may read a command off the shared
+stream; commands for a game another shard owns are forwarded to that
+shard's own stream (see leases.py).
+"""
+import json
+import uuid
+
+COMMAND_STREAM = "casino_commands"
+COMMAND_GROUP = "casino"
+COMMAND_STREAM_MAXLEN = 10000  # approximate cap on entries kept in the stream
+
+
+def command_fields(message):
+    """Stream entry fields for a command dict.
+
+    Stamps a command_id if the command doesn't carry one; the casino skips
+    a command_id it has already applied, so a command delivered twice (or
+    resent by a client) only takes effect once.
+    """
+    if not message.get('command_id'):
+        message = dict(message, command_id=str(uuid.uuid4()))
+    return {'data': json.dumps(message)}
+
+
+async def send_command(redis_client, message, stream=COMMAND_STREAM):
+    """Append a command to the stream with an async Redis client."""
+    await redis_client.xadd(stream, command_fields(message),
+                            maxlen=COMMAND_STREAM_MAXLEN, approximate=True)
@@ -1,5 +1,4 @@
 import functools
-import json
 import logging
 import threading
 import time
@@ -7,21 +6,39 @@ import time
 import mysql.connector
 from mysql.connector import Error
 
+from .db_pool import ConnectionPool
+from .game_rows import game_row, game_writes, journal_from_rows, row_to_game
+
 _DEADLOCK_ERRNO = 1213
 _DEADLOCK_RETRIES = 3
 _DEADLOCK_BACKOFF_BASE = 0.05  # seconds
 
 DEFAULT_WALLET = 200.0
+DEFAULT_POOL_SIZE = 8
+_BULK_UPDATE_ROWS = 500  # rows per CASE in a bulk UPDATE, to keep statements a sane size
 
 
-def _synchronized(method):
-    """Serialize access to the shared DB connection: the main game loop and
-    NPC worker threads (usage logging, session memories) all use this object,
-    and mysql.connector connections are not safe for concurrent use."""
+def _pooled(method):
+    """Run the method on a pooled connection of its own: the main game loop
+    and NPC worker threads (usage logging, session memories) all use this
+    object, and mysql.connector connections are not safe for concurrent use.
+    A call made from inside another on the same thread shares its connection."""
     @functools.wraps(method)
     def wrapper(self, *args, **kwargs):
-        with self._lock:
+        if getattr(self._local, 'connection', None) is not None:
+            return method(self, *args, **kwargs)
+        self._local.connection = self._pool.acquire()
+        discard = False
+        try:
             return method(self, *args, **kwargs)
+        except BaseException as e:
+            # Writes roll back on a MySQL error, so the connection goes back to
+            # the pool; anything else may have cut it off mid-statement
+            discard = not isinstance(e, Error)
+            raise
+        finally:
+            connection, self._local.connection = self._local.connection, None
+            self._pool.release(connection, discard=discard)
     return wrapper
 
 
@@ -123,20 +140,39 @@ MIGRATIONS = [
             KEY idx_npc_memories_npc (npc_id)
         )""",
     ],
+    [   # Migration 8: cards, seats and bets packed into one BLOB (see snapshot_codec.py)
+        "ALTER TABLE games ADD COLUMN packed_state BLOB NULL AFTER time_last_event",
+    ],
+    [   # Migration 9: per-table journal of changes since the last checkpoint
+        """CREATE TABLE IF NOT EXISTS game_journal (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            game_id VARCHAR(36) NOT NULL,
+            fields_json TEXT NOT NULL,
+            packed_state BLOB NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_game_journal_game (game_id, id)
+        )""",
+    ],
 ]
 
 
 class Database:
-    def __init__(self, host, port, user, password, database):
+    def __init__(self, host, port, user, password, database, pool_size=DEFAULT_POOL_SIZE):
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
-        self.connection = None
-        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._pool = ConnectionPool(self._open_connection, pool_size, check=self._check_connection,
+                                    reset=self._end_transaction)
         self._init_database()
 
+    @property
+    def connection(self):
+        """The connection checked out for the current call on this thread."""
+        return self._local.connection
+
     def _rollback_safe(self):
         try:
             self.connection.rollback()
@@ -144,9 +180,10 @@ class Database:
             pass
 
     def _execute_write(self, fn, error_msg):
-        """Run fn(cursor) inside a retry loop that handles InnoDB deadlocks."""
+        """Run fn(cursor) inside a retry loop that handles InnoDB deadlocks.
+        A deadlock rolls back and retries on the call's own connection; only
+        that call waits out the backoff."""
         for attempt in range(_DEADLOCK_RETRIES):
-            self._connect()
             cursor = None
             try:
                 cursor = self.connection.cursor()
@@ -160,21 +197,16 @@ class Database:
                     time.sleep(_DEADLOCK_BACKOFF_BASE * (2 ** attempt))
                 else:
                     logging.error(f"Error in {error_msg}: {e}")
+                    # Don't leave half a transaction for the next commit to pick up
+                    self._rollback_safe()
                     raise
             finally:
                 if cursor:
                     cursor.close()
 
-    def _connect(self):
+    def _open_connection(self):
         try:
-            if self.connection is not None:
-                try:
-                    self.connection.ping(reconnect=True)
-                    return
-                except Error:
-                    pass
-
-            self.connection = mysql.connector.connect(
+            connection = mysql.connector.connect(
                 host=self.host,
                 port=self.port,
                 user=self.user,
@@ -182,12 +214,25 @@ class Database:
                 database=self.database
             )
             logging.info("Connected to MySQL database")
+            return connection
         except Error as e:
             logging.error(f"Error connecting to MySQL: {e}")
             raise
 
+    @staticmethod
+    def _check_connection(connection):
+        # Reconnects a connection the server dropped while it sat idle
+        connection.ping(reconnect=True)
+        return connection
+
+    @staticmethod
+    def _end_transaction(connection):
+        # A read leaves its REPEATABLE READ snapshot open; without this, the
+        # connection's next caller would read data as of that snapshot
+        connection.rollback()
+
+    @_pooled
     def _init_database(self):
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor()
@@ -221,10 +266,9 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def add_user(self, username):
         """Add a new user to the database if they don't exist."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor()
@@ -243,10 +287,9 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def get_user_wallet(self, username):
         """Get the wallet balance for a user, in cents."""
-        self._connect()
         self.connection.commit()  # end any open txn so we read the latest committed data
         cursor = None
         try:
@@ -265,7 +308,7 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def update_wallet(self, username, amount_cents):
         """Update a user's wallet by adding or subtracting an amount, in cents.
 
@@ -289,7 +332,7 @@ class Database:
 
         return self._execute_write(fn, f"update_wallet({username})")
 
-    @_synchronized
+    @_pooled
     def set_user_wallet(self, username, amount_cents):
         """Set a user's wallet to an absolute amount, in cents. Returns True on success."""
         def fn(cursor):
@@ -304,54 +347,103 @@ class Database:
 
         return self._execute_write(fn, f"set_user_wallet({username})")
 
-    @_synchronized
+    # The JSON columns only hold rows saved before migration 8 packed the
+    # cards, seats and bets into packed_state; a save empties them.
+    _GAME_UPSERT = """
+        INSERT INTO games (
+            game_id, state, current_player_idx,
+            time_betting_started, time_last_hand_ended, time_last_event, packed_state,
+            deck_json, discards_json, dealer_hand_json,
+            players_json, players_waiting_json, bets_json
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, '', '', '', '', '', '') AS new
+        ON DUPLICATE KEY UPDATE
+            state = new.state,
+            current_player_idx = new.current_player_idx,
+            time_betting_started = new.time_betting_started,
+            time_last_hand_ended = new.time_last_hand_ended,
+            time_last_event = new.time_last_event,
+            packed_state = new.packed_state,
+            deck_json = '',
+            discards_json = '',
+            dealer_hand_json = '',
+            players_json = '',
+            players_waiting_json = '',
+            bets_json = ''
+    """
+
+    # A journal entry's parameters come from game_rows.journal_entry()
+    _JOURNAL_APPEND = "INSERT INTO game_journal (game_id, fields_json, packed_state) VALUES (%s, %s, %s)"
+
+    @_pooled
     def save_game(self, game_id, game_data):
         """Save game state to database."""
-        params = (
-            game_id,
-            game_data['state'],
-            game_data['current_player_idx'],
-            game_data['time_betting_started'],
-            game_data['time_last_hand_ended'],
-            game_data['time_last_event'],
-            json.dumps(game_data['deck']),
-            json.dumps(game_data['discards']),
-            json.dumps(game_data['dealer_hand']),
-            json.dumps(game_data['players']),
-            json.dumps(game_data['players_waiting']),
-            json.dumps(game_data['bets']),
-        )
+        params = game_row(game_id, game_data)
 
         def fn(cursor):
-            cursor.execute("""
-                INSERT INTO games (
-                    game_id, state, current_player_idx,
-                    time_betting_started, time_last_hand_ended, time_last_event,
-                    deck_json, discards_json, dealer_hand_json,
-                    players_json, players_waiting_json, bets_json
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) AS new
-                ON DUPLICATE KEY UPDATE
-                    state = new.state,
-                    current_player_idx = new.current_player_idx,
-                    time_betting_started = new.time_betting_started,
-                    time_last_hand_ended = new.time_last_hand_ended,
-                    time_last_event = new.time_last_event,
-                    deck_json = new.deck_json,
-                    discards_json = new.discards_json,
-                    dealer_hand_json = new.dealer_hand_json,
-                    players_json = new.players_json,
-                    players_waiting_json = new.players_waiting_json,
-                    bets_json = new.bets_json
-            """, params)
+            cursor.execute(self._GAME_UPSERT, params)
+            cursor.execute("DELETE FROM game_journal WHERE game_id = %s", (game_id,))
             logging.debug(f"Saved game {game_id}")
             return True
 
         return self._execute_write(fn, f"save_game({game_id})")
 
-    @_synchronized
+    @_pooled
+    def save_games(self, snapshots):
+        """Save many games in one transaction, along with their tables'
+        deferred writes (see unit_of_work.py).
+
+        snapshots holds (game_id, game_data, writes): writes is a UnitOfWork
+        or None. game_data is the table's whole snapshot, written as a
+        checkpoint that replaces its journal, or just the fields that changed
+        since its last save, appended to the journal; it's None for a table
+        that's gone but still has writes to commit. Each kind of statement
+        goes out as one batch.
+        """
+        rows, entries = game_writes(snapshots)
+        units = [writes for _, _, writes in snapshots if writes]
+        user_credits = [(cents, username) for w in units for username, cents in w.user_credits.items()]
+        npc_credits = [(cents, npc_id) for w in units for npc_id, cents in w.npc_credits.items()]
+        stats = [(s['hands'], s['won_cents'], s['lost_cents'], s['biggest_win_cents'], username)
+                 for w in units for username, s in w.stats.items()]
+        joins = [(count, username) for w in units for username, count in w.games_played.items()]
+
+        def fn(cursor):
+            if user_credits:
+                cursor.executemany("UPDATE users SET wallet_cents = wallet_cents + %s WHERE username = %s",
+                                   user_credits)
+            if npc_credits:
+                cursor.executemany("UPDATE npcs SET wallet_cents = wallet_cents + %s WHERE id = %s", npc_credits)
+            if stats:
+                cursor.executemany("""
+                    UPDATE users SET
+                        hands_played = hands_played + %s,
+                        total_won_cents = total_won_cents + %s,
+                        total_lost_cents = total_lost_cents + %s,
+                        biggest_win_cents = GREATEST(biggest_win_cents, %s),
+                        last_seen = NOW()
+                    WHERE username = %s
+                """, stats)
+            if joins:
+                cursor.executemany("""
+                    UPDATE users SET games_played = games_played + %s, last_seen = NOW()
+                    WHERE username = %s
+                """, joins)
+            if rows:
+                # mysql.connector sends an INSERT's executemany as one multi-row statement
+                cursor.executemany(self._GAME_UPSERT, rows)
+                # A checkpoint replaces the table's journal
+                cursor.executemany("DELETE FROM game_journal WHERE game_id = %s", [row[:1] for row in rows])
+            if entries:
+                cursor.executemany(self._JOURNAL_APPEND, entries)
+            logging.debug(f"Saved {len(rows)} games and journaled {len(entries)}, "
+                          f"{len(units)} with table writes")
+            return True
+
+        return self._execute_write(fn, f"save_games({len(snapshots)} games)")
+
+    @_pooled
     def load_game(self, game_id):
         """Load game state from database."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -361,20 +453,7 @@ class Database:
             result = cursor.fetchone()
             if result is None:
                 return None
-            return {
-                'game_id': result['game_id'],
-                'state': result['state'],
-                'current_player_idx': result['current_player_idx'],
-                'time_betting_started': result['time_betting_started'],
-                'time_last_hand_ended': result['time_last_hand_ended'],
-                'time_last_event': result['time_last_event'],
-                'deck': json.loads(result['deck_json']),
-                'discards': json.loads(result['discards_json']),
-                'dealer_hand': json.loads(result['dealer_hand_json']),
-                'players': json.loads(result['players_json']),
-                'players_waiting': json.loads(result['players_waiting_json']),
-                'bets': json.loads(result['bets_json']),
-            }
+            return row_to_game(result)
         except Error as e:
             logging.error(f"Error loading game {game_id}: {e}")
             raise
@@ -382,10 +461,27 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
+    def load_games(self, game_ids):
+        """Load the given games in one query; ids not found are left out."""
+        game_ids = list(game_ids)
+        if not game_ids:
+            return []
+        cursor = None
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(f"SELECT * FROM games WHERE game_id IN ({', '.join(['%s'] * len(game_ids))})", game_ids)
+            return [row_to_game(result) for result in cursor.fetchall()]
+        except Error as e:
+            logging.error(f"Error loading {len(game_ids)} games: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @_pooled
     def load_all_active_games(self):
         """Load all persisted games from database, regardless of state."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -393,20 +489,7 @@ class Database:
             results = cursor.fetchall()
             games = []
             for result in results:
-                games.append({
-                    'game_id': result['game_id'],
-                    'state': result['state'],
-                    'current_player_idx': result['current_player_idx'],
-                    'time_betting_started': result['time_betting_started'],
-                    'time_last_hand_ended': result['time_last_hand_ended'],
-                    'time_last_event': result['time_last_event'],
-                    'deck': json.loads(result['deck_json']),
-                    'discards': json.loads(result['discards_json']),
-                    'dealer_hand': json.loads(result['dealer_hand_json']),
-                    'players': json.loads(result['players_json']),
-                    'players_waiting': json.loads(result['players_waiting_json']),
-                    'bets': json.loads(result['bets_json']),
-                })
+                games.append(row_to_game(result))
             return games
         except Error as e:
             logging.error(f"Error loading active games: {e}")
@@ -415,10 +498,52 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
+    def load_journal(self, game_ids=None):
+        """Each game's journal since its last checkpoint, oldest entry
+        first: {game_id: [changed fields, ...]}. game_ids limits it to those
+        games; None loads every game's."""
+        if game_ids is not None:
+            game_ids = list(game_ids)
+            if not game_ids:
+                return {}
+        cursor = None
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            if game_ids is None:
+                cursor.execute("SELECT * FROM game_journal ORDER BY id")
+            else:
+                cursor.execute(
+                    f"SELECT * FROM game_journal WHERE game_id IN ({', '.join(['%s'] * len(game_ids))}) ORDER BY id",
+                    game_ids)
+            return journal_from_rows(cursor.fetchall())
+        except Error as e:
+            logging.error(f"Error loading game journal: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @_pooled
+    def list_game_ids(self):
+        """List the ids of all persisted games, without loading their state."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT game_id FROM games")
+            return [row[0] for row in cursor.fetchall()]
+        except Error as e:
+            logging.error(f"Error listing games: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @_pooled
     def delete_game(self, game_id):
         """Delete a game from database."""
         def fn(cursor):
+            cursor.execute("DELETE FROM game_journal WHERE game_id = %s", (game_id,))
             cursor.execute("DELETE FROM games WHERE game_id = %s", (game_id,))
             rows_affected = cursor.rowcount
             if rows_affected > 0:
@@ -427,7 +552,7 @@ class Database:
 
         return self._execute_write(fn, f"delete_game({game_id})")
 
-    @_synchronized
+    @_pooled
     def save_game_channel(self, game_id, guild_id, channel_id):
         """Save game-channel association for bot recovery."""
         def fn(cursor):
@@ -443,10 +568,9 @@ class Database:
 
         return self._execute_write(fn, f"save_game_channel({game_id})")
 
-    @_synchronized
+    @_pooled
     def load_game_channels(self):
         """Load all game-channel associations."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -467,7 +591,7 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def delete_game_channel(self, game_id):
         """Delete a game-channel association."""
         def fn(cursor):
@@ -481,7 +605,7 @@ class Database:
 
         return self._execute_write(fn, f"delete_game_channel({game_id})")
 
-    @_synchronized
+    @_pooled
     def create_npc(self, name, personality_name, wallet_cents):
         """Create a new NPC record. Returns the new npc id."""
         def fn(cursor):
@@ -491,10 +615,9 @@ class Database:
             return cursor.lastrowid
         return self._execute_write(fn, f"create_npc({name})")
 
-    @_synchronized
+    @_pooled
     def get_available_npcs(self, limit, exclude_personality_names=None):
         """Get available NPCs (current_game_id IS NULL). Returns list of dicts."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -520,10 +643,9 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def get_npc_by_id(self, npc_id):
         """Get NPC by id. Returns dict or None."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -536,10 +658,27 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
+    def get_npcs_by_ids(self, npc_ids):
+        """Get many NPCs in one query. Returns {id: dict}; ids not found are left out."""
+        npc_ids = list(npc_ids)
+        if not npc_ids:
+            return {}
+        cursor = None
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(f"SELECT * FROM npcs WHERE id IN ({', '.join(['%s'] * len(npc_ids))})", npc_ids)
+            return {row['id']: row for row in cursor.fetchall()}
+        except Error as e:
+            logging.error(f"Error getting {len(npc_ids)} NPCs: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @_pooled
     def get_all_npcs(self):
         """Get all NPCs ordered by name. Returns list of dicts."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -552,10 +691,9 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def find_npc_by_name(self, name):
         """Find an NPC by name (case-insensitive). Returns dict or None."""
-        self._connect()
         self.connection.commit()  # end any open txn so we read the latest committed data
         cursor = None
         try:
@@ -569,10 +707,9 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def get_npc_wallet(self, npc_id):
         """Get NPC wallet balance in cents. Returns int or None."""
-        self._connect()
         self.connection.commit()  # end any open txn so we read the latest committed data
         cursor = None
         try:
@@ -587,7 +724,7 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def update_npc_wallet(self, npc_id, amount_cents):
         """Add amount_cents to NPC wallet. Returns True on success, False if would go negative."""
         def fn(cursor):
@@ -605,7 +742,54 @@ class Database:
             return cursor.rowcount > 0
         return self._execute_write(fn, f"update_npc_wallet({npc_id})")
 
-    @_synchronized
+    @_pooled
+    def get_npcs_below_target(self, targets):
+        """Idle NPCs whose wallet is below their personality's target, as
+        dicts of id, personality_name and wallet_cents. targets maps a
+        personality's name to its target in cents; NPCs with any other
+        personality are left out."""
+        if not targets:
+            return []
+        cursor = None
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT id, personality_name, wallet_cents FROM npcs
+                WHERE current_game_id IS NULL
+                  AND wallet_cents < CASE personality_name {' '.join(['WHEN %s THEN %s'] * len(targets))} END
+            """, [value for item in targets.items() for value in item])
+            return cursor.fetchall()
+        except Error as e:
+            logging.error(f"Error getting NPCs below their target wallet: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @_pooled
+    def credit_idle_npc_wallets(self, credits):
+        """Add to many idle NPCs' wallets in one transaction, a bulk UPDATE
+        per _BULK_UPDATE_ROWS. credits maps npc id -> cents; an NPC seated
+        since it was picked is skipped. Returns how many were credited."""
+        credits = list(credits.items())
+        if not credits:
+            return 0
+
+        def fn(cursor):
+            credited = 0
+            for start in range(0, len(credits), _BULK_UPDATE_ROWS):
+                chunk = credits[start:start + _BULK_UPDATE_ROWS]
+                cursor.execute(f"""
+                    UPDATE npcs SET wallet_cents = wallet_cents + CASE id
+                        {' '.join(['WHEN %s THEN %s'] * len(chunk))} END
+                    WHERE current_game_id IS NULL AND id IN ({', '.join(['%s'] * len(chunk))})
+                """, [value for npc_id, cents in chunk for value in (npc_id, int(cents))]
+                    + [npc_id for npc_id, _ in chunk])
+                credited += cursor.rowcount
+            return credited
+        return self._execute_write(fn, f"credit_idle_npc_wallets({len(credits)} NPCs)")
+
+    @_pooled
     def set_npc_wallet(self, npc_id, amount_cents):
         """Set an NPC's wallet to an absolute amount in cents. Returns True on success."""
         def fn(cursor):
@@ -615,7 +799,7 @@ class Database:
             return cursor.rowcount > 0
         return self._execute_write(fn, f"set_npc_wallet({npc_id})")
 
-    @_synchronized
+    @_pooled
     def set_npc_game(self, npc_id, game_id):
         """Assign NPC to a game and update last_played_at."""
         def fn(cursor):
@@ -625,7 +809,7 @@ class Database:
             """, (game_id, npc_id))
         return self._execute_write(fn, f"set_npc_game({npc_id})")
 
-    @_synchronized
+    @_pooled
     def clear_npc_game(self, npc_id):
         """Clear an NPC's current_game_id."""
         def fn(cursor):
@@ -634,10 +818,9 @@ class Database:
             )
         return self._execute_write(fn, f"clear_npc_game({npc_id})")
 
-    @_synchronized
+    @_pooled
     def count_npcs(self):
         """Return total number of NPC records."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor()
@@ -650,7 +833,7 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def clear_stale_npc_games(self, active_game_ids):
         """Clear current_game_id for NPCs whose game is no longer active."""
         def fn(cursor):
@@ -666,14 +849,14 @@ class Database:
                 cursor.execute("UPDATE npcs SET current_game_id = NULL WHERE current_game_id IS NOT NULL")
         return self._execute_write(fn, "clear_stale_npc_games")
 
-    @_synchronized
+    @_pooled
     def update_npc_backstory(self, npc_id, backstory):
         """Set the backstory text for an NPC."""
         def fn(cursor):
             cursor.execute("UPDATE npcs SET backstory = %s WHERE id = %s", (backstory, npc_id))
         return self._execute_write(fn, f"update_npc_backstory({npc_id})")
 
-    @_synchronized
+    @_pooled
     def add_npc_memory(self, npc_id, game_id, session_summary, max_rows):
         """Insert a session memory for an NPC, pruning to the max_rows most recent."""
         def fn(cursor):
@@ -693,10 +876,9 @@ class Database:
             return memory_id
         return self._execute_write(fn, f"add_npc_memory({npc_id})")
 
-    @_synchronized
+    @_pooled
     def get_npc_memories(self, npc_id, limit):
         """Return the most recent session memories for an NPC, newest first. List of dicts."""
-        self._connect()
         self.connection.commit()  # end any open txn so we read the latest committed data
         cursor = None
         try:
@@ -713,7 +895,36 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
+    def get_recent_npc_memories(self, npc_ids, limit):
+        """get_npc_memories() for many NPCs in one query: {npc_id: [dict, ...]},
+        each list newest first. NPCs without memories are left out."""
+        npc_ids = list(npc_ids)
+        if not npc_ids:
+            return {}
+        self.connection.commit()  # end any open txn so we read the latest committed data
+        cursor = None
+        try:
+            cursor = self.connection.cursor(dictionary=True)
+            cursor.execute(f"""
+                SELECT * FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY npc_id ORDER BY id DESC) AS recency
+                    FROM npc_memories WHERE npc_id IN ({', '.join(['%s'] * len(npc_ids))})
+                ) AS recent WHERE recency <= %s ORDER BY npc_id, id DESC
+            """, npc_ids + [int(limit)])
+            memories = {}
+            for row in cursor.fetchall():
+                del row['recency']
+                memories.setdefault(row['npc_id'], []).append(row)
+            return memories
+        except Error as e:
+            logging.error(f"Error getting memories for {len(npc_ids)} NPCs: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    @_pooled
     def log_llm_usage(self, purpose, model, input_tokens, output_tokens, npc_id=None, game_id=None):
         """Record a single LLM API call for usage tracking."""
         def fn(cursor):
@@ -723,10 +934,24 @@ class Database:
             """, (purpose, model, input_tokens, output_tokens, npc_id, game_id))
         return self._execute_write(fn, "log_llm_usage")
 
-    @_synchronized
+    @_pooled
+    def log_llm_usage_many(self, rows):
+        """log_llm_usage() for many calls in one multi-row INSERT. rows holds
+        (purpose, model, input_tokens, output_tokens, npc_id, game_id)."""
+        rows = list(rows)
+        if not rows:
+            return
+
+        def fn(cursor):
+            cursor.executemany("""
+                INSERT INTO llm_usage (purpose, model, input_tokens, output_tokens, npc_id, game_id)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, rows)
+        return self._execute_write(fn, f"log_llm_usage_many({len(rows)} rows)")
+
+    @_pooled
     def get_llm_usage_summary(self, days=7):
         """Return token totals grouped by purpose for the past N days."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -748,7 +973,7 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def increment_games_played(self, username):
         """Increment games_played and refresh last_seen for a human player."""
         def fn(cursor):
@@ -758,7 +983,7 @@ class Database:
             """, (username,))
         return self._execute_write(fn, f"increment_games_played({username})")
 
-    @_synchronized
+    @_pooled
     def update_player_stats(self, username, won_cents=0, lost_cents=0):
         """Record the outcome of a hand for a human player. Amounts are in cents."""
         def fn(cursor):
@@ -773,10 +998,9 @@ class Database:
             """, (won_cents, lost_cents, won_cents, username))
         return self._execute_write(fn, f"update_player_stats({username})")
 
-    @_synchronized
+    @_pooled
     def get_player_stats(self, username):
         """Return stats dict for a player, or None if not found. Money fields are in cents."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor(dictionary=True)
@@ -803,10 +1027,9 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def get_setting(self, key, default=None):
         """Get a runtime setting value (string), or default if not set."""
-        self._connect()
         cursor = None
         try:
             cursor = self.connection.cursor()
@@ -822,7 +1045,7 @@ class Database:
             if cursor:
                 cursor.close()
 
-    @_synchronized
+    @_pooled
     def set_setting(self, key, value):
         """Set a runtime setting value (stored as a string), upserting on key."""
         def fn(cursor):
@@ -833,9 +1056,11 @@ class Database:
             logging.debug(f"Set setting {key} = {value}")
         return self._execute_write(fn, f"set_setting({key})")
 
-    @_synchronized
+    def pool_stats(self):
+        """The connection pool's metrics (see ConnectionPool.stats())."""
+        return self._pool.stats()
+
     def close(self):
-        """Close the database connection."""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            logging.info("Database connection closed")
+        """Close the pool's connections."""
+        self._pool.close()
+        logging.info("Database connections closed")
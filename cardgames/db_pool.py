@@ -0,0 +1,127 @@
+"""A bounded pool of database connections, checked out per call.
+
+The MySQL backend used to share one connection behind a lock, so the game
+loop's reads queued behind every NPC worker's usage log and memory write.
+Each call now checks out a connection of its own; at most `size` are open,
+and a call that finds them all busy waits for one to come back.
+"""
+import logging
+import threading
+import time
+
+
+class ConnectionPool:
+    def __init__(self, connect, size, check=None, reset=None):
+        """connect() opens a new connection. check(connection), if given,
+        runs on each checkout and returns the connection fit for use (e.g.
+        after a ping that reconnects); raising discards it for a new one.
+        reset(connection), if given, runs on each release before the
+        connection goes idle (e.g. ending its open transaction); raising
+        discards it."""
+        if size < 1:
+            raise ValueError(f"Pool size must be at least 1, not {size}")
+        self.size = size
+        self._connect = connect
+        self._check = check
+        self._reset = reset
+        self._idle = []   # most recently returned last, so hot connections get reused
+        self._open = 0    # connections open or being opened, idle or not
+        self._in_use = 0
+        self._waiters = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0,
+                       'opened': 0, 'discarded': 0}
+
+    def acquire(self):
+        """Check out a connection, waiting for one if all `size` are busy."""
+        started = time.monotonic()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if not self._idle and self._open >= self.size:
+                self._stats['waits'] += 1
+                self._waiters += 1
+                try:
+                    while not self._idle and self._open >= self.size and not self._closed:
+                        self._cond.wait()
+                finally:
+                    self._waiters -= 1
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                self._open += 1  # hold its place while it connects
+            self._in_use += 1
+            waited = time.monotonic() - started
+            self._stats['checkouts'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+
+        try:
+            if connection is not None and self._check is not None:
+                try:
+                    return self._check(connection)
+                except Exception as e:
+                    logging.warning(f"Discarding pooled connection: {e}")
+                    self._close(connection)
+                    with self._cond:
+                        self._stats['discarded'] += 1
+                    connection = None
+            if connection is None:
+                connection = self._connect()
+                with self._cond:
+                    self._stats['opened'] += 1
+            return connection
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection, discard=False):
+        """Return a checked-out connection. discard closes it instead, for
+        one left in an unknown state, and after close() it's closed too."""
+        if not discard and self._reset is not None:
+            try:
+                self._reset(connection)
+            except Exception as e:
+                logging.warning(f"Discarding pooled connection: {e}")
+                discard = True
+        with self._cond:
+            closing = discard or self._closed
+            self._in_use -= 1
+            if closing:
+                self._open -= 1
+                self._stats['discarded'] += discard
+            else:
+                self._idle.append(connection)
+            self._cond.notify()
+        if closing:
+            self._close(connection)
+
+    def stats(self):
+        """Pool metrics: connections open and in use, callers waiting now,
+        and checkout counts and wait times since start."""
+        with self._cond:
+            return dict(self._stats, size=self.size, open=self._open, in_use=self._in_use,
+                        waiters=self._waiters)
+
+    def close(self):
+        """Close the idle connections; ones checked out close on release.
+        Checkouts after this, and callers still waiting, get RuntimeError."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for connection in idle:
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
@@ -0,0 +1,188 @@
+"""Table events, and the saloon-flavoured text clients show for them.
+
+The casino publishes what happens at a table as typed events rather than
+finished sentences: a dict with a 'type' plus the facts a client needs
+(player names, cards as serialized codes, amounts in cents). Each client
+decides which events to show and how; render_event() is the shared
+Western voice the Discord bot and the CLI both use.
+"""
+from .blackjack import str_to_card
+from .money import format_cents
+
+
+def _label(name, npc_type=None):
+    """Display name with the NPC type indicator, as the server logs it."""
+    if npc_type == 'llm':
+        return f"{name} (AI)"
+    if npc_type == 'simple':
+        return f"{name} (bot)"
+    return name
+
+
+def _card(code):
+    return str(str_to_card(code))
+
+
+def _hand(codes):
+    return ", ".join(_card(code) for code in codes)
+
+
+def _wad(balance_cents):
+    """The wallet suffix for a human's line; NPC balances are never sent."""
+    return "" if balance_cents is None else f" 💰 Wad: ${format_cents(balance_cents)}"
+
+
+def _player_joined(e):
+    when = "They're in for this round!" if e['this_round'] else "They'll join the next hand."
+    return f"🪑 {_label(e['player'], e.get('npc_type'))} pulls up a chair. {when}"
+
+
+def _player_left(e):
+    player, reason = e['player'], e.get('reason')
+    if reason == 'waiting':
+        return f"👋 {player} tips their hat and moseys on."
+    if reason == 'bet_returned':
+        return f"💨 {player} hightails it before the deal! Their ${format_cents(e['amount_cents'])} bet is returned."
+    if reason == 'settle_later':
+        return f"💨 {player} hightails it outta here! Their hand will be settled when the dust clears."
+    if reason == 'bet_forfeited':
+        return f"💨 {player} hightails it outta here! Their ${format_cents(e['amount_cents'])} stays with the house."
+    if reason == 'broke':
+        return f"💸 {player} is tapped out and tips their hat goodbye."
+    if reason == 'night':
+        return f"🌙 {player} reckons it's time to call it a night and heads for the door."
+    return f"👋 {player} tips their hat and leaves the table."
+
+
+def _table_empty(e):
+    if e.get('phase') == 'betting':
+        return "🌵 The table's gone quiet... everyone's vamoosed."
+    return "🌵 Table's empty. Everyone's skedaddled."
+
+
+def _betting_opened(e):
+    return (
+        "💰 Ante up, folks! Place your bets!\n"
+        f"🎰 Table limits: ${format_cents(e['min_bet_cents'])} to ${format_cents(e['max_bet_cents'])}\n"
+        f"⏱️ You've got {e['seconds']} seconds before the cards fly."
+    )
+
+
+def _wallets(e):
+    wads = [f"{w['player']}: ???" if w['balance_cents'] is None
+            else f"{w['player']}: ${format_cents(w['balance_cents'])}"
+            for w in e['wallets']]
+    return "💰 Wads: " + ", ".join(wads)
+
+
+def _bet_placed(e):
+    return f"💵 {e['player']} throws ${format_cents(e['amount_cents'])} on the table.{_wad(e.get('balance_cents'))}"
+
+
+def _hand_started(e):
+    seated = ", ".join(_label(p['name'], p.get('npc_type')) for p in e['players'])
+    return f"🃏 The dealer shuffles and deals...\n🎲 At the table: {seated}"
+
+
+def _hand_dealt(e):
+    if e.get('score') is None:
+        return f"🎴 {e['player']} has {_hand(e['cards'])}"
+    return f"🎴 {e['player']} has {_hand(e['cards'])} ({e['score']})"
+
+
+def _your_turn(e):
+    prompt = f"👉 {e['player']}, you're up, partner. Hit or stand?"
+    if e.get('cards'):
+        return f"🎴 {e['player']}'s got {_hand(e['cards'])} ({e['score']})\n{prompt}"
+    return prompt
+
+
+_RESULTS = {
+    'bust': "💥 {tag}went bust! ${amount} lost to the house.",
+    'win': "🏆 {tag}strikes gold! Payout: ${amount}",
+    'push': "🤝 {tag}pushes with the dealer. ${amount} returned.",
+    'lose': "❌ {tag}loses to the house. ${amount} gone.",
+}
+
+
+def _hand_result(e):
+    tag = "(already left) " if e.get('departed') else ""
+    result = _RESULTS[e['outcome']].format(tag=tag, amount=format_cents(e['amount_cents']))
+    return f"{e['player']} {result}{_wad(e.get('balance_cents'))}"
+
+
+def _card_dealt(e):
+    if e.get('player') is None:
+        return f"🃏 Dealer draws... {_card(e['card'])}"
+    return f"🃏 {e['player']} draws... {_card(e['card'])}\n🎴 {e['player']}'s showing {_hand(e['cards'])}"
+
+
+def _hit_21(e):
+    return f"🎯 {e.get('player') or 'Dealer'} hits 21!"
+
+
+def _bust(e):
+    if e.get('player') is None:
+        return "💥 Dealer busts! The house crumbles!"
+    return f"💥 {e['player']} busts! Too greedy, partner."
+
+
+def _stand(e):
+    if e.get('player') is None:
+        return f"✋ Dealer stands at {e['score']}."
+    return f"✋ {e['player']} stands pat."
+
+
+def _npc_arrivals(e):
+    arrivals = ", ".join(f"{npc['emoji']} {npc['name']}" for npc in e['players'])
+    when = "They're in for this round!" if e['this_round'] else "They'll join the next hand."
+    return f"🎭 New arrivals: {arrivals}. {when}"
+
+
+def _game_stopped(e):
+    if not e['refunds']:
+        return "🛑 Game called early. No bets to return."
+    refunds = ", ".join(f"{r['player']} (${format_cents(r['amount_cents'])})" for r in e['refunds'])
+    return f"🛑 Game called early! Returning bets: {refunds}"
+
+
+_RENDERERS = {
+    'player_joined': _player_joined,
+    'player_left': _player_left,
+    'table_empty': _table_empty,
+    'betting_soon': lambda e: f"🕐 Betting starts in {e['seconds']} seconds — get your chips ready!",
+    'betting_opened': _betting_opened,
+    'wallets': _wallets,
+    'bet_placed': _bet_placed,
+    'quip': lambda e: f"🤠 {e['player']}: \"{e['text']}\"",
+    'betting_closed': lambda e: "⏰ Time's up! The clock don't wait for nobody.",
+    'sitting_out': lambda e: f"⏭️ {e['player']} didn't put up any coin. They're sittin' this one out.",
+    'no_bets': lambda e: "⏸️ Nobody's got skin in the game. Dealer waits...",
+    'hand_started': _hand_started,
+    'dealer_showing': lambda e: f"👀 Dealer's showing {_card(e['card'])}.",
+    'dealer_blackjack': lambda e: f"🎰 Dealer flips {_card(e['card'])}. Blackjack! House wins.",
+    'hand_dealt': _hand_dealt,
+    'your_turn': _your_turn,
+    'turn_reminder': lambda e: f"⏱️ Hey {e['player']}! We ain't got all day. Hit or stand?",
+    'card_dealt': _card_dealt,
+    'hit_21': _hit_21,
+    'bust': _bust,
+    'stand': _stand,
+    'dealer_turn': lambda e: "👁️ All eyes on the dealer...",
+    'hole_card': lambda e: "🔄 Dealer flips the hole card...",
+    'dealer_hand': lambda e: f"🎴 Dealer's got {_hand(e['cards'])}",
+    'showdown': lambda e: f"✨ ~*~ The dust settles... ~*~ ✨\nDealer's sitting at {e['dealer_score']}.",
+    'hand_result': _hand_result,
+    'hand_over': lambda e: None,  # marks the end of the results; nothing to say
+    'npc_arrivals': _npc_arrivals,
+    'game_stopped': _game_stopped,
+    'error': lambda e: e['message'],
+}
+
+
+def render_event(event):
+    """The text for a table event, or None for one with nothing to show,
+    including event types this version doesn't know (so older clients
+    skip newer events)."""
+    renderer = _RENDERERS.get(event.get('type'))
+    return renderer(event) if renderer else None
@@ -0,0 +1,95 @@
+"""How a game's snapshot maps onto its database rows, for both backends.
+
+A game is one row of `games` (its scalar fields, plus the cards, seats and
+bets packed by snapshot_codec.py) and, between checkpoints, rows of
+`game_journal` holding just the fields that changed. The builders here
+turn snapshots into the parameters for those rows and rows back into
+snapshots; each backend keeps only its SQL, which takes the parameters in
+GAME_COLUMNS order.
+"""
+import json
+
+from .snapshot_codec import PACKED_FIELDS, pack_snapshot, unpack_snapshot
+
+# (column, the to_dict() fields it holds, how they're encoded) for each
+# column of a game's row after game_id; None stores the one field as is
+GAME_COLUMNS = (
+    ('state', ('state',), None),
+    ('current_player_idx', ('current_player_idx',), None),
+    ('time_betting_started', ('time_betting_started',), None),
+    ('time_last_hand_ended', ('time_last_hand_ended',), None),
+    ('time_last_event', ('time_last_event',), None),
+    ('packed_state', PACKED_FIELDS, pack_snapshot),
+)
+
+
+def game_row(game_id, game_data):
+    """A games row's parameters for a game's whole snapshot: game_id, then
+    GAME_COLUMNS."""
+    return (game_id,) + tuple(encode(game_data) if encode else game_data[fields[0]]
+                              for _, fields, encode in GAME_COLUMNS)
+
+
+def journal_entry(game_id, changes):
+    """A game_journal row's parameters (game_id, fields_json, packed_state)
+    for the fields of a game's snapshot that changed, or None if none of
+    them are stored."""
+    fields = {fields[0]: changes[fields[0]] for _, fields, encode in GAME_COLUMNS
+              if encode is None and fields[0] in changes}
+    packed = pack_snapshot(changes) if any(field in changes for field in PACKED_FIELDS) else None
+    if not fields and packed is None:
+        return None
+    return (game_id, json.dumps(fields), packed)
+
+
+def game_writes(snapshots):
+    """games rows for the (game_id, game_data, writes) snapshots that are
+    whole (checkpoints), and journal entries for those holding only the
+    fields that changed since the table's last save."""
+    rows, entries = [], []
+    for game_id, game_data, _ in snapshots:
+        if game_data is None:
+            continue
+        if all(field in game_data for _, fields, _ in GAME_COLUMNS for field in fields):
+            rows.append(game_row(game_id, game_data))
+        else:
+            entry = journal_entry(game_id, game_data)
+            if entry is not None:
+                entries.append(entry)
+    return rows, entries
+
+
+def row_to_game(result):
+    """A game's snapshot from its games row."""
+    if result['packed_state'] is not None:
+        packed = unpack_snapshot(result['packed_state'])
+    else:  # saved before migration 8
+        packed = {
+            'deck': json.loads(result['deck_json']),
+            'discards': json.loads(result['discards_json']),
+            'dealer_hand': json.loads(result['dealer_hand_json']),
+            'players': json.loads(result['players_json']),
+            'players_waiting': json.loads(result['players_waiting_json']),
+            'bets': json.loads(result['bets_json']),
+            'departed_players': [],
+        }
+    return {
+        'game_id': result['game_id'],
+        'state': result['state'],
+        'current_player_idx': result['current_player_idx'],
+        'time_betting_started': result['time_betting_started'],
+        'time_last_hand_ended': result['time_last_hand_ended'],
+        'time_last_event': result['time_last_event'],
+        **packed,
+    }
+
+
+def journal_from_rows(rows):
+    """{game_id: [changed fields, ...]} from game_journal rows, in row order."""
+    journal = {}
+    for row in rows:
+        changes = json.loads(row['fields_json'])
+        if row['packed_state'] is not None:
+            changes.update(unpack_snapshot(row['packed_state']))
+        journal.setdefault(row['game_id'], []).append(changes)
+    return journal
@@ -0,0 +1,135 @@
+"""Game ownership leases, so several casino processes can split the tables.
+
+Each casino process is a shard. A shard owns a game while it holds the
+game's lease: a Redis key naming the shard, with a TTL the shard keeps
+renewing. If a shard dies its leases lapse and the other shards claim the
+games and reload them from the database. Shards also advertise how many
+tables they run, so new games can be routed to the least-loaded one.
+"""
+import os
+
+LEASE_KEY = "casino_lease:{}"          # game_id -> owning shard
+SHARD_LOAD_KEY = "casino_shard_load"   # sorted set: shard -> tables it runs
+SHARD_ALIVE_KEY = "casino_shard_alive:{}"
+SHARD_STREAM = "casino_commands:{}"    # commands for one shard's games
+
+LEASE_TTL_MS = int(os.environ.get("CASINO_LEASE_TTL_MS", "15000"))
+
+# Renews (or takes) every lease in KEYS for the shard in ARGV[1]. A lease
+# that has lapsed is only taken when ARGV[3] is '1'; a lease held by another
+# shard is never touched. Returns 1/0 per key: whether the shard holds it now.
+_CLAIM_SCRIPT = """
+local held = {}
+for i, key in ipairs(KEYS) do
+    local owner = redis.call('GET', key)
+    if owner == ARGV[1] or (not owner and ARGV[3] == '1') then
+        redis.call('SET', key, ARGV[1], 'PX', ARGV[2])
+        held[i] = 1
+    else
+        held[i] = 0
+    end
+end
+return held
+"""
+
+_RELEASE_SCRIPT = """
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        redis.call('DEL', key)
+    end
+end
+return 0
+"""
+
+
+def shard_stream(shard_id):
+    return SHARD_STREAM.format(shard_id)
+
+
+class GameLeases:
+    """A shard's view of the game leases, over an async Redis client."""
+
+    def __init__(self, client, shard_id, ttl_ms=LEASE_TTL_MS):
+        self.client = client
+        self.shard_id = shard_id
+        self.ttl_ms = ttl_ms
+        self._claim = client.register_script(_CLAIM_SCRIPT)
+        self._release = client.register_script(_RELEASE_SCRIPT)
+
+    async def _run_claim(self, game_ids, take_lapsed):
+        if not game_ids:
+            return set()
+        keys = [LEASE_KEY.format(game_id) for game_id in game_ids]
+        held = await self._claim(keys=keys, args=[self.shard_id, self.ttl_ms, '1' if take_lapsed else '0'])
+        return {game_id for game_id, ok in zip(game_ids, held) if ok}
+
+    async def claim(self, game_ids):
+        """Take the leases on games nobody holds (or this shard already
+        holds). Returns the ids this shard now owns."""
+        return await self._run_claim(list(game_ids), take_lapsed=True)
+
+    async def retake(self, game_ids):
+        """Keep only leases this shard still holds, e.g. after a quick restart."""
+        return await self._run_claim(list(game_ids), take_lapsed=False)
+
+    async def renew(self, game_ids):
+        """Extend this shard's leases. A lease that lapsed without anyone
+        else taking it is simply taken back. Returns the ids now owned by
+        another shard."""
+        game_ids = list(game_ids)
+        return set(game_ids) - await self._run_claim(game_ids, take_lapsed=True)
+
+    async def release(self, game_ids):
+        game_ids = list(game_ids)
+        if game_ids:
+            await self._release(keys=[LEASE_KEY.format(game_id) for game_id in game_ids], args=[self.shard_id])
+
+    async def owners(self, game_ids):
+        """game_id -> owning shard id, or None where no lease is held."""
+        game_ids = list(game_ids)
+        if not game_ids:
+            return {}
+        values = await self.client.mget([LEASE_KEY.format(game_id) for game_id in game_ids])
+        return {game_id: value.decode() if value else None for game_id, value in zip(game_ids, values)}
+
+    async def heartbeat(self, tables):
+        """Advertise this shard as alive and running `tables` tables."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(SHARD_LOAD_KEY, {self.shard_id: tables})
+        pipe.set(SHARD_ALIVE_KEY.format(self.shard_id), 1, px=self.ttl_ms)
+        await pipe.execute()
+
+    async def shard_loads(self):
+        """Split the advertised shards into (live shard -> tables, dead shard ids).
+
+        Dead shards stop renewing their alive key but stay in the load set
+        until another shard has taken over their pending commands and calls
+        forget().
+        """
+        loads = await self.client.zrange(SHARD_LOAD_KEY, 0, -1, withscores=True)
+        if not loads:
+            return {}, []
+        pipe = self.client.pipeline(transaction=False)
+        for shard, _ in loads:
+            pipe.exists(SHARD_ALIVE_KEY.format(shard.decode()))
+        alive = await pipe.execute()
+        live, dead = {}, []
+        for (shard, tables), is_alive in zip(loads, alive):
+            if is_alive:
+                live[shard.decode()] = int(tables)
+            else:
+                dead.append(shard.decode())
+        return live, dead
+
+    async def least_loaded(self):
+        """The live shard running the fewest tables (this one on a tie or
+        when nothing is advertised), counting one more table against it so
+        a burst of new games spreads out before the next heartbeats."""
+        live, _ = await self.shard_loads()
+        live.setdefault(self.shard_id, 0)
+        target = min(live, key=lambda shard: (live[shard], shard != self.shard_id))
+        await self.client.zincrby(SHARD_LOAD_KEY, 1, target)
+        return target
+
+    async def forget(self, shard_id):
+        await self.client.zrem(SHARD_LOAD_KEY, shard_id)
@@ -67,6 +67,13 @@ class LLMBlackjackNPC(NPCPlayer):
         """Fraction of the session event buffer currently filled (0.0–1.0)."""
         return len(self._session_events) / (self._session_events.maxlen or 1)
 
+    @property
+    def pending_decision(self):
+        for future in (self._pending_action_future, self._pending_bet_future):
+            if future is not None and not future.done():
+                return future
+        return None
+
     def decide_action(self, hand, dealer_visible_card, score):
         if self._pending_action_future is None:
             logger.info("LLM action call submitted for %s", self.name)
@@ -18,6 +18,17 @@ class NPCPlayer(Player, ABC):
         self.npc_db_id = npc_db_id
         self.backstory = backstory
 
+    @property
+    def pending_decision(self):
+        """The concurrent.futures.Future of a decide_bet()/decide_action()
+        answer still being worked out in the background, or None. Strategies
+        that answer on the spot never have one."""
+        return None
+
+    @property
+    def decision_pending(self):
+        return self.pending_decision is not None
+
     @abstractmethod
     def decide_bet(self, min_bet, max_bet, wallet):
         """Decide how much to bet.
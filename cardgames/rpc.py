@@ -0,0 +1,191 @@
+"""Request/response calls between clients and the casino, over Redis.
+
+A call is a casino_action command on the command stream naming an action
+and carrying a request_id. The casino runs the handler registered for the
+action and publishes the reply on casino_update with the same request_id.
+
+RpcServer is the casino's side: one handler per action name, which may be
+a coroutine function when it has blocking work to wait on. RpcClient is
+a client's side: every call is an awaitable with a deadline, so a reply
+that never comes turns into RpcTimeout instead of an entry nobody clears.
+Both sides keep per-action latency stats for /debug.
+"""
+import asyncio
+import logging
+import time
+import uuid
+
+from .command_stream import send_command
+
+REPLY_CHANNEL = "casino_update"
+RPC_TIMEOUT = 10.0         # seconds a client waits for a reply
+RPC_MAX_IN_FLIGHT = 100    # calls a client may have awaiting replies at once
+
+
+class RpcError(Exception):
+    """A call failed: the casino answered with an error, or not at all."""
+
+
+class RpcTimeout(RpcError):
+    pass
+
+
+class RpcBusy(RpcError):
+    """Too many calls already awaiting replies."""
+
+
+class RpcStats:
+    """Call counts and latency per action."""
+
+    def __init__(self):
+        self._actions = {}
+
+    def record(self, action, seconds, outcome='ok'):
+        stats = self._actions.setdefault(action, {'calls': 0, 'errors': 0, 'timeouts': 0,
+                                                  'total_ms': 0.0, 'max_ms': 0.0})
+        ms = seconds * 1000
+        stats['calls'] += 1
+        stats['total_ms'] += ms
+        stats['max_ms'] = max(stats['max_ms'], ms)
+        if outcome == 'error':
+            stats['errors'] += 1
+        elif outcome == 'timeout':
+            stats['timeouts'] += 1
+
+    def as_dict(self):
+        """action -> {calls, errors, timeouts, avg_ms, max_ms}."""
+        return {
+            action: {
+                'calls': s['calls'],
+                'errors': s['errors'],
+                'timeouts': s['timeouts'],
+                'avg_ms': round(s['total_ms'] / s['calls'], 1),
+                'max_ms': round(s['max_ms'], 1),
+            }
+            for action, s in self._actions.items()
+        }
+
+
+class RpcServer:
+    """Dispatches calls to handlers registered by action name.
+
+    A handler takes the call's data dict and returns the reply's fields;
+    the reply is published with its event_type and the call's request_id.
+    A coroutine handler runs as a task on the running loop, so other work
+    carries on while it waits, and is answered when it finishes.
+    """
+
+    def __init__(self, publish):
+        self._publish = publish  # publish(channel, payload)
+        self._handlers = {}      # action -> (reply event_type, handler, required fields)
+        self._tasks = set()      # coroutine handlers still running
+        self.stats = RpcStats()
+
+    def register(self, action, reply_type, handler, required=()):
+        self._handlers[action] = (reply_type, handler, tuple(required))
+
+    def handles(self, action):
+        return action in self._handlers
+
+    def dispatch(self, data):
+        """Answer a call. A call missing its request_id or a required field
+        is dropped, as there's nobody to answer or nothing to answer with."""
+        action = data.get('action')
+        reply_type, handler, required = self._handlers[action]
+        request_id = data.get('request_id')
+        missing = [field for field in required if not data.get(field)]
+        if not request_id or missing:
+            logging.warning(f"Dropping {action} call without {', '.join(missing) or 'request_id'}")
+            return
+
+        start = time.monotonic()
+        if asyncio.iscoroutinefunction(handler):
+            task = asyncio.ensure_future(self._answer_async(data, handler(data), start))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return
+        try:
+            reply = handler(data)
+        except Exception:
+            reply = self._failed(data)
+        self._answer(data, reply, start)
+
+    async def _answer_async(self, data, pending, start):
+        try:
+            reply = await pending
+        except Exception:
+            reply = self._failed(data)
+        self._answer(data, reply, start)
+
+    @staticmethod
+    def _failed(data):
+        """The reply to a call whose handler raised (call from the except block)."""
+        logging.exception(f"Error handling {data['action']} call {data['request_id']}")
+        return {'error': f"The casino couldn't handle {data['action']}."}
+
+    def _answer(self, data, reply, start):
+        action = data['action']
+        self.stats.record(action, time.monotonic() - start, 'error' if 'error' in reply else 'ok')
+        self._publish(REPLY_CHANNEL, dict(reply, event_type=self._handlers[action][0],
+                                          request_id=data['request_id']))
+
+    async def drain(self):
+        """Wait until every call being answered has had its reply."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class RpcClient:
+    """Makes calls to the casino. Replies arrive on casino_update, which the
+    client's own subscriber hands to resolve()."""
+
+    def __init__(self, redis_client, timeout=RPC_TIMEOUT, max_in_flight=RPC_MAX_IN_FLIGHT):
+        self.redis = redis_client
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self._pending = {}  # request_id -> future awaiting the reply
+        self.stats = RpcStats()
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    async def call(self, action, timeout=None, **params):
+        """Send a call and wait for its reply's fields.
+
+        Raises RpcBusy when too many calls are awaiting replies, RpcTimeout
+        when no reply comes in time, and RpcError when the casino answers
+        with an error. Errors sending the call propagate as they are.
+        """
+        if len(self._pending) >= self.max_in_flight:
+            raise RpcBusy(f"{len(self._pending)} calls already awaiting replies")
+        timeout = self.timeout if timeout is None else timeout
+        request_id = str(uuid.uuid4())
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        start = time.monotonic()
+        outcome = 'error'
+        try:
+            message = dict(params, event_type='casino_action', action=action, request_id=request_id)
+            await send_command(self.redis, message)
+            try:
+                reply = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                outcome = 'timeout'
+                raise RpcTimeout(f"No reply to {action} within {timeout:g}s") from None
+            if 'error' in reply:
+                raise RpcError(reply['error'])
+            outcome = 'ok'
+            return reply
+        finally:
+            self._pending.pop(request_id, None)
+            self.stats.record(action, time.monotonic() - start, outcome)
+
+    def resolve(self, data):
+        """Hand a reply to the call awaiting it. Returns False for a reply
+        to no call in flight (another client's, or one that timed out)."""
+        future = self._pending.get(data.get('request_id'))
+        if future is None or future.done():
+            return False
+        future.set_result(data)
+        return True
@@ -0,0 +1,172 @@
+"""A compact binary encoding for the bulky part of a game's snapshot.
+
+A table's cards, seats and bets used to be stored as six JSON text columns
+of card strings like "H10": about 350 bytes for a full deck alone, parsed
+again on every load. pack_snapshot() stores the same fields in one BLOB:
+
+    version    1 byte (SNAPSHOT_VERSION)
+    deck, discards, dealer_hand
+               a card list each: varint count, then one byte per card
+    players, players_waiting
+               a seat list each: varint count, then per seat its name, a
+               flags byte, the NPC type, personality and DB id if set, and
+               its hand as a card list
+    bets       varint count, then per bet the player's name and varint cents
+    departed_players
+               a seat list (since version 2; version 1 snapshots have none)
+
+A card's byte is its suit's index in SUITS times 16 plus its value (2-14).
+Strings are a varint byte length then UTF-8; varints are unsigned LEB128.
+Fields go in and come out exactly as Blackjack.to_dict() has them.
+"""
+
+SNAPSHOT_VERSION = 2
+
+# The to_dict() fields packed together; a change to any rewrites them all
+PACKED_FIELDS = ('deck', 'discards', 'dealer_hand', 'players', 'players_waiting', 'bets', 'departed_players')
+
+SUITS = "HDCS"
+_NPC_TYPES = (None, 'simple', 'llm')
+
+# Card string <-> byte, for every card there is
+_CARD_BYTES = {f"{suit}{value}": i << 4 | value for i, suit in enumerate(SUITS) for value in range(2, 15)}
+_BYTE_CARDS = {byte: card for card, byte in _CARD_BYTES.items()}
+
+_NPC = 0x01
+_NPC_TYPE = 0x02
+_PERSONALITY = 0x04
+_NPC_DB_ID = 0x08
+
+
+def _put_varint(out, n):
+    if 0 <= n < 0x80:
+        out.append(n)
+        return
+    if n < 0:
+        raise ValueError(f"Can't pack a negative number: {n}")
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _put_str(out, s):
+    data = s.encode('utf-8')
+    _put_varint(out, len(data))
+    out += data
+
+
+def _put_cards(out, cards):
+    _put_varint(out, len(cards))
+    out += bytes(map(_CARD_BYTES.__getitem__, cards))
+
+
+def _put_seats(out, seats):
+    _put_varint(out, len(seats))
+    for seat in seats:
+        npc_type = seat.get('npc_type')
+        flags = ((_NPC if seat.get('is_npc') else 0)
+                 | (_NPC_TYPE if npc_type is not None else 0)
+                 | (_PERSONALITY if seat.get('npc_personality') is not None else 0)
+                 | (_NPC_DB_ID if seat.get('npc_db_id') is not None else 0))
+        _put_str(out, seat['name'])
+        out.append(flags)
+        if flags & _NPC_TYPE:
+            out.append(_NPC_TYPES.index(npc_type))
+        if flags & _PERSONALITY:
+            _put_str(out, seat['npc_personality'])
+        if flags & _NPC_DB_ID:
+            _put_varint(out, seat['npc_db_id'])
+        _put_cards(out, seat['hand'])
+
+
+def pack_snapshot(game_data):
+    """The PACKED_FIELDS of a to_dict() snapshot, as bytes."""
+    out = bytearray([SNAPSHOT_VERSION])
+    _put_cards(out, game_data['deck'])
+    _put_cards(out, game_data['discards'])
+    _put_cards(out, game_data['dealer_hand'])
+    _put_seats(out, game_data['players'])
+    _put_seats(out, game_data['players_waiting'])
+    _put_varint(out, len(game_data['bets']))
+    for name, cents in game_data['bets'].items():
+        _put_str(out, name)
+        _put_varint(out, cents)
+    _put_seats(out, game_data['departed_players'])
+    return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def byte(self):
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def varint(self):
+        b = self.data[self.pos]
+        if b < 0x80:
+            self.pos += 1
+            return b
+        n = shift = 0
+        while True:
+            b = self.byte()
+            n |= (b & 0x7F) << shift
+            if b < 0x80:
+                return n
+            shift += 7
+
+    def str(self):
+        length = self.varint()
+        start = self.pos
+        self.pos += length
+        return self.data[start:self.pos].decode('utf-8')
+
+    def cards(self):
+        count = self.varint()
+        start = self.pos
+        self.pos += count
+        return list(map(_BYTE_CARDS.__getitem__, self.data[start:self.pos]))
+
+    def seats(self):
+        seats = []
+        for _ in range(self.varint()):
+            name = self.str()
+            flags = self.byte()
+            if not flags:  # a human: nothing else to read
+                seats.append({'name': name, 'hand': self.cards(), 'is_npc': False, 'npc_type': None,
+                              'npc_personality': None, 'npc_db_id': None})
+                continue
+            npc_type = _NPC_TYPES[self.byte()] if flags & _NPC_TYPE else None
+            personality = self.str() if flags & _PERSONALITY else None
+            npc_db_id = self.varint() if flags & _NPC_DB_ID else None
+            seats.append({
+                'name': name,
+                'hand': self.cards(),
+                'is_npc': bool(flags & _NPC),
+                'npc_type': npc_type,
+                'npc_personality': personality,
+                'npc_db_id': npc_db_id,
+            })
+        return seats
+
+
+def unpack_snapshot(data):
+    """The PACKED_FIELDS packed by pack_snapshot(), as a dict."""
+    reader = _Reader(bytes(data))
+    version = reader.byte()
+    if version not in (1, SNAPSHOT_VERSION):
+        raise ValueError(f"Unknown snapshot version: {version}")
+    game_data = {
+        'deck': reader.cards(),
+        'discards': reader.cards(),
+        'dealer_hand': reader.cards(),
+        'players': reader.seats(),
+        'players_waiting': reader.seats(),
+    }
+    game_data['bets'] = {reader.str(): reader.varint() for _ in range(reader.varint())}
+    game_data['departed_players'] = reader.seats() if version >= 2 else []
+    return game_data
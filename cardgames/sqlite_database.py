@@ -1,20 +1,47 @@
 import functools
-import json
 import logging
+import queue
 import sqlite3
 import threading
+from concurrent.futures import Future
+
+from .db_pool import ConnectionPool
+from .game_rows import game_row, game_writes, journal_from_rows, row_to_game
 
 DEFAULT_WALLET = 200.0
 
 
-def _synchronized(method):
-    """Serialize access to the shared DB connection: the main game loop and
-    NPC worker threads (usage logging, session memories) all use this object,
-    and the underlying connection is not safe for concurrent use."""
+READER_POOL_SIZE = 4
+WRITE_BATCH_MAX = 200  # most queued writes the writer thread commits together
+_BULK_UPDATE_ROWS = 500  # rows per CASE in a bulk UPDATE, under SQLite's limit on parameters
+
+
+def _reads(method):
+    """Run a query on a read-only connection of its own. In WAL mode it
+    reads the last commit without waiting for the writer or other readers.
+    An in-memory database has only the writer's connection, so there
+    queries queue with the writes."""
     @functools.wraps(method)
     def wrapper(self, *args, **kwargs):
-        with self._lock:
+        if self._readers is None:
+            return self._submit(method, args, kwargs)
+        if getattr(self._local, 'connection', None) is not None:
+            return method(self, *args, **kwargs)
+        self._local.connection = self._readers.acquire()
+        try:
             return method(self, *args, **kwargs)
+        finally:
+            connection, self._local.connection = self._local.connection, None
+            self._readers.release(connection)
+    return wrapper
+
+
+def _writes(method):
+    """Run the method on the writer thread, inside the transaction of the
+    next batch of queued writes, and wait for the batch to commit."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self._submit(method, args, kwargs)
     return wrapper
 
 
@@ -116,25 +143,111 @@ MIGRATIONS = [
         )""",
         "CREATE INDEX IF NOT EXISTS idx_npc_memories_npc ON npc_memories (npc_id)",
     ],
+    [   # Migration 8: cards, seats and bets packed into one BLOB (see snapshot_codec.py)
+        "ALTER TABLE games ADD COLUMN packed_state BLOB NULL",
+    ],
+    [   # Migration 9: per-table journal of changes since the last checkpoint
+        """CREATE TABLE IF NOT EXISTS game_journal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            game_id TEXT NOT NULL,
+            fields_json TEXT NOT NULL,
+            packed_state BLOB NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_game_journal_game ON game_journal (game_id, id)",
+    ],
 ]
 
 
 class SqliteDatabase:
-    def __init__(self, db_path):
+    def __init__(self, db_path, readers=READER_POOL_SIZE):
+        """Writes all go through one writer thread, which commits whatever
+        has queued up as one transaction; queries run on a pool of up to
+        `readers` read-only connections."""
         self.db_path = db_path
-        self.connection = None
-        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._writer = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._writer.row_factory = sqlite3.Row
+        self._writer.execute("PRAGMA foreign_keys = ON")
+        wal = self._writer.execute("PRAGMA journal_mode = WAL").fetchone()[0] == 'wal'
+        if wal:
+            # WAL stays consistent through a crash at NORMAL; it only syncs at checkpoints
+            self._writer.execute("PRAGMA synchronous = NORMAL")
+        logging.info(f"Connected to SQLite database: {db_path} ({'WAL' if wal else 'in memory'})")
         self._init_database()
-
-    def _connect(self):
-        if self.connection is None:
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.connection.row_factory = sqlite3.Row
-            self.connection.execute("PRAGMA foreign_keys = ON")
-            logging.info(f"Connected to SQLite database: {self.db_path}")
+        self._readers = ConnectionPool(self._open_reader, readers) if wal else None
+        self._write_queue = queue.Queue()
+        self._closed = False
+        self._closing = threading.Lock()  # nothing is queued once close() has queued the stop
+        self._writer_thread = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer_thread.start()
+
+    @property
+    def connection(self):
+        """The connection for the current call: the reader it checked out,
+        or else the writer's."""
+        return getattr(self._local, 'connection', None) or self._writer
+
+    def _open_reader(self):
+        connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    def _submit(self, method, args, kwargs):
+        if threading.current_thread() is self._writer_thread:
+            return method(self, *args, **kwargs)
+        future = Future()
+        with self._closing:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+            self._write_queue.put((functools.partial(method, self, *args, **kwargs), future))
+        return future.result()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._write_queue.get()]
+            while batch[-1] is not None and len(batch) < WRITE_BATCH_MAX:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            if stopping:
+                batch.pop()
+            if batch:
+                self._commit_batch(batch)
+            if stopping:
+                return
+
+    def _commit_batch(self, batch):
+        """Run queued writes in one transaction: one commit, and one sync
+        at most, for the lot. Each runs under a savepoint, so one that fails
+        is rolled back alone and raises in its caller; the rest commit."""
+        outcomes = []
+        try:
+            self._writer.execute("BEGIN IMMEDIATE")
+            for call, _ in batch:
+                self._writer.execute("SAVEPOINT write")
+                try:
+                    outcomes.append((call(), None))
+                except Exception as e:
+                    self._writer.execute("ROLLBACK TO write")
+                    outcomes.append((None, e))
+                self._writer.execute("RELEASE write")
+            self._writer.execute("COMMIT")
+        except sqlite3.Error as e:
+            logging.error(f"Error committing {len(batch)} writes: {e}")
+            if self._writer.in_transaction:
+                self._writer.execute("ROLLBACK")
+            outcomes = [(None, e)] * len(batch)
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
 
     def _init_database(self):
-        self._connect()
         try:
             self.connection.execute("""
                 CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)
@@ -142,7 +255,6 @@ class SqliteDatabase:
             count = self.connection.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
             if count == 0:
                 self.connection.execute("INSERT INTO schema_version (version) VALUES (0)")
-            self.connection.commit()
 
             current = self.connection.execute("SELECT version FROM schema_version").fetchone()[0]
 
@@ -150,26 +262,27 @@ class SqliteDatabase:
                 if i <= current:
                     continue
                 logging.info(f"Applying database migration {i}")
+                self.connection.execute("BEGIN")
                 for sql in statements:
                     self.connection.execute(sql)
                 self.connection.execute("UPDATE schema_version SET version = ?", (i,))
-                self.connection.commit()
+                self.connection.execute("COMMIT")
                 logging.info(f"Migration {i} applied")
                 current = i
 
             logging.info(f"Database schema at version {current}")
         except sqlite3.Error as e:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
             logging.error(f"Error initializing SQLite database: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def add_user(self, username):
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "INSERT OR IGNORE INTO users (username) VALUES (?)", (username,)
             )
-            self.connection.commit()
             if cursor.rowcount > 0:
                 logging.info(f"Added new user: {username}")
             return cursor.rowcount > 0
@@ -177,10 +290,9 @@ class SqliteDatabase:
             logging.error(f"Error adding user {username}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_user_wallet(self, username):
         """Get the wallet balance for a user, in cents."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "SELECT wallet_cents FROM users WHERE username = ?", (username,)
@@ -193,10 +305,9 @@ class SqliteDatabase:
             logging.error(f"Error getting wallet for {username}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def update_wallet(self, username, amount_cents):
         """Update a user's wallet by an amount in cents. Returns True on success, False if update would go negative."""
-        self._connect()
         try:
             amount_cents_int = int(amount_cents)
             if amount_cents_int < 0:
@@ -210,7 +321,6 @@ class SqliteDatabase:
                     "UPDATE users SET wallet_cents = wallet_cents + ? WHERE username = ?",
                     (amount_cents_int, username)
                 )
-            self.connection.commit()
             if cursor.rowcount > 0:
                 logging.debug(f"Updated wallet for {username} by {amount_cents_int}")
             return cursor.rowcount > 0
@@ -218,16 +328,14 @@ class SqliteDatabase:
             logging.error(f"Error updating wallet for {username}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def set_user_wallet(self, username, amount_cents):
         """Set a user's wallet to an absolute amount in cents. Returns True on success."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "UPDATE users SET wallet_cents = ? WHERE username = ?",
                 (int(amount_cents), username)
             )
-            self.connection.commit()
             if cursor.rowcount > 0:
                 logging.debug(f"Set wallet for {username} to {amount_cents}")
             return cursor.rowcount > 0
@@ -235,54 +343,93 @@ class SqliteDatabase:
             logging.error(f"Error setting wallet for {username}: {e}")
             raise
 
-    @_synchronized
+    # The JSON columns only hold rows saved before migration 8 packed the
+    # cards, seats and bets into packed_state; a save empties them.
+    _GAME_UPSERT = """
+        INSERT INTO games (
+            game_id, state, current_player_idx,
+            time_betting_started, time_last_hand_ended, time_last_event, packed_state,
+            deck_json, discards_json, dealer_hand_json,
+            players_json, players_waiting_json, bets_json
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, '', '', '', '', '', '')
+        ON CONFLICT(game_id) DO UPDATE SET
+            state = excluded.state,
+            current_player_idx = excluded.current_player_idx,
+            time_betting_started = excluded.time_betting_started,
+            time_last_hand_ended = excluded.time_last_hand_ended,
+            time_last_event = excluded.time_last_event,
+            packed_state = excluded.packed_state,
+            deck_json = '',
+            discards_json = '',
+            dealer_hand_json = '',
+            players_json = '',
+            players_waiting_json = '',
+            bets_json = '',
+            updated_at = CURRENT_TIMESTAMP
+    """
+
+    # A journal entry's parameters come from game_rows.journal_entry()
+    _JOURNAL_APPEND = "INSERT INTO game_journal (game_id, fields_json, packed_state) VALUES (?, ?, ?)"
+
+    @_writes
     def save_game(self, game_id, game_data):
-        self._connect()
         try:
-            self.connection.execute("""
-                INSERT INTO games (
-                    game_id, state, current_player_idx,
-                    time_betting_started, time_last_hand_ended, time_last_event,
-                    deck_json, discards_json, dealer_hand_json,
-                    players_json, players_waiting_json, bets_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(game_id) DO UPDATE SET
-                    state = excluded.state,
-                    current_player_idx = excluded.current_player_idx,
-                    time_betting_started = excluded.time_betting_started,
-                    time_last_hand_ended = excluded.time_last_hand_ended,
-                    time_last_event = excluded.time_last_event,
-                    deck_json = excluded.deck_json,
-                    discards_json = excluded.discards_json,
-                    dealer_hand_json = excluded.dealer_hand_json,
-                    players_json = excluded.players_json,
-                    players_waiting_json = excluded.players_waiting_json,
-                    bets_json = excluded.bets_json,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (
-                game_id,
-                game_data['state'],
-                game_data['current_player_idx'],
-                game_data['time_betting_started'],
-                game_data['time_last_hand_ended'],
-                game_data['time_last_event'],
-                json.dumps(game_data['deck']),
-                json.dumps(game_data['discards']),
-                json.dumps(game_data['dealer_hand']),
-                json.dumps(game_data['players']),
-                json.dumps(game_data['players_waiting']),
-                json.dumps(game_data['bets']),
-            ))
-            self.connection.commit()
+            self.connection.execute(self._GAME_UPSERT, game_row(game_id, game_data))
+            self.connection.execute("DELETE FROM game_journal WHERE game_id = ?", (game_id,))
             logging.debug(f"Saved game {game_id}")
             return True
         except sqlite3.Error as e:
             logging.error(f"Error saving game {game_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
+    def save_games(self, snapshots):
+        """Save many games in one transaction, along with their tables'
+        deferred writes (see unit_of_work.py).
+
+        snapshots holds (game_id, game_data, writes): writes is a UnitOfWork
+        or None. game_data is the table's whole snapshot, written as a
+        checkpoint that replaces its journal, or just the fields that changed
+        since its last save, appended to the journal; it's None for a table
+        that's gone but still has writes to commit. Each kind of statement
+        goes out as one batch.
+        """
+        rows, entries = game_writes(snapshots)
+        units = [writes for _, _, writes in snapshots if writes]
+        try:
+            self.connection.executemany("UPDATE users SET wallet_cents = wallet_cents + ? WHERE username = ?",
+                                        [(cents, username) for w in units
+                                         for username, cents in w.user_credits.items()])
+            self.connection.executemany("UPDATE npcs SET wallet_cents = wallet_cents + ? WHERE id = ?",
+                                        [(cents, npc_id) for w in units for npc_id, cents in w.npc_credits.items()])
+            self.connection.executemany("""
+                UPDATE users SET
+                    hands_played = hands_played + ?,
+                    total_won_cents = total_won_cents + ?,
+                    total_lost_cents = total_lost_cents + ?,
+                    biggest_win_cents = MAX(biggest_win_cents, ?),
+                    last_seen = CURRENT_TIMESTAMP
+                WHERE username = ?
+            """, [(s['hands'], s['won_cents'], s['lost_cents'], s['biggest_win_cents'], username)
+                  for w in units for username, s in w.stats.items()])
+            self.connection.executemany("""
+                UPDATE users SET games_played = games_played + ?,
+                    last_seen = CURRENT_TIMESTAMP
+                WHERE username = ?
+            """, [(count, username) for w in units for username, count in w.games_played.items()])
+            self.connection.executemany(self._GAME_UPSERT, rows)
+            # A checkpoint replaces the table's journal
+            self.connection.executemany("DELETE FROM game_journal WHERE game_id = ?", [row[:1] for row in rows])
+            self.connection.executemany(self._JOURNAL_APPEND, entries)
+            logging.debug(f"Saved {len(rows)} games and journaled {len(entries)}, "
+                          f"{len(units)} with table writes")
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Error in save_games({len(snapshots)} games): {e}")
+            raise
+
+    @_reads
     def load_game(self, game_id):
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "SELECT * FROM games WHERE game_id = ?", (game_id,)
@@ -290,46 +437,71 @@ class SqliteDatabase:
             result = cursor.fetchone()
             if result is None:
                 return None
-            return self._row_to_game(result)
+            return row_to_game(result)
         except sqlite3.Error as e:
             logging.error(f"Error loading game {game_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
+    def load_games(self, game_ids):
+        """Load the given games in one query; ids not found are left out."""
+        game_ids = list(game_ids)
+        if not game_ids:
+            return []
+        try:
+            cursor = self.connection.execute(
+                f"SELECT * FROM games WHERE game_id IN ({', '.join('?' * len(game_ids))})", game_ids)
+            return [row_to_game(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Error loading {len(game_ids)} games: {e}")
+            raise
+
+    @_reads
     def load_all_active_games(self):
         """Load all persisted games from database, regardless of state."""
-        self._connect()
         try:
             cursor = self.connection.execute("SELECT * FROM games")
-            return [self._row_to_game(row) for row in cursor.fetchall()]
+            return [row_to_game(row) for row in cursor.fetchall()]
         except sqlite3.Error as e:
             logging.error(f"Error loading active games: {e}")
             raise
 
-    def _row_to_game(self, result):
-        return {
-            'game_id': result['game_id'],
-            'state': result['state'],
-            'current_player_idx': result['current_player_idx'],
-            'time_betting_started': result['time_betting_started'],
-            'time_last_hand_ended': result['time_last_hand_ended'],
-            'time_last_event': result['time_last_event'],
-            'deck': json.loads(result['deck_json']),
-            'discards': json.loads(result['discards_json']),
-            'dealer_hand': json.loads(result['dealer_hand_json']),
-            'players': json.loads(result['players_json']),
-            'players_waiting': json.loads(result['players_waiting_json']),
-            'bets': json.loads(result['bets_json']),
-        }
-
-    @_synchronized
+    @_reads
+    def load_journal(self, game_ids=None):
+        """Each game's journal since its last checkpoint, oldest entry
+        first: {game_id: [changed fields, ...]}. game_ids limits it to those
+        games; None loads every game's."""
+        try:
+            if game_ids is None:
+                cursor = self.connection.execute("SELECT * FROM game_journal ORDER BY id")
+            else:
+                game_ids = list(game_ids)
+                if not game_ids:
+                    return {}
+                cursor = self.connection.execute(
+                    f"SELECT * FROM game_journal WHERE game_id IN ({', '.join('?' * len(game_ids))}) ORDER BY id",
+                    game_ids)
+            return journal_from_rows(cursor.fetchall())
+        except sqlite3.Error as e:
+            logging.error(f"Error loading game journal: {e}")
+            raise
+
+    @_reads
+    def list_game_ids(self):
+        try:
+            cursor = self.connection.execute("SELECT game_id FROM games")
+            return [row['game_id'] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Error listing games: {e}")
+            raise
+
+    @_writes
     def delete_game(self, game_id):
-        self._connect()
         try:
+            self.connection.execute("DELETE FROM game_journal WHERE game_id = ?", (game_id,))
             cursor = self.connection.execute(
                 "DELETE FROM games WHERE game_id = ?", (game_id,)
             )
-            self.connection.commit()
             if cursor.rowcount > 0:
                 logging.info(f"Deleted game {game_id}")
             return cursor.rowcount > 0
@@ -337,9 +509,8 @@ class SqliteDatabase:
             logging.error(f"Error deleting game {game_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def save_game_channel(self, game_id, guild_id, channel_id):
-        self._connect()
         try:
             self.connection.execute("""
                 INSERT INTO game_channels (game_id, guild_id, channel_id)
@@ -348,16 +519,14 @@ class SqliteDatabase:
                     guild_id = excluded.guild_id,
                     channel_id = excluded.channel_id
             """, (game_id, guild_id, channel_id))
-            self.connection.commit()
             logging.debug(f"Saved game channel: {game_id} -> {guild_id}/{channel_id}")
             return True
         except sqlite3.Error as e:
             logging.error(f"Error saving game channel {game_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def load_game_channels(self):
-        self._connect()
         try:
             cursor = self.connection.execute("SELECT * FROM game_channels")
             return [
@@ -372,14 +541,12 @@ class SqliteDatabase:
             logging.error(f"Error loading game channels: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def delete_game_channel(self, game_id):
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "DELETE FROM game_channels WHERE game_id = ?", (game_id,)
             )
-            self.connection.commit()
             if cursor.rowcount > 0:
                 logging.debug(f"Deleted game channel {game_id}")
             return cursor.rowcount > 0
@@ -387,25 +554,22 @@ class SqliteDatabase:
             logging.error(f"Error deleting game channel {game_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def create_npc(self, name, personality_name, wallet_cents):
         """Create a new NPC record. Returns the new npc id."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "INSERT INTO npcs (name, personality_name, wallet_cents) VALUES (?, ?, ?)",
                 (name, personality_name, int(wallet_cents))
             )
-            self.connection.commit()
             return cursor.lastrowid
         except sqlite3.Error as e:
             logging.error(f"Error creating NPC {name}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_available_npcs(self, limit, exclude_personality_names=None):
         """Get available NPCs (current_game_id IS NULL). Returns list of dicts."""
-        self._connect()
         try:
             excl = list(exclude_personality_names) if exclude_personality_names else []
             if excl:
@@ -426,10 +590,9 @@ class SqliteDatabase:
             logging.error(f"Error getting available NPCs: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_npc_by_id(self, npc_id):
         """Get NPC by id. Returns dict or None."""
-        self._connect()
         try:
             cursor = self.connection.execute("SELECT * FROM npcs WHERE id = ?", (npc_id,))
             row = cursor.fetchone()
@@ -438,10 +601,23 @@ class SqliteDatabase:
             logging.error(f"Error getting NPC {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
+    def get_npcs_by_ids(self, npc_ids):
+        """Get many NPCs in one query. Returns {id: dict}; ids not found are left out."""
+        npc_ids = list(npc_ids)
+        if not npc_ids:
+            return {}
+        try:
+            cursor = self.connection.execute(
+                f"SELECT * FROM npcs WHERE id IN ({', '.join('?' * len(npc_ids))})", npc_ids)
+            return {row['id']: dict(row) for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logging.error(f"Error getting {len(npc_ids)} NPCs: {e}")
+            raise
+
+    @_reads
     def get_all_npcs(self):
         """Get all NPCs ordered by name. Returns list of dicts."""
-        self._connect()
         try:
             cursor = self.connection.execute("SELECT * FROM npcs ORDER BY name")
             return [dict(row) for row in cursor.fetchall()]
@@ -449,10 +625,9 @@ class SqliteDatabase:
             logging.error(f"Error getting all NPCs: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def find_npc_by_name(self, name):
         """Find an NPC by name (case-insensitive). Returns dict or None."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "SELECT * FROM npcs WHERE LOWER(name) = LOWER(?)", (name,)
@@ -463,10 +638,9 @@ class SqliteDatabase:
             logging.error(f"Error finding NPC by name {name}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_npc_wallet(self, npc_id):
         """Get NPC wallet balance in cents. Returns int or None."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "SELECT wallet_cents FROM npcs WHERE id = ?", (npc_id,)
@@ -477,10 +651,9 @@ class SqliteDatabase:
             logging.error(f"Error getting NPC wallet {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def update_npc_wallet(self, npc_id, amount_cents):
         """Add amount_cents to NPC wallet. Returns True on success, False if would go negative."""
-        self._connect()
         try:
             amount_cents_int = int(amount_cents)
             if amount_cents_int < 0:
@@ -494,57 +667,90 @@ class SqliteDatabase:
                     "UPDATE npcs SET wallet_cents = wallet_cents + ? WHERE id = ?",
                     (amount_cents_int, npc_id)
                 )
-            self.connection.commit()
             return cursor.rowcount > 0
         except sqlite3.Error as e:
             logging.error(f"Error updating NPC wallet {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
+    def get_npcs_below_target(self, targets):
+        """Idle NPCs whose wallet is below their personality's target, as
+        dicts of id, personality_name and wallet_cents. targets maps a
+        personality's name to its target in cents; NPCs with any other
+        personality are left out."""
+        if not targets:
+            return []
+        try:
+            cursor = self.connection.execute(f"""
+                SELECT id, personality_name, wallet_cents FROM npcs
+                WHERE current_game_id IS NULL
+                  AND wallet_cents < CASE personality_name {' '.join(['WHEN ? THEN ?'] * len(targets))} END
+            """, [value for item in targets.items() for value in item])
+            return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logging.error(f"Error getting NPCs below their target wallet: {e}")
+            raise
+
+    @_writes
+    def credit_idle_npc_wallets(self, credits):
+        """Add to many idle NPCs' wallets in one transaction, a bulk UPDATE
+        per _BULK_UPDATE_ROWS. credits maps npc id -> cents; an NPC seated
+        since it was picked is skipped. Returns how many were credited."""
+        credits = list(credits.items())
+        credited = 0
+        try:
+            for start in range(0, len(credits), _BULK_UPDATE_ROWS):
+                chunk = credits[start:start + _BULK_UPDATE_ROWS]
+                cursor = self.connection.execute(f"""
+                    UPDATE npcs SET wallet_cents = wallet_cents + CASE id
+                        {' '.join(['WHEN ? THEN ?'] * len(chunk))} END
+                    WHERE current_game_id IS NULL AND id IN ({', '.join('?' * len(chunk))})
+                """, [value for npc_id, cents in chunk for value in (npc_id, int(cents))]
+                    + [npc_id for npc_id, _ in chunk])
+                credited += cursor.rowcount
+            return credited
+        except sqlite3.Error as e:
+            logging.error(f"Error crediting {len(credits)} NPC wallets: {e}")
+            raise
+
+    @_writes
     def set_npc_wallet(self, npc_id, amount_cents):
         """Set an NPC's wallet to an absolute amount in cents. Returns True on success."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "UPDATE npcs SET wallet_cents = ? WHERE id = ?", (int(amount_cents), npc_id)
             )
-            self.connection.commit()
             return cursor.rowcount > 0
         except sqlite3.Error as e:
             logging.error(f"Error setting NPC wallet {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def set_npc_game(self, npc_id, game_id):
         """Assign NPC to a game and update last_played_at."""
-        self._connect()
         try:
             self.connection.execute(
                 "UPDATE npcs SET current_game_id = ?, last_played_at = CURRENT_TIMESTAMP WHERE id = ?",
                 (game_id, npc_id)
             )
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error setting NPC game {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def clear_npc_game(self, npc_id):
         """Clear an NPC's current_game_id."""
-        self._connect()
         try:
             self.connection.execute(
                 "UPDATE npcs SET current_game_id = NULL WHERE id = ?", (npc_id,)
             )
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error clearing NPC game {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def count_npcs(self):
         """Return total number of NPC records."""
-        self._connect()
         try:
             cursor = self.connection.execute("SELECT COUNT(*) FROM npcs")
             return cursor.fetchone()[0]
@@ -552,10 +758,9 @@ class SqliteDatabase:
             logging.error(f"Error counting NPCs: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def clear_stale_npc_games(self, active_game_ids):
         """Clear current_game_id for NPCs whose game is no longer active."""
-        self._connect()
         try:
             if active_game_ids:
                 placeholders = ','.join(['?'] * len(active_game_ids))
@@ -569,26 +774,22 @@ class SqliteDatabase:
                 self.connection.execute(
                     "UPDATE npcs SET current_game_id = NULL WHERE current_game_id IS NOT NULL"
                 )
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error clearing stale NPC games: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def update_npc_backstory(self, npc_id, backstory):
         """Set the backstory text for an NPC."""
-        self._connect()
         try:
             self.connection.execute("UPDATE npcs SET backstory = ? WHERE id = ?", (backstory, npc_id))
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error updating NPC backstory {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def add_npc_memory(self, npc_id, game_id, session_summary, max_rows):
         """Insert a session memory for an NPC, pruning to the max_rows most recent."""
-        self._connect()
         try:
             cursor = self.connection.execute("""
                 INSERT INTO npc_memories (npc_id, game_id, session_summary)
@@ -601,16 +802,14 @@ class SqliteDatabase:
                     ORDER BY id DESC LIMIT ?
                 )
             """, (npc_id, npc_id, int(max_rows)))
-            self.connection.commit()
             return memory_id
         except sqlite3.Error as e:
             logging.error(f"Error adding NPC memory {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_npc_memories(self, npc_id, limit):
         """Return the most recent session memories for an NPC, newest first. List of dicts."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "SELECT * FROM npc_memories WHERE npc_id = ? ORDER BY id DESC LIMIT ?",
@@ -621,24 +820,59 @@ class SqliteDatabase:
             logging.error(f"Error getting NPC memories {npc_id}: {e}")
             raise
 
-    @_synchronized
+    @_reads
+    def get_recent_npc_memories(self, npc_ids, limit):
+        """get_npc_memories() for many NPCs in one query: {npc_id: [dict, ...]},
+        each list newest first. NPCs without memories are left out."""
+        npc_ids = list(npc_ids)
+        if not npc_ids:
+            return {}
+        try:
+            cursor = self.connection.execute(f"""
+                SELECT * FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY npc_id ORDER BY id DESC) AS recency
+                    FROM npc_memories WHERE npc_id IN ({', '.join('?' * len(npc_ids))})
+                ) WHERE recency <= ? ORDER BY npc_id, id DESC
+            """, npc_ids + [int(limit)])
+            memories = {}
+            for row in cursor.fetchall():
+                memory = dict(row)
+                del memory['recency']
+                memories.setdefault(memory['npc_id'], []).append(memory)
+            return memories
+        except sqlite3.Error as e:
+            logging.error(f"Error getting memories for {len(npc_ids)} NPCs: {e}")
+            raise
+
+    @_writes
     def log_llm_usage(self, purpose, model, input_tokens, output_tokens, npc_id=None, game_id=None):
         """Record a single LLM API call for usage tracking."""
-        self._connect()
         try:
             self.connection.execute("""
                 INSERT INTO llm_usage (purpose, model, input_tokens, output_tokens, npc_id, game_id)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (purpose, model, input_tokens, output_tokens, npc_id, game_id))
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error logging LLM usage: {e}")
             raise
 
-    @_synchronized
+    @_writes
+    def log_llm_usage_many(self, rows):
+        """log_llm_usage() for many calls in one statement. rows holds
+        (purpose, model, input_tokens, output_tokens, npc_id, game_id)."""
+        rows = list(rows)
+        try:
+            self.connection.executemany("""
+                INSERT INTO llm_usage (purpose, model, input_tokens, output_tokens, npc_id, game_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+        except sqlite3.Error as e:
+            logging.error(f"Error logging {len(rows)} LLM usage rows: {e}")
+            raise
+
+    @_reads
     def get_llm_usage_summary(self, days=7):
         """Return token totals grouped by purpose for the past N days."""
-        self._connect()
         try:
             cursor = self.connection.execute("""
                 SELECT purpose, model,
@@ -655,25 +889,22 @@ class SqliteDatabase:
             logging.error(f"Error getting LLM usage summary: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def increment_games_played(self, username):
         """Increment games_played and refresh last_seen for a human player."""
-        self._connect()
         try:
             self.connection.execute("""
                 UPDATE users SET games_played = games_played + 1,
                     last_seen = CURRENT_TIMESTAMP
                 WHERE username = ?
             """, (username,))
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error in increment_games_played({username}): {e}")
             raise
 
-    @_synchronized
+    @_writes
     def update_player_stats(self, username, won_cents=0, lost_cents=0):
         """Record the outcome of a hand for a human player. Amounts are in cents."""
-        self._connect()
         try:
             self.connection.execute("""
                 UPDATE users SET
@@ -684,15 +915,13 @@ class SqliteDatabase:
                     last_seen = CURRENT_TIMESTAMP
                 WHERE username = ?
             """, (won_cents, lost_cents, won_cents, won_cents, username))
-            self.connection.commit()
         except sqlite3.Error as e:
             logging.error(f"Error in update_player_stats({username}): {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_player_stats(self, username):
         """Return stats dict for a player, or None if not found. Money fields are in cents."""
-        self._connect()
         try:
             cursor = self.connection.execute("""
                 SELECT games_played, hands_played,
@@ -714,10 +943,9 @@ class SqliteDatabase:
             logging.error(f"Error getting player stats for {username}: {e}")
             raise
 
-    @_synchronized
+    @_reads
     def get_setting(self, key, default=None):
         """Get a runtime setting value (string), or default if not set."""
-        self._connect()
         try:
             cursor = self.connection.execute(
                 "SELECT setting_value FROM settings WHERE setting_key = ?", (key,)
@@ -728,24 +956,36 @@ class SqliteDatabase:
             logging.error(f"Error getting setting {key}: {e}")
             raise
 
-    @_synchronized
+    @_writes
     def set_setting(self, key, value):
         """Set a runtime setting value (stored as a string), upserting on key."""
-        self._connect()
         try:
             self.connection.execute("""
                 INSERT INTO settings (setting_key, setting_value) VALUES (?, ?)
                 ON CONFLICT(setting_key) DO UPDATE SET setting_value = excluded.setting_value
             """, (key, str(value)))
-            self.connection.commit()
             logging.debug(f"Set setting {key} = {value}")
         except sqlite3.Error as e:
             logging.error(f"Error setting {key}: {e}")
             raise
 
-    @_synchronized
     def close(self):
-        if self.connection:
-            self.connection.close()
-            self.connection = None
-            logging.info("SQLite database connection closed")
+        """Commit the writes already queued, then close every connection."""
+        with self._closing:
+            if self._closed:
+                return
+            self._closed = True
+            self._write_queue.put(None)
+        self._writer_thread.join()
+        # Nothing should be left behind the stop, but a caller waiting on
+        # a write that will never run would wait forever
+        while True:
+            try:
+                _, future = self._write_queue.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(sqlite3.ProgrammingError("Cannot operate on a closed database."))
+        if self._readers is not None:
+            self._readers.close()
+        self._writer.close()
+        logging.info("SQLite database connection closed")
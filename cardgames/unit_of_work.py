@@ -0,0 +1,68 @@
+"""A table's money and stats writes, held for its next snapshot.
+
+Settling a hand used to commit once per payout, once per player's stats
+and once more for the snapshot. The casino now collects a table's wallet
+credits (payouts, pushes, refunds), stats increments and joins in a
+UnitOfWork while it applies the table's commands and ticks, and commits
+them in the same transaction as the table's snapshot (see save_games()
+on the databases). The hand's money and the state that explains it land
+together or not at all.
+
+Debits are never deferred: a bet has to be refused on the spot when the
+wallet can't cover it, so it stays its own atomic check-and-update.
+"""
+
+
+class UnitOfWork:
+    def __init__(self):
+        self.user_credits = {}  # username -> cents to add
+        self.npc_credits = {}   # npc_db_id -> cents to add
+        self.stats = {}         # username -> {'hands', 'won_cents', 'lost_cents', 'biggest_win_cents'}
+        self.games_played = {}  # username -> joins to count
+
+    def __bool__(self):
+        return bool(self.user_credits or self.npc_credits or self.stats or self.games_played)
+
+    def credit(self, kind, ref, amount_cents):
+        """Add to a ('player', username) or ('npc', npc_db_id) wallet."""
+        credits = self.npc_credits if kind == 'npc' else self.user_credits
+        credits[ref] = credits.get(ref, 0) + int(amount_cents)
+
+    def drop_credit(self, kind, ref):
+        """Forget any credit to a wallet that has since been set outright.
+        Returns the cents dropped."""
+        credits = self.npc_credits if kind == 'npc' else self.user_credits
+        return credits.pop(ref, 0)
+
+    def record_hand(self, username, won_cents, lost_cents):
+        stats = self.stats.setdefault(username, {'hands': 0, 'won_cents': 0, 'lost_cents': 0,
+                                                 'biggest_win_cents': 0})
+        stats['hands'] += 1
+        stats['won_cents'] += won_cents
+        stats['lost_cents'] += lost_cents
+        stats['biggest_win_cents'] = max(stats['biggest_win_cents'], won_cents)
+
+    def record_join(self, username):
+        self.games_played[username] = self.games_played.get(username, 0) + 1
+
+    def absorb(self, other):
+        """Fold another unit's writes into this one (a batch whose commit
+        failed, to be retried with the next)."""
+        for ref, cents in other.user_credits.items():
+            self.credit('player', ref, cents)
+        for ref, cents in other.npc_credits.items():
+            self.credit('npc', ref, cents)
+        for username, theirs in other.stats.items():
+            stats = self.stats.setdefault(username, {'hands': 0, 'won_cents': 0, 'lost_cents': 0,
+                                                     'biggest_win_cents': 0})
+            stats['hands'] += theirs['hands']
+            stats['won_cents'] += theirs['won_cents']
+            stats['lost_cents'] += theirs['lost_cents']
+            stats['biggest_win_cents'] = max(stats['biggest_win_cents'], theirs['biggest_win_cents'])
+        for username, joins in other.games_played.items():
+            self.games_played[username] = self.games_played.get(username, 0) + joins
+
+    def credited(self):
+        """((kind, ref), cents) for every wallet credit in the unit."""
+        return ([(('player', ref), cents) for ref, cents in self.user_credits.items()]
+                + [(('npc', ref), cents) for ref, cents in self.npc_credits.items()])
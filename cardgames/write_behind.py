@@ -0,0 +1,177 @@
+"""Fire-and-forget database writes, taken off the caller's thread.
+
+Logging an LLM call's tokens, saving an NPC's session memory, recording a
+player's stats or adding a user row: nothing waits on these, and their
+callers ignore failures, yet each one used to run its own commit on the
+game loop or an NPC worker. WriteBehindDatabase sits in front of either
+backend and queues them for a background thread, which writes each batch
+it picks up (LLM usage rows as one multi-row INSERT). Every other call
+goes straight through to the backend.
+
+The queue is bounded. When it's full, usage rows are dropped and other
+writes spill: the caller makes them itself, as it used to. Anything read
+or written directly first makes sure queued add_user() rows are written,
+so a player who just sat down has a wallet to bet from: it writes those
+still queued itself, ahead of the rest, rather than waiting for the queue.
+"""
+import collections
+import functools
+import logging
+import threading
+import time
+
+WRITE_BEHIND_MAX_DEPTH = 5000
+WRITE_BEHIND_BATCH_MAX = 500
+
+
+class WriteBehindDatabase:
+    def __init__(self, db, max_depth=WRITE_BEHIND_MAX_DEPTH, batch_max=WRITE_BEHIND_BATCH_MAX):
+        self.db = db
+        self.max_depth = max_depth
+        self.batch_max = batch_max
+        self._queue = collections.deque()  # (method name, args, time queued)
+        self._cond = threading.Condition()
+        self._writing = False   # the thread has a batch in hand
+        self._closed = False
+        self._queued_users = 0   # add_user() rows in the queue
+        self._writing_users = 0  # ... and in the thread's batch, not yet written
+        self._stats = {'queued': 0, 'written': 0, 'failed': 0, 'dropped': 0, 'spilled': 0, 'batches': 0,
+                       'max_depth_seen': 0, 'last_flush_ms': 0.0, 'max_flush_ms': 0.0}
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name):
+        if name == 'db':  # not set yet; don't recurse
+            raise AttributeError(name)
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            if self._queued_users or self._writing_users:
+                self._write_pending_users()
+            return attr(*args, **kwargs)
+        return call
+
+    # --- The writes nothing waits for ---
+
+    def log_llm_usage(self, purpose, model, input_tokens, output_tokens, npc_id=None, game_id=None):
+        self._enqueue('log_llm_usage', (purpose, model, input_tokens, output_tokens, npc_id, game_id),
+                      droppable=True)
+
+    def add_npc_memory(self, npc_id, game_id, session_summary, max_rows):
+        self._enqueue('add_npc_memory', (npc_id, game_id, session_summary, max_rows))
+
+    def update_player_stats(self, username, won_cents=0, lost_cents=0):
+        self._enqueue('update_player_stats', (username, won_cents, lost_cents))
+
+    def increment_games_played(self, username):
+        self._enqueue('increment_games_played', (username,))
+
+    def add_user(self, username):
+        self._enqueue('add_user', (username,))
+
+    def _enqueue(self, name, args, droppable=False):
+        with self._cond:
+            if not self._closed and len(self._queue) < self.max_depth:
+                self._queue.append((name, args, time.monotonic()))
+                if name == 'add_user':
+                    self._queued_users += 1
+                self._stats['queued'] += 1
+                self._stats['max_depth_seen'] = max(self._stats['max_depth_seen'], len(self._queue))
+                self._cond.notify_all()
+                return
+            self._stats['dropped' if droppable else 'spilled'] += 1
+        if droppable:
+            logging.warning(f"Write-behind queue full; dropped {name}")
+            return
+        self._write(name, args)
+
+    # --- The background thread ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(len(self._queue), self.batch_max))]
+                self._writing = True
+                self._writing_users = sum(1 for name, _, _ in batch if name == 'add_user')
+                self._queued_users -= self._writing_users
+            try:
+                self._write_batch(batch)
+            finally:
+                flush_ms = (time.monotonic() - batch[0][2]) * 1000
+                with self._cond:
+                    self._writing = False
+                    self._writing_users = 0
+                    self._stats['batches'] += 1
+                    self._stats['last_flush_ms'] = flush_ms
+                    self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], flush_ms)
+                    self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        """Write a batch in the order it was queued, except that its users,
+        which direct calls may be waiting on, go first, and then its usage
+        rows, which nothing depends on, all in one statement."""
+        for name, args, _ in batch:
+            if name == 'add_user':
+                self._write(name, args)
+        with self._cond:
+            self._writing_users = 0
+            self._cond.notify_all()
+        usage = [args for name, args, _ in batch if name == 'log_llm_usage']
+        if usage:
+            self._write('log_llm_usage_many', (usage,), count=len(usage))
+        for name, args, _ in batch:
+            if name not in ('add_user', 'log_llm_usage'):
+                self._write(name, args)
+
+    def _write_pending_users(self):
+        """Write the add_user() rows still queued on the caller's thread,
+        and wait for any the background thread is writing, but not for the
+        rest of the queue."""
+        with self._cond:
+            users = [entry for entry in self._queue if entry[0] == 'add_user']
+            if users:
+                self._queue = collections.deque(entry for entry in self._queue if entry[0] != 'add_user')
+                self._queued_users -= len(users)
+        for name, args, _ in users:
+            self._write(name, args)
+        with self._cond:
+            self._cond.wait_for(lambda: not self._writing_users)
+
+    def _write(self, name, args, count=1):
+        try:
+            getattr(self.db, name)(*args)
+            outcome = 'written'
+        except Exception as e:
+            logging.warning(f"Write-behind {name} failed: {e}")
+            outcome = 'failed'
+        with self._cond:
+            self._stats[outcome] += count
+
+    # --- Control and metrics ---
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written. Returns False if
+        timeout (seconds) ran out first."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def write_behind_stats(self):
+        """Queue depth now, counts since start, and how long the last and
+        slowest batches took from their oldest write being queued."""
+        with self._cond:
+            return dict(self._stats, depth=len(self._queue), max_depth=self.max_depth)
+
+    def close(self):
+        """Write everything queued, then close the backend."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.db.close()
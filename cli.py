@@ -7,6 +7,8 @@ import uuid
 import aioconsole
 import redis.asyncio as redis
 
+from cardgames.command_stream import send_command
+from cardgames.game_events import render_event
 from cardgames.money import dollars_to_cents
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
@@ -48,7 +50,7 @@ class CasinoCli:
         }
         if extra:
             message.update(extra)
-        await self.redis.publish("casino", json.dumps(message))
+        await send_command(self.redis, message)
 
     async def process_commands(self):
         while not self.quit:
@@ -74,7 +76,7 @@ class CasinoCli:
                     "action": "add_npc",
                     "count": count,
                 }
-                await self.redis.publish("casino", json.dumps(message))
+                await send_command(self.redis, message)
             elif cmd == "removenpc":
                 message = {
                     "event_type": "npc_action",
@@ -83,7 +85,7 @@ class CasinoCli:
                 }
                 if len(args) > 1:
                     message["npc_name"] = args[1]
-                await self.redis.publish("casino", json.dumps(message))
+                await send_command(self.redis, message)
             elif cmd == "bet":
                 if len(args) < 2:
                     logging.error("Usage: bet <amount>")
@@ -106,7 +108,13 @@ class CasinoCli:
             if not message:
                 continue
             data = json.loads(message['data'])
-            logging.info(data['text'])
+            if data.get('event_type') == 'game_over':
+                logging.info("The game is over.")
+                continue
+            for event in data.get('events', []):
+                text = render_event(event)
+                if text is not None:
+                    logging.info(text)
 
     async def main(self):
         self.player_name = input("Enter your name: ")
@@ -127,7 +135,7 @@ class CasinoCli:
             'request_id': request_id,
             'num_bots': num_bots,
         }
-        await self.redis.publish("casino", json.dumps(message))
+        await send_command(self.redis, message)
 
         while self.game_id is None:
             message = await self.pubsub.get_message(ignore_subscribe_messages=True,
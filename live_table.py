@@ -0,0 +1,153 @@
+"""A table's current hand, folded from its events, for the live table view.
+
+In live table mode the bot doesn't post a message per event. Each game
+keeps one embed showing the dealer, every seat's hand, score and bet, and
+whose turn it is, and edits it as events arrive. LiveTable is the state
+behind that embed: apply() folds in each table event, render() draws the
+embed's text, and summary() is the line posted once the hand is over.
+"""
+from cardgames.blackjack import str_to_card
+from cardgames.money import format_cents
+
+HIDDEN_CARD = "🂠"
+
+_STATUS_MARKS = {'stand': "✋", 'bust': "💥", '21': "🎯", 'left': "💨"}
+_RESULT_MARKS = {'win': "🏆", 'push': "🤝", 'lose': "❌", 'bust': "💥"}
+
+
+def _cards(codes):
+    return " ".join(str_to_card(code).shortstr() for code in codes)
+
+
+class Seat:
+    def __init__(self, name):
+        self.name = name
+        self.cards = []
+        self.score = None
+        self.bet_cents = None
+        self.status = None   # 'stand', 'bust', '21' or 'left'
+        self.outcome = None  # the hand_result outcome once settled
+        self.amount_cents = None
+
+
+class LiveTable:
+    def __init__(self):
+        self.seats = {}  # name -> Seat, in seating order
+        self.dealer_cards = []
+        self.dealer_score = None
+        self.dealer_revealed = False
+        self.turn = None  # a player's name, 'dealer', or None
+        self.phase = 'waiting'
+
+    def _seat(self, name):
+        seat = self.seats.get(name)
+        if seat is None:
+            seat = self.seats[name] = Seat(name)
+        return seat
+
+    def _reset(self):
+        self.seats = {}
+        self.dealer_cards = []
+        self.dealer_score = None
+        self.dealer_revealed = False
+        self.turn = None
+
+    def apply(self, event):
+        """Fold a table event into the state. Returns True if the embed
+        would change."""
+        event_type = event['type']
+        player = event.get('player')
+        if event_type == 'betting_opened':
+            self._reset()
+            self.phase = 'betting'
+        elif event_type == 'bet_placed':
+            self._seat(player).bet_cents = event['amount_cents']
+        elif event_type == 'hand_started':
+            bets = {name: seat.bet_cents for name, seat in self.seats.items()}
+            self._reset()
+            for p in event['players']:
+                self._seat(p['name']).bet_cents = bets.get(p['name'])
+            self.phase = 'playing'
+        elif event_type == 'dealer_showing':
+            if not self.dealer_revealed:
+                self.dealer_cards = [event['card']]
+        elif event_type == 'hand_dealt':
+            seat = self._seat(player)
+            seat.cards, seat.score = event['cards'], event['score']
+        elif event_type == 'your_turn':
+            self.turn = player
+            if event.get('cards'):
+                seat = self._seat(player)
+                seat.cards, seat.score = event['cards'], event['score']
+        elif event_type == 'card_dealt':
+            if player is None:
+                self.dealer_cards, self.dealer_score = event['cards'], event.get('score')
+            else:
+                seat = self._seat(player)
+                seat.cards, seat.score = event['cards'], event.get('score')
+        elif event_type in ('hit_21', 'bust', 'stand'):
+            if player is not None:
+                self._seat(player).status = '21' if event_type == 'hit_21' else event_type
+        elif event_type in ('dealer_turn', 'hole_card'):
+            self.turn = 'dealer'
+        elif event_type == 'dealer_hand':
+            self.dealer_cards, self.dealer_score = event['cards'], event['score']
+            self.dealer_revealed = True
+        elif event_type == 'dealer_blackjack':
+            self.dealer_cards = self.dealer_cards[:1] + [event['card']]
+            self.dealer_score, self.dealer_revealed = 21, True
+            self.turn = None
+        elif event_type == 'showdown':
+            self.dealer_score = event['dealer_score']
+            self.turn = None
+        elif event_type == 'hand_result':
+            seat = self._seat(player)
+            seat.outcome, seat.amount_cents = event['outcome'], event['amount_cents']
+        elif event_type == 'player_left':
+            if player in self.seats:
+                self.seats[player].status = 'left'
+        elif event_type == 'hand_over':
+            self.phase = 'over'
+            self.turn = None
+        else:
+            return False
+        return True
+
+    def render(self):
+        """The embed's text: the dealer, then a line per seat."""
+        if not self.dealer_cards:
+            dealer = "—"
+        elif self.dealer_revealed:
+            dealer = f"{_cards(self.dealer_cards)} ({self.dealer_score})"
+        else:
+            dealer = f"{_cards(self.dealer_cards)} {HIDDEN_CARD}"
+        turn = "👉 " if self.turn == 'dealer' else ""
+        lines = [f"{turn}**Dealer:** {dealer}"]
+        for seat in self.seats.values():
+            parts = [f"{'👉 ' if self.turn == seat.name else ''}**{seat.name}**"]
+            if seat.bet_cents is not None:
+                parts.append(f"${format_cents(seat.bet_cents)}")
+            if seat.cards:
+                parts.append(f"{_cards(seat.cards)}" + ("" if seat.score is None else f" ({seat.score})"))
+            mark = _RESULT_MARKS.get(seat.outcome) or _STATUS_MARKS.get(seat.status)
+            line = " — ".join(parts)
+            lines.append(f"{line} {mark}" if mark else line)
+        return "\n".join(lines)
+
+    def summary(self):
+        """One line for the end of the hand: the dealer's score and how
+        each seat came out."""
+        results = []
+        for seat in self.seats.values():
+            if seat.outcome is None:
+                continue
+            mark = _RESULT_MARKS[seat.outcome]
+            if seat.outcome == 'push':
+                results.append(f"{seat.name} {mark}")
+            else:  # the payout for a win, the lost bet otherwise
+                results.append(f"{seat.name} {mark} ${format_cents(seat.amount_cents)}")
+        if self.dealer_score is None:  # everyone busted before the dealer played
+            text = "🏁 Hand over."
+        else:
+            text = f"🏁 Hand over — dealer {'bust' if self.dealer_score > 21 else self.dealer_score}."
+        return f"{text} {', '.join(results)}" if results else text
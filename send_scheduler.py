@@ -0,0 +1,188 @@
+"""Rate limiting for the bot's outbound game messages.
+
+Discord caps a bot's requests globally and per route (one route per
+channel for sending messages). Every game message the bot posts goes
+through a SendScheduler. The scheduler keeps a queue and a token bucket
+for each channel, which also paces the table's output. One global bucket
+is shared by all channels and hands out its tokens by priority, so turn
+prompts and results go ahead of ambient NPC chatter. When a channel falls
+too far behind, its low-priority lines are merged or dropped instead of
+piling up. Lines that arrive in a burst go out together as one message,
+apart from the ones marked as beats of their own.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+PRIORITY_HIGH = 0    # turn prompts, results: what players are waiting on
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2     # NPC chatter and arrivals: fine to merge or lose under load
+
+GLOBAL_SEND_RATE = 40.0    # messages/second across all channels (Discord allows 50 requests/s)
+GLOBAL_SEND_BURST = 40
+SEND_BACKLOG_LIMIT = 20    # queued messages past which a channel sheds low-priority lines
+COALESCE_WINDOW = 2.0      # seconds between lines that still count as one burst
+MAX_MESSAGE_CHARS = 2000   # Discord's limit on a message's text
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is now)."""
+        self._refill()
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class OutboundMessage:
+    """A message waiting to be posted: its text and how to present it."""
+
+    def __init__(self, channel, text, priority=PRIORITY_NORMAL, color=None, pause=0, kind=None, label="",
+                 coalesce=True):
+        self.channel = channel
+        self.label = label  # for logs, e.g. the game id
+        self.text = text
+        self.priority = priority
+        self.color = color
+        self.pause = pause
+        self.kind = kind
+        self.coalesce = coalesce  # False for a beat that should land as a message of its own
+        self.queued_at = None
+        self.parts = 1            # lines folded into this message
+
+    def can_absorb(self, other):
+        return (self.coalesce and other.coalesce and self.color == other.color and self.label == other.label
+                and len(self.text) + 1 + len(other.text) <= MAX_MESSAGE_CHARS)
+
+    def absorb(self, other):
+        self.text = f"{self.text}\n{other.text}"
+        self.parts += other.parts
+
+
+class SendScheduler:
+    def __init__(self, channel_rate, channel_burst=1, global_rate=GLOBAL_SEND_RATE,
+                 global_burst=GLOBAL_SEND_BURST, backlog_limit=SEND_BACKLOG_LIMIT,
+                 coalesce_window=COALESCE_WINDOW, clock=time.monotonic):
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self.backlog_limit = backlog_limit
+        self.coalesce_window = coalesce_window
+        self.clock = clock
+        self._queues = {}   # channel_id -> deque of OutboundMessage
+        self._buckets = {}  # channel_id -> TokenBucket
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        self._waiters = []  # heap of (priority, seq, future) waiting on the global bucket
+        self._seq = itertools.count()
+        self._pump_handle = None
+        self._stats = {'sent': 0, 'lines': 0, 'merged': 0, 'dropped': 0, 'total_wait': 0.0, 'max_wait': 0.0}
+
+    def submit(self, channel_id, message):
+        """Queue a message for a channel. Returns 'queued', or 'merged' or
+        'dropped' for a low-priority line shed from a backed-up channel."""
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = deque()
+        if message.priority == PRIORITY_LOW and len(queue) >= self.backlog_limit:
+            last = queue[-1]
+            if last.priority == PRIORITY_LOW and last.can_absorb(message):
+                last.absorb(message)
+                self._stats['merged'] += 1
+                return 'merged'
+            self._stats['dropped'] += 1
+            return 'dropped'
+        message.queued_at = self.clock()
+        queue.append(message)
+        return 'queued'
+
+    def next_message(self, channel_id):
+        """The channel's next message to send, or None once it's drained
+        (which also forgets the channel)."""
+        queue = self._queues.get(channel_id)
+        if queue:
+            return queue.popleft()
+        self._queues.pop(channel_id, None)
+        return None
+
+    def coalesce(self, channel_id, message):
+        """Fold the lines queued right behind `message` into it, as long as
+        each arrived within the coalescing window of the one before."""
+        queue = self._queues.get(channel_id)
+        last_at = message.queued_at
+        while queue and message.can_absorb(queue[0]) and queue[0].queued_at - last_at <= self.coalesce_window:
+            following = queue.popleft()
+            last_at = following.queued_at
+            message.absorb(following)
+
+    async def wait_turn(self, channel_id, message):
+        """Wait until the message may go out: the channel's bucket first,
+        then the global one, where higher priorities are served first."""
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(self.channel_rate, self.channel_burst, self.clock)
+        delay = bucket.wait_time()
+        if delay:
+            await asyncio.sleep(delay)
+        bucket.take()
+
+        if not self._waiters and self.global_bucket.wait_time() == 0:
+            self.global_bucket.take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (message.priority, next(self._seq), future))
+        if self._pump_handle is None:
+            self._pump()
+        await future
+
+    def _pump(self):
+        """Hand global tokens to waiters, best priority first, and come back
+        when the bucket has refilled if any are left waiting."""
+        self._pump_handle = None
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():  # its sender was cancelled
+                heapq.heappop(self._waiters)
+                continue
+            delay = self.global_bucket.wait_time()
+            if delay:
+                self._pump_handle = asyncio.get_running_loop().call_later(delay, self._pump)
+                return
+            self.global_bucket.take()
+            heapq.heappop(self._waiters)
+            future.set_result(None)
+
+    def record_sent(self, message):
+        wait = self.clock() - message.queued_at
+        self._stats['sent'] += 1
+        self._stats['lines'] += message.parts
+        self._stats['total_wait'] += wait
+        self._stats['max_wait'] = max(self._stats['max_wait'], wait)
+
+    def snapshot(self):
+        """Queue depths and wait times, for /debug."""
+        sent = self._stats['sent']
+        return {
+            'queued': {channel_id: len(queue) for channel_id, queue in self._queues.items() if queue},
+            'waiting_global': len(self._waiters),
+            'sent': sent,
+            'lines': self._stats['lines'],
+            'merged': self._stats['merged'],
+            'dropped': self._stats['dropped'],
+            'avg_wait': self._stats['total_wait'] / sent if sent else 0.0,
+            'max_wait': self._stats['max_wait'],
+        }
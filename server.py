@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 import subprocess
@@ -5,6 +6,7 @@ import subprocess
 from cardgames.casino import Casino
 from cardgames.database import Database
 from cardgames.sqlite_database import SqliteDatabase
+from cardgames.write_behind import WriteBehindDatabase
 
 DEBUG_LOGGING = os.getenv("SALOONBOT_DEBUG")
 if DEBUG_LOGGING:
@@ -23,6 +25,7 @@ MYSQL_PORT = os.getenv("MYSQL_PORT", 3306)
 MYSQL_USER = os.getenv("MYSQL_USER", "saloonbot")
 MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD", "")
 MYSQL_DATABASE = os.getenv("MYSQL_DATABASE", "saloonbot")
+MYSQL_POOL_SIZE = int(os.getenv("MYSQL_POOL_SIZE", 8))
 
 logging.basicConfig(
     level=LOG_LEVEL,
@@ -56,12 +59,14 @@ def _log_config():
     logging.info("=== Server Configuration ===")
     logging.info(f"  Version: {VERSION or 'unknown'}")
     logging.info(f"  Redis: {REDIS_HOST}:{REDIS_PORT}")
+    logging.info(f"  CASINO_SHARD: {os.getenv('CASINO_SHARD', 'casino-1')}")
     logging.info(f"  Debug logging: {'enabled' if DEBUG_LOGGING else 'disabled'}")
     if USE_SQLITE:
         logging.info(f"  Database: SQLite @ {SQLITE_PATH}")
     else:
         logging.info(f"  Database: MySQL {MYSQL_USER}@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DATABASE}")
         logging.info(f"  MYSQL_PASSWORD: {'set' if MYSQL_PASSWORD else 'not set'}")
+        logging.info(f"  MYSQL_POOL_SIZE: {MYSQL_POOL_SIZE}")
     explicit_provider = os.getenv("LLM_PROVIDER", "").lower()
     if explicit_provider:
         llm_provider = explicit_provider
@@ -97,9 +102,14 @@ def main():
     if USE_SQLITE:
         db = SqliteDatabase(SQLITE_PATH)
     else:
-        db = Database(MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE)
+        db = Database(MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DATABASE,
+                      pool_size=MYSQL_POOL_SIZE)
+    db = WriteBehindDatabase(db)
     casino = Casino(REDIS_HOST, REDIS_PORT, db)
-    casino.listen()
+    try:
+        asyncio.run(casino.serve())
+    finally:
+        db.close()  # writes what's still queued
 
 
 if __name__ == "__main__":
@@ -1,28 +1,47 @@
+import asyncio
 import json
 import os
 import random
+import sqlite3
 import tempfile
+import threading
 import time
 import unittest
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date, timedelta
-from unittest.mock import MagicMock, patch
+from unittest.mock import DEFAULT, MagicMock, patch
+
+import redis
 
 from changelog import parse_changelog, select_recent_entries, ChangelogEntry
+from live_table import LiveTable
+from send_scheduler import (
+    PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, OutboundMessage, SendScheduler, TokenBucket,
+)
 from cardgames.blackjack import (
-    Action, Blackjack, HandState, InvalidActionError, InvalidBetError,
+    Action, Blackjack, HandState, InsufficientFundsError, InvalidActionError, InvalidBetError,
     card_to_str, str_to_card, serialize_hand, deserialize_hand,
     serialize_player, deserialize_player
 )
 from cardgames.npc_player import NPCPlayer
 from cardgames.card_game import Card, CardGame, CardGameError
+from cardgames.command_stream import COMMAND_STREAM, command_fields
+from cardgames.leases import shard_stream
+from cardgames.game_events import render_event
+from cardgames.rpc import REPLY_CHANNEL, RpcBusy, RpcClient, RpcServer, RpcTimeout
+from cardgames.db_pool import ConnectionPool
 from cardgames.casino import (
-    NPC_TYPES, Casino,
-    DEFAULT_NPC_AUTOFILL_MIN, DEFAULT_NPC_AUTOFILL_MAX, MAX_NPCS_PER_TABLE,
+    NPC_TYPES, SHARD_ID, Casino,
+    DEFAULT_NPC_AUTOFILL_MIN, DEFAULT_NPC_AUTOFILL_MAX, LISTEN_BATCH_MAX, LISTEN_MAX_SLEEP, MAX_NPCS_PER_TABLE,
+    TICK_ERROR_RETRY, WALLET_CACHE_TTL,
 )
 from cardgames.money import cents_to_dollars, dollars_to_cents, format_cents
 from cardgames.player import Player
 from cardgames.simple_npc import SimpleBlackjackNPC
+from cardgames.snapshot_codec import PACKED_FIELDS, SNAPSHOT_VERSION, pack_snapshot, unpack_snapshot
 from cardgames.sqlite_database import SqliteDatabase
+from cardgames.unit_of_work import UnitOfWork
+from cardgames.write_behind import WriteBehindDatabase
 
 from wwnames.wwnames import WildWestNames
 
@@ -37,6 +56,12 @@ Blackjack.NPC_DEPARTURE_BASE = 0
 Blackjack.NPC_DEPARTURE_RAMP = 0
 
 
+def rendered_output(game_output):
+    """The text a mocked casino.game_output's table events render to."""
+    texts = (render_event(call.args[1]) for call in game_output.call_args_list)
+    return [text for text in texts if text is not None]
+
+
 class TestMoney(unittest.TestCase):
 
     def test_dollars_to_cents_int(self):
@@ -385,17 +410,13 @@ class TestBlackjackAmbientTiming(unittest.TestCase):
         self.game.players.append(SimpleBlackjackNPC("Bot1"))
         self.assertFalse(self.game._is_ambient())
 
-    @patch('cardgames.blackjack.time.sleep')
-    def test_pause_applies_ambient_multiplier(self, mock_sleep):
+    def test_pause_applies_ambient_multiplier(self):
         self.game.players.append(SimpleBlackjackNPC("Bot1"))
-        self.game._pause(1.0)
-        mock_sleep.assert_called_once_with(1.0 * self.game.AMBIENT_SPEED_MULTIPLIER)
+        self.assertEqual(self.game._pause(1.0), 1.0 * self.game.AMBIENT_SPEED_MULTIPLIER)
 
-    @patch('cardgames.blackjack.time.sleep')
-    def test_pause_no_multiplier_for_human_game(self, mock_sleep):
+    def test_pause_no_multiplier_for_human_game(self):
         self.game.players.append(Player("Human"))
-        self.game._pause(1.0)
-        mock_sleep.assert_called_once_with(1.0)
+        self.assertEqual(self.game._pause(1.0), 1.0)
 
     def test_end_hand_ambient_sets_random_between_hands_duration(self):
         self.game.deck = [Card("H", 3), Card("H", 2), Card("H", 5), Card("H", 6),
@@ -423,6 +444,97 @@ class TestBlackjackAmbientTiming(unittest.TestCase):
         self.assertEqual(self.game.time_between_hands_duration, self.game.TIME_BETWEEN_HANDS)
 
 
+class TestBlackjackPacedOutput(unittest.TestCase):
+    """Dramatic pauses are scheduled continuations resumed by tick(), not sleeps."""
+
+    def setUp(self):
+        mock_casino = MagicMock()
+        mock_casino.db = MagicMock()
+        mock_casino.get_wallet.return_value = 1000.0
+        mock_casino.update_wallet.return_value = True
+        mock_casino.game_output = MagicMock()
+        self.game = Blackjack(game_id="test_game", casino=mock_casino)
+        self.game.DRAMATIC_PAUSE = 1.5
+        self.game.DEALER_CARD_PAUSE = 1.0
+        self.game.RESULT_PAUSE = 0.8
+        # Dealer: 10+6=16 then draws 10 (bust); player: 10+9=19
+        self.game.deck = [Card("S", 10), Card("H", 9), Card("H", 10), Card("D", 6), Card("D", 10)]
+        self.player = Player("Player 1")
+        self.game.players.append(self.player)
+
+    def _messages(self):
+        return rendered_output(self.game.casino.game_output)
+
+    @patch('cardgames.blackjack.time.sleep')
+    def test_dealer_turn_does_not_block(self, mock_sleep):
+        with patch('cardgames.blackjack.time.time', return_value=1000.0):
+            self.game.new_hand()
+        self.game.bets[self.player.name] = self.game.MIN_BET
+        self.game.stand(self.player)
+        with patch('cardgames.blackjack.time.time', return_value=1002.0):
+            self.game.tick()  # finishes the deal's "you're up" beat
+            self.game.tick()
+        mock_sleep.assert_not_called()
+        self.assertEqual(self.game.state, HandState.DEALER_TURN)
+        self.assertIsNotNone(self.game._continuation)
+        self.assertEqual(self._messages()[-1], "👁️ All eyes on the dealer...")
+
+    def test_tick_before_due_does_nothing(self):
+        with patch('cardgames.blackjack.time.time', return_value=1000.0):
+            self.game.new_hand()
+        self.assertFalse(any("you're up" in m for m in self._messages()))
+        with patch('cardgames.blackjack.time.time', return_value=1001.0):
+            self.game.tick()
+        self.assertFalse(any("you're up" in m for m in self._messages()))
+        with patch('cardgames.blackjack.time.time', return_value=1001.5):
+            self.game.tick()
+        self.assertTrue(any("Player 1, you're up" in m for m in self._messages()))
+        self.assertIsNone(self.game._continuation)
+
+    def test_full_hand_resolves_through_continuations(self):
+        now = [1000.0]
+        with patch('cardgames.blackjack.time.time', side_effect=lambda: now[0]):
+            self.game.new_hand()
+            self.game.bets[self.player.name] = self.game.MIN_BET
+            self.game.stand(self.player)
+            for _ in range(20):
+                now[0] += 2.0
+                self.game.tick()
+                if self.game.state == HandState.BETWEEN_HANDS:
+                    break
+        self.assertEqual(self.game.state, HandState.BETWEEN_HANDS)
+        self.assertTrue(any("strikes gold" in m for m in self._messages()))
+        self.game.casino.update_wallet.assert_called_once_with(self.player, 2 * self.game.MIN_BET)
+
+    def test_new_hand_prompt_skipped_if_first_player_already_acted(self):
+        with patch('cardgames.blackjack.time.time', return_value=1000.0):
+            self.game.new_hand()
+            self.game.stand(self.player)
+        with patch('cardgames.blackjack.time.time', return_value=1002.0):
+            self.game.tick()
+        self.assertFalse(any("you're up" in m for m in self._messages()))
+
+    def test_leave_during_resolution_settles_once(self):
+        other = Player("Player 2")
+        self.game.players.append(other)
+        self.game.deck = [Card("S", 2), Card("C", 9), Card("C", 10), Card("H", 9), Card("H", 10),
+                          Card("D", 7), Card("D", 10)]
+        with patch('cardgames.blackjack.time.time', return_value=1000.0):
+            self.game.new_hand()
+            self.game.bets = {self.player.name: 1000, other.name: 1000}
+            self.game.state = HandState.RESOLVING
+            self.game.current_player_idx = None
+            self.game.end_hand()
+        with patch('cardgames.blackjack.time.time', return_value=1001.0):
+            self.game.tick()  # settles Player 1
+        self.game.leave(other)  # still holds a bet, moves to departed_players
+        with patch('cardgames.blackjack.time.time', return_value=1002.0):
+            self.game.tick()  # settles Player 2
+        self.assertEqual(self.game.state, HandState.BETWEEN_HANDS)
+        payouts = [c.args for c in self.game.casino.update_wallet.call_args_list]
+        self.assertEqual(payouts, [(self.player, 2000), (other, 2000)])
+
+
 class TestDatabaseIntegration(unittest.TestCase):
     def test_join_game_with_database(self):
         # Create a mock database
@@ -462,6 +574,40 @@ class TestDatabaseIntegration(unittest.TestCase):
             loaded = db.load_all_active_games()
             loaded_ids = {g['game_id'] for g in loaded}
             self.assertIn("fresh_empty_game", loaded_ids)
+            self.assertEqual(db.list_game_ids(), ["fresh_empty_game"])
+        finally:
+            db.close()
+
+    def test_save_games_group_commit(self):
+        db = SqliteDatabase(":memory:")
+        try:
+            db.add_user("Ann")
+            start = db.get_user_wallet("Ann")
+            games = [Blackjack(game_id=f"game{i}", casino=MagicMock()) for i in range(3)]
+            writes = UnitOfWork()
+            writes.credit('player', "Ann", 1000)
+            writes.record_hand("Ann", 500, 0)
+            db.save_games([(g.game_id, g.to_dict(), writes if g is games[0] else None) for g in games]
+                          + [("gone", None, writes)])
+            self.assertEqual(sorted(db.list_game_ids()), ["game0", "game1", "game2"])
+            self.assertEqual(db.get_user_wallet("Ann"), start + 2000)
+            self.assertEqual(db.get_player_stats("Ann")['hands_played'], 2)
+        finally:
+            db.close()
+
+    def test_save_games_all_or_nothing(self):
+        db = SqliteDatabase(":memory:")
+        try:
+            db.add_user("Ann")
+            start = db.get_user_wallet("Ann")
+            good = Blackjack(game_id="good", casino=MagicMock()).to_dict()
+            bad = dict(good, state=None)  # violates NOT NULL
+            writes = UnitOfWork()
+            writes.credit('player', "Ann", 1000)
+            with self.assertRaises(sqlite3.Error):
+                db.save_games([("good", good, writes), ("bad", bad, None)])
+            self.assertEqual(db.list_game_ids(), [])
+            self.assertEqual(db.get_user_wallet("Ann"), start)
         finally:
             db.close()
 
@@ -918,7 +1064,7 @@ class TestNPCDepartureHook(unittest.TestCase):
         game.join(npc)
         game.tick()
         game.tick()
-        messages = [call.args[1] for call in game.casino.game_output.call_args_list]
+        messages = rendered_output(game.casino.game_output)
         self.assertTrue(any("tapped out" in m for m in messages))
 
 
@@ -977,12 +1123,13 @@ class TestCasinoErrorHandling(unittest.TestCase):
         game.time_last_event = 0
 
         self.casino._tick_games()
+        self.casino._flush_output()
 
         # Game should be gone from casino
         self.assertNotIn(game_id, self.casino.games)
 
         # A game_over event must have been published on the game's topic
-        calls = self.mock_redis.publish.call_args_list
+        calls = self.mock_redis.pipeline.return_value.publish.call_args_list
         game_over_call = None
         for call in calls:
             channel, payload = call.args
@@ -1013,6 +1160,929 @@ class TestCasinoErrorHandling(unittest.TestCase):
         self.assertIn(broken_game_id, self.casino.games)
 
 
+class TestCasinoTickScheduler(unittest.TestCase):
+    """_tick_games() only ticks tables whose next deadline has come due."""
+
+    def setUp(self):
+        self.casino = Casino(redis_host="localhost", redis_port=6379)
+        self.casino.redis = MagicMock()
+        self.casino.db = MagicMock()
+        self.casino.db.get_user_wallet.return_value = 1000.0
+        self.casino.db.get_all_npcs.return_value = []
+        now = time.time()
+        self.casino._last_llm_healthcheck = now
+        self.casino._last_wallet_replenish = now
+        self.casino._llm_client_tried = True
+
+    def _start_betting(self):
+        game_id = self.casino.new_game()
+        game = self.casino.games[game_id]
+        # Player: 10+9=19, dealer: 10+6=16 — nobody's dealt blackjack
+        game.deck = [Card("S", 10), Card("H", 9), Card("H", 10), Card("D", 6), Card("D", 10)]
+        game.join(Player("Human"))
+        self.casino._tick_games()  # WAITING -> BETTING
+        self.assertEqual(game.state, HandState.BETTING)
+        return game_id, game
+
+    def test_game_not_ticked_before_its_deadline(self):
+        _, game = self._start_betting()
+        game.tick = MagicMock()
+        self.casino._tick_games()
+        game.tick.assert_not_called()
+
+    def test_game_ticked_once_deadline_passes(self):
+        _, game = self._start_betting()
+        game.tick = MagicMock()
+        with patch('cardgames.casino.time.time', return_value=game.time_betting_started + game.TIME_FOR_BETTING):
+            self.casino._tick_games()
+        game.tick.assert_called_once()
+
+    def test_player_message_wakes_game(self):
+        game_id, game = self._start_betting()
+        self.casino._process_message({
+            'event_type': 'player_action', 'game_id': game_id, 'player': 'Human',
+            'action': 'bet', 'amount': game.MIN_BET,
+        })
+        self.casino._tick_games()
+        self.assertEqual(game.state, HandState.PLAYING)
+
+    def test_poll_timeout_sleeps_until_earliest_deadline(self):
+        _, game = self._start_betting()
+        deadline = game.time_betting_started + game.TIME_FOR_BETTING
+        with patch('cardgames.casino.time.time', return_value=deadline - 5.0):
+            self.assertAlmostEqual(self.casino._poll_timeout(), 5.0)
+        with patch('cardgames.casino.time.time', return_value=deadline + 1.0):
+            self.assertEqual(self.casino._poll_timeout(), 0.0)
+
+    def test_poll_timeout_capped_when_nothing_due(self):
+        self.assertEqual(self.casino._poll_timeout(), LISTEN_MAX_SLEEP)
+
+    def test_empty_table_sleeps_until_reaped(self):
+        game_id = self.casino.new_game()
+        self.casino._tick_games()
+        game = self.casino.games[game_id]
+        self.assertEqual(self.casino._deadlines[game_id],
+                         game.time_last_event + self.casino.EMPTY_GAME_TIMEOUT)
+
+    def test_tick_error_retried_after_delay(self):
+        game_id = self.casino.new_game()
+        game = self.casino.games[game_id]
+        game.tick = MagicMock(side_effect=CardGameError("boom"))
+        now = time.time() + 1.0
+        with patch('cardgames.casino.time.time', return_value=now):
+            self.casino._tick_games()
+            self.casino._tick_games()
+        game.tick.assert_called_once()
+        self.assertEqual(self.casino._deadlines[game_id], now + TICK_ERROR_RETRY)
+
+
+class TestCasinoIngressBatching(unittest.TestCase):
+    def setUp(self):
+        self.casino = Casino(redis_host="localhost", redis_port=6379)
+        self.casino.redis = MagicMock()
+        self.queue = asyncio.Queue()
+
+    def _queue(self, n):
+        for i in range(n):
+            self.queue.put_nowait({'type': 'message', 'data': json.dumps({'i': i})})
+
+    def test_drains_all_waiting_messages(self):
+        self._queue(5)
+        batch = self.casino._drain_ingress(self.queue)
+        self.assertEqual([json.loads(m['data'])['i'] for m in batch], [0, 1, 2, 3, 4])
+        self.assertTrue(self.queue.empty())
+
+    def test_batch_stops_at_cap(self):
+        self._queue(10)
+        with patch('cardgames.casino.LISTEN_BATCH_MAX', 4):
+            batch = self.casino._drain_ingress(self.queue)
+        self.assertEqual(len(batch), 4)
+        self.assertEqual(self.queue.qsize(), 6)
+        stats = self.casino._ingress_stats
+        self.assertEqual(stats['capped_batches'], 1)
+        self.assertEqual(stats['queue_depth'], 6)
+        self.assertEqual(stats['max_queue_depth'], 10)
+
+    def test_batch_stats(self):
+        self._queue(3)
+        self.casino._drain_ingress(self.queue)
+        self.casino._drain_ingress(self.queue)  # idle wakeup: not a batch
+        self._queue(1)
+        self.casino._drain_ingress(self.queue)
+        stats = self.casino._ingress_stats
+        self.assertEqual(stats['batches'], 2)
+        self.assertEqual(stats['messages'], 4)
+        self.assertEqual(stats['last_batch'], 1)
+        self.assertEqual(stats['max_batch'], 3)
+        self.assertEqual(stats['capped_batches'], 0)
+        self.assertEqual(stats['queue_depth'], 0)
+
+    def test_debug_state_reports_ingress(self):
+        self._queue(2)
+        self.casino._drain_ingress(self.queue)
+
+        async def call():
+            self.casino._process_message({'event_type': 'casino_action', 'action': 'get_debug',
+                                          'request_id': 'req1'})
+            await self.casino.rpc.drain()
+        asyncio.run(call())
+        channel, payload = self.casino.redis.publish.call_args.args
+        ingress = json.loads(payload)['ingress']
+        self.assertEqual(ingress['messages'], 2)
+        self.assertEqual(ingress['batch_cap'], LISTEN_BATCH_MAX)
+
+
+class TestRpc(unittest.TestCase):
+    """Casino calls: handlers by action name on one side, awaitable replies
+    with deadlines on the other."""
+
+    def setUp(self):
+        self.published = []
+        self.server = RpcServer(lambda channel, payload: self.published.append((channel, payload)))
+        self.server.register('get_wallet', 'player_wallet', lambda request: {'balance_cents': 500},
+                             required=('player',))
+        self.sent = []
+        self.client = RpcClient(MagicMock(), timeout=0.05, max_in_flight=1)
+        self.client.redis.xadd = self._xadd
+
+    async def _xadd(self, stream, fields, **kwargs):
+        self.sent.append(json.loads(fields['data']))
+
+    def test_reply_carries_request_id_and_type(self):
+        self.server.dispatch({'action': 'get_wallet', 'request_id': 'r1', 'player': 'Ann'})
+        self.assertEqual(self.published, [
+            (REPLY_CHANNEL, {'balance_cents': 500, 'event_type': 'player_wallet', 'request_id': 'r1'}),
+        ])
+        self.assertEqual(self.server.stats.as_dict()['get_wallet']['calls'], 1)
+
+    def test_call_without_required_field_dropped(self):
+        self.server.dispatch({'action': 'get_wallet', 'request_id': 'r1'})
+        self.assertEqual(self.published, [])
+
+    def test_failing_handler_answers_with_error(self):
+        self.server.register('boom', 'boom', MagicMock(side_effect=RuntimeError("db down")))
+        self.server.dispatch({'action': 'boom', 'request_id': 'r1'})
+        [(_, reply)] = self.published
+        self.assertIn('error', reply)
+        self.assertEqual(self.server.stats.as_dict()['boom']['errors'], 1)
+
+    def test_coroutine_handler_answered_when_it_finishes(self):
+        gate = None
+
+        async def handler(request):
+            await gate.wait()
+            return {'balance_cents': 700}
+        self.server.register('slow_wallet', 'player_wallet', handler)
+
+        async def scenario():
+            nonlocal gate
+            gate = asyncio.Event()
+            self.server.dispatch({'action': 'slow_wallet', 'request_id': 'r1'})
+            await asyncio.sleep(0)
+            self.assertEqual(self.published, [])  # the caller carried on
+            gate.set()
+            await self.server.drain()
+        asyncio.run(scenario())
+        self.assertEqual(self.published, [
+            (REPLY_CHANNEL, {'balance_cents': 700, 'event_type': 'player_wallet', 'request_id': 'r1'}),
+        ])
+
+    def test_call_resolved_by_reply(self):
+        async def scenario():
+            call = asyncio.create_task(self.client.call('get_wallet', player='Ann'))
+            while not self.sent:
+                await asyncio.sleep(0)
+            self.server.dispatch(self.sent[0])
+            self.assertTrue(self.client.resolve(self.published[0][1]))
+            return await call
+        reply = asyncio.run(scenario())
+        self.assertEqual(reply['balance_cents'], 500)
+        self.assertEqual(self.client.in_flight, 0)
+
+    def test_lost_reply_times_out_and_is_forgotten(self):
+        with self.assertRaises(RpcTimeout):
+            asyncio.run(self.client.call('get_wallet', player='Ann'))
+        self.assertEqual(self.client.in_flight, 0)
+        self.assertEqual(self.client.stats.as_dict()['get_wallet']['timeouts'], 1)
+        # A reply turning up late is ignored
+        self.assertFalse(self.client.resolve({'request_id': self.sent[0]['request_id']}))
+
+    def test_in_flight_calls_bounded(self):
+        async def scenario():
+            first = asyncio.create_task(self.client.call('get_wallet', player='Ann'))
+            await asyncio.sleep(0)
+            with self.assertRaises(RpcBusy):
+                await self.client.call('get_wallet', player='Bob')
+            with self.assertRaises(RpcTimeout):
+                await first
+        asyncio.run(scenario())
+
+    def test_casino_routes_actions_to_handlers(self):
+        casino = Casino(redis_host="localhost", redis_port=6379)
+        casino.redis = MagicMock()
+        casino._process_message({'event_type': 'casino_action', 'action': 'new_game', 'request_id': 'r1'})
+        channel, payload = casino.redis.publish.call_args.args
+        reply = json.loads(payload)
+        self.assertEqual(channel, REPLY_CHANNEL)
+        self.assertEqual(reply['event_type'], 'new_game')
+        self.assertIn(reply['game_id'], casino.games)
+
+
+class TestSendScheduler(unittest.TestCase):
+    """Outbound Discord messages: per-channel pacing, a global bucket served
+    by priority, and shedding of low-priority lines under backlog."""
+
+    def setUp(self):
+        self.now = 0.0
+        self.clock = lambda: self.now
+
+    def _message(self, text, priority=PRIORITY_NORMAL):
+        return OutboundMessage(None, text, priority)
+
+    def test_token_bucket_refills_at_rate(self):
+        bucket = TokenBucket(rate=2, capacity=1, clock=self.clock)
+        self.assertEqual(bucket.wait_time(), 0)
+        bucket.take()
+        self.assertAlmostEqual(bucket.wait_time(), 0.5)
+        self.now = 0.5
+        self.assertEqual(bucket.wait_time(), 0)
+
+    def test_low_priority_lines_shed_when_backed_up(self):
+        scheduler = SendScheduler(channel_rate=1, backlog_limit=2, clock=self.clock)
+        self.assertEqual(scheduler.submit('c', self._message("deal")), 'queued')
+        self.assertEqual(scheduler.submit('c', self._message("quip 1", PRIORITY_LOW)), 'queued')
+        self.assertEqual(scheduler.submit('c', self._message("quip 2", PRIORITY_LOW)), 'merged')
+        self.assertEqual(scheduler.submit('c', self._message("result", PRIORITY_HIGH)), 'queued')
+        self.assertEqual(scheduler.submit('c', self._message("quip 3", PRIORITY_LOW)), 'dropped')
+        texts = []
+        while (message := scheduler.next_message('c')) is not None:
+            texts.append(message.text)
+        self.assertEqual(texts, ["deal", "quip 1\nquip 2", "result"])
+        snapshot = scheduler.snapshot()
+        self.assertEqual((snapshot['merged'], snapshot['dropped'], snapshot['queued']), (1, 1, {}))
+
+    def test_burst_coalesced_up_to_a_beat(self):
+        scheduler = SendScheduler(channel_rate=1, coalesce_window=1, clock=self.clock)
+        for text in ("shuffle", "Ann has 19", "Bob has 12"):
+            scheduler.submit('c', self._message(text))
+        scheduler.submit('c', OutboundMessage(None, "Dealer flips", coalesce=False))
+        self.now = 5
+        scheduler.submit('c', self._message("late"))
+        first = scheduler.next_message('c')
+        scheduler.coalesce('c', first)
+        self.assertEqual((first.text, first.parts), ("shuffle\nAnn has 19\nBob has 12", 3))
+        beat = scheduler.next_message('c')
+        scheduler.coalesce('c', beat)
+        self.assertEqual(beat.text, "Dealer flips")
+        late = scheduler.next_message('c')
+        self.assertEqual(late.text, "late")
+
+    def test_lines_past_the_window_not_coalesced(self):
+        scheduler = SendScheduler(channel_rate=1, coalesce_window=1, clock=self.clock)
+        scheduler.submit('c', self._message("one"))
+        self.now = 3
+        scheduler.submit('c', self._message("two"))
+        first = scheduler.next_message('c')
+        scheduler.coalesce('c', first)
+        self.assertEqual(first.text, "one")
+
+    def test_global_tokens_go_to_higher_priority_first(self):
+        scheduler = SendScheduler(channel_rate=100, global_rate=100, global_burst=1)
+        order = []
+
+        async def send(channel_id, priority):
+            message = self._message(channel_id, priority)
+            message.queued_at = time.monotonic()
+            await scheduler.wait_turn(channel_id, message)
+            scheduler.record_sent(message)
+            order.append(channel_id)
+
+        async def scenario():
+            await send('first', PRIORITY_NORMAL)  # spends the only token
+            await asyncio.gather(send('chatter', PRIORITY_LOW), send('prompt', PRIORITY_HIGH))
+        asyncio.run(scenario())
+        self.assertEqual(order, ['first', 'prompt', 'chatter'])
+        self.assertEqual(scheduler.snapshot()['sent'], 3)
+
+
+class TestGameEvents(unittest.TestCase):
+    """Tables emit typed events; clients render the saloon text."""
+
+    def test_bet_placed_carries_cents_not_text(self):
+        mock_casino = MagicMock()
+        mock_casino.get_wallet.return_value = 7500
+        game = Blackjack("test-game-id", mock_casino)
+        player = Player("Ann")
+        game.join(player)
+        game.start_betting()
+        game.bet(player, 2500)
+        event = mock_casino.game_output.call_args.args[1]
+        self.assertEqual(event, {'type': 'bet_placed', 'player': 'Ann', 'amount_cents': 2500,
+                                 'balance_cents': 7500})
+        self.assertEqual(render_event(event), "💵 Ann throws $25.00 on the table. 💰 Wad: $75.00")
+
+    def test_hand_result_rendering(self):
+        self.assertEqual(
+            render_event({'type': 'hand_result', 'player': 'Ann', 'outcome': 'win', 'amount_cents': 5000,
+                          'departed': True, 'balance_cents': None}),
+            "Ann 🏆 (already left) strikes gold! Payout: $50.00",
+        )
+
+    def test_cards_rendered_from_codes(self):
+        self.assertEqual(
+            render_event({'type': 'card_dealt', 'player': 'Ann', 'card': 'H9', 'cards': ['S10', 'H9']}),
+            "🃏 Ann draws... 9 of Hearts\n🎴 Ann's showing 10 of Spades, 9 of Hearts",
+        )
+        self.assertEqual(render_event({'type': 'dealer_showing', 'card': 'D14'}), "👀 Dealer's showing Ace of Diamonds.")
+
+    def test_unknown_event_not_rendered(self):
+        self.assertIsNone(render_event({'type': 'something_newer'}))
+
+
+class TestLiveTable(unittest.TestCase):
+    """The live table view folds a hand's events into one embed and a summary."""
+
+    def _play_hand(self):
+        mock_casino = MagicMock()
+        mock_casino.get_wallet.return_value = 10000
+        game = Blackjack("test-game-id", mock_casino)
+        game.deck = [Card("H", 3), Card("H", 2), Card("H", 5), Card("H", 6),
+                     Card("H", 7), Card("H", 8), Card("H", 9)]
+        player = Player("Ann")
+        game.players.append(player)
+        game.bets[player.name] = 1000
+        game.new_hand()
+        table = LiveTable()
+        table.apply({'type': 'bet_placed', 'player': 'Ann', 'amount_cents': 1000, 'balance_cents': 9000})
+        events = [call.args[1] for call in mock_casino.game_output.call_args_list]
+        for event in events:
+            table.apply(event)
+        mock_casino.game_output.reset_mock()
+        return game, player, table
+
+    def test_deal_shows_dealer_up_card_and_turn(self):
+        _, _, table = self._play_hand()
+        self.assertEqual(table.render(), "**Dealer:** 9♥ 🂠\n👉 **Ann** — $10.00 — 7♥ 6♥ (13)")
+
+    def test_hand_over_reveals_dealer_and_summarises(self):
+        game, player, table = self._play_hand()
+        game.stand(player)
+        game.dealer_turn()
+        game.end_hand()
+        events = [call.args[1] for call in game.casino.game_output.call_args_list]
+        self.assertEqual(events[-1], {'type': 'hand_over'})
+        for event in events:
+            table.apply(event)
+        self.assertEqual(table.phase, 'over')
+        self.assertEqual(table.render(), "**Dealer:** 9♥ 8♥ (17)\n**Ann** — $10.00 — 7♥ 6♥ (13) ❌")
+        self.assertEqual(table.summary(), "🏁 Hand over — dealer 17. Ann ❌ $10.00")
+
+    def test_new_betting_round_clears_the_table(self):
+        _, _, table = self._play_hand()
+        table.apply({'type': 'betting_opened', 'min_bet_cents': 500, 'max_bet_cents': 10000, 'seconds': 30})
+        table.apply({'type': 'bet_placed', 'player': 'Bob', 'amount_cents': 2500, 'balance_cents': None})
+        self.assertEqual(table.render(), "**Dealer:** —\n**Bob** — $25.00")
+
+    def test_events_without_a_view_change_are_ignored(self):
+        self.assertFalse(LiveTable().apply({'type': 'quip', 'player': 'Ann', 'text': "Howdy"}))
+
+
+class TestCasinoOutputFrames(unittest.TestCase):
+    """Table output is buffered per pass and published as one frame per table."""
+
+    def setUp(self):
+        self.casino = Casino(redis_host="localhost", redis_port=6379)
+        self.casino.redis = MagicMock()
+        self.pipe = self.casino.redis.pipeline.return_value
+
+    def _published(self):
+        return [(call.args[0], json.loads(call.args[1])) for call in self.pipe.publish.call_args_list]
+
+    def test_events_coalesced_per_table_in_one_round_trip(self):
+        self.casino.game_output('g1', {'type': 'betting_closed'})
+        self.casino.game_output('g2', {'type': 'dealer_turn'})
+        self.casino.game_output('g1', {'type': 'no_bets'})
+        self.casino._flush_output()
+        self.assertEqual(self._published(), [
+            ('game_updates_g1', {'game_id': 'g1', 'events': [{'type': 'betting_closed'}, {'type': 'no_bets'}]}),
+            ('game_updates_g2', {'game_id': 'g2', 'events': [{'type': 'dealer_turn'}]}),
+        ])
+        self.pipe.execute.assert_called_once()
+        self.casino.redis.publish.assert_not_called()
+
+    def test_nothing_published_without_output(self):
+        self.casino._flush_output()
+        self.casino.redis.pipeline.assert_not_called()
+
+    def test_game_over_follows_last_frame(self):
+        game_id = self.casino.new_game()
+        self.casino._process_message({'event_type': 'casino_action', 'action': 'stop_game', 'game_id': game_id})
+        self.casino._flush_output()
+        [(_, frame), (_, game_over)] = self._published()
+        self.assertEqual(frame['events'][-1], {'type': 'game_stopped', 'refunds': []})
+        self.assertEqual(game_over, {'game_id': game_id, 'event_type': 'game_over'})
+        self.assertEqual(self.casino._output_stats, {'frames': 1, 'events': 1, 'flushes': 1})
+
+
+class FakeStreamClosed(Exception):
+    pass
+
+
+class FakeCommandStream:
+    """Just enough of redis.asyncio's stream commands for the casino's ingress,
+    for a single consumer group. Raises FakeStreamClosed out of the reader
+    once `stop_when()` holds, which ends the scheduler loop."""
+
+    def __init__(self):
+        self.streams = {}    # stream -> [(entry_id, fields)]
+        self.pending = {}    # (stream, entry_id) -> consumer
+        self.delivered = {}  # stream -> sequence of the last entry delivered with '>'
+        self.read_streams = {COMMAND_STREAM}  # streams a consumer reads (others only get written)
+        self.keys = {}
+        self.published = []  # (channel, payload)
+        self.stop_when = lambda: False
+        self.fail_next_read = None
+
+    @staticmethod
+    def _seq(entry_id):
+        return int(entry_id.split(b'-')[0])
+
+    def add(self, message=None, fields=None, stream=COMMAND_STREAM):
+        entries = self.streams.setdefault(stream, [])
+        entry_id = f"{len(entries) + 1}-0".encode()
+        if fields is None:
+            fields = {k.encode(): v.encode() for k, v in command_fields(message).items()}
+        entries.append((entry_id, fields))
+        return entry_id
+
+    def messages(self, stream=COMMAND_STREAM):
+        return [json.loads(fields[b'data']) for _, fields in self.streams.get(stream, [])]
+
+    def all_acked(self):
+        return (not self.pending
+                and all(self.delivered.get(stream, 0) == len(self.streams.get(stream, []))
+                        for stream in self.read_streams))
+
+    async def xgroup_create(self, *args, **kwargs):
+        pass
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        return self.add(fields={k.encode(): v.encode() for k, v in fields.items()}, stream=stream)
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time=0, start_id='0-0', count=None):
+        # Idle times aren't tracked: whatever another consumer holds counts as stalled
+        entries = [e for e in self.streams.get(stream, [])
+                   if self.pending.get((stream, e[0])) not in (None, consumer)][:count]
+        for entry_id, _ in entries:
+            self.pending[(stream, entry_id)] = consumer
+        return [b'0-0', entries, []]
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        if self.fail_next_read:
+            error, self.fail_next_read = self.fail_next_read, None
+            raise error
+        if self.stop_when():
+            raise FakeStreamClosed()
+        self.read_streams.update(streams)
+        response = []
+        for stream, last_id in streams.items():
+            if last_id == '>':
+                entries = [e for e in self.streams.get(stream, [])
+                           if self._seq(e[0]) > self.delivered.get(stream, 0)][:count]
+                if not entries:
+                    continue
+                self.delivered[stream] = self._seq(entries[-1][0])
+                for entry_id, _ in entries:
+                    self.pending[(stream, entry_id)] = consumer
+            else:
+                after = 0 if last_id == '0' else self._seq(last_id)
+                entries = [e for e in self.streams.get(stream, [])
+                           if self.pending.get((stream, e[0])) == consumer and self._seq(e[0]) > after][:count]
+            response.append([stream.encode(), entries])
+        if not response and block:
+            await asyncio.sleep(0.01)
+        return response
+
+    async def xack(self, stream, group, *entry_ids):
+        for entry_id in entry_ids:
+            self.pending.pop((stream, entry_id), None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, stream):
+        self.stream = stream
+        self.ops = []
+
+    def exists(self, key):
+        self.ops.append(lambda: int(key in self.stream.keys))
+
+    def set(self, key, value, ex=None):
+        self.ops.append(lambda: self.stream.keys.__setitem__(key, value))
+
+    def xack(self, stream, group, *entry_ids):
+        self.ops.append(lambda: [self.stream.pending.pop((stream, i), None) for i in entry_ids])
+
+    def publish(self, channel, payload):
+        self.ops.append(lambda: self.stream.published.append((channel, json.loads(payload))))
+
+    async def execute(self):
+        return [op() for op in self.ops]
+
+
+class FakeLeases:
+    """In-memory stand-in for GameLeases. Shards made with for_shard() share
+    the same leases and advertised loads."""
+
+    def __init__(self, shard_id, owners=None, loads=None):
+        self.shard_id = shard_id
+        self.lease_owners = {} if owners is None else owners  # game_id -> shard
+        self.loads = {} if loads is None else loads          # live shard -> tables
+        self.dead = []
+
+    def for_shard(self, shard_id):
+        return FakeLeases(shard_id, self.lease_owners, self.loads)
+
+    async def claim(self, game_ids):
+        held = set()
+        for game_id in game_ids:
+            if self.lease_owners.get(game_id) in (None, self.shard_id):
+                self.lease_owners[game_id] = self.shard_id
+                held.add(game_id)
+        return held
+
+    async def retake(self, game_ids):
+        return {game_id for game_id in game_ids if self.lease_owners.get(game_id) == self.shard_id}
+
+    async def renew(self, game_ids):
+        game_ids = list(game_ids)
+        return set(game_ids) - await self.claim(game_ids)
+
+    async def release(self, game_ids):
+        for game_id in game_ids:
+            if self.lease_owners.get(game_id) == self.shard_id:
+                del self.lease_owners[game_id]
+
+    async def owners(self, game_ids):
+        return {game_id: self.lease_owners.get(game_id) for game_id in game_ids}
+
+    async def heartbeat(self, tables):
+        self.loads[self.shard_id] = tables
+
+    async def shard_loads(self):
+        return dict(self.loads), list(self.dead)
+
+    async def least_loaded(self):
+        live = dict(self.loads)
+        live.setdefault(self.shard_id, 0)
+        target = min(live, key=lambda shard: (live[shard], shard != self.shard_id))
+        self.loads[target] = live[target] + 1
+        return target
+
+    async def forget(self, shard_id):
+        self.dead.remove(shard_id)
+
+
+class CasinoServeHarness(unittest.TestCase):
+    """Runs a casino's serve() loop against a fake command stream instead of Redis."""
+
+    def setUp(self):
+        self.casino = Casino(redis_host="localhost", redis_port=6379, db=MagicMock())
+        self.casino.redis = MagicMock()
+        self.casino.db.get_all_npcs.return_value = []
+        self.casino.db.get_user_wallet.return_value = 100000
+        self.casino.db.list_game_ids.return_value = []
+        self.casino.db.get_setting.return_value = None
+        self.casino._llm_client_tried = True
+        now = time.time()
+        self.casino._last_wallet_replenish = now
+        self.casino._last_llm_healthcheck = now
+        self.stream = FakeCommandStream()
+
+    async def _serve(self, until):
+        """Run ingress and the table scheduler until `until()` holds."""
+        casino = self.casino
+        casino._loop = asyncio.get_running_loop()
+        casino._wakeup = asyncio.Event()
+        casino._db_executor = ThreadPoolExecutor(max_workers=1)
+        self.stream.stop_when = until
+        queue = asyncio.Queue()
+        try:
+            reader = asyncio.create_task(casino._read_ingress(self.stream, queue))
+            with self.assertRaises(FakeStreamClosed):
+                await asyncio.wait_for(casino._run_tables(queue, reader, self.stream), timeout=5)
+        finally:
+            casino._db_executor.shutdown(wait=True)
+            casino._loop = None
+
+    def _serve_until_acked(self):
+        asyncio.run(self._serve(until=self.stream.all_acked))
+
+    def _join(self, game_id, player='Human'):
+        return {'event_type': 'player_action', 'game_id': game_id, 'player': player, 'action': 'join'}
+
+
+class TestCasinoAsyncRuntime(CasinoServeHarness):
+    """The serve() loop: stream ingress, batching, acks and background work."""
+
+    def test_commands_applied_and_written_off_loop_before_ack(self):
+        saved_on = []
+        self.casino.db.save_games.side_effect = lambda *a: saved_on.append(threading.current_thread())
+        game_id = self.casino.new_game()
+        saved_on.clear()
+        self.stream.add(self._join(game_id))
+        self._serve_until_acked()
+        game = self.casino.games[game_id]
+        self.assertEqual([p.name for p in game.players + game.players_waiting], ['Human'])
+        self.assertTrue(saved_on)
+        self.assertNotEqual(saved_on[0], threading.main_thread())
+        self.assertEqual(len(self.stream.keys), 1)  # command_id remembered with the ack
+
+    def test_table_output_published_as_frames(self):
+        game_id = self.casino.new_game()
+        self.stream.add(self._join(game_id, 'Ann'))
+        self.stream.add(self._join(game_id, 'Bob'))
+        self._serve_until_acked()
+        channels = [channel for channel, _ in self.stream.published]
+        self.assertEqual(channels, [f"game_updates_{game_id}"])
+        # Both joins and the tick that followed them (betting opens): one frame
+        [(_, frame)] = self.stream.published
+        types = [event['type'] for event in frame['events']]
+        self.assertEqual([e.get('player') for e in frame['events'][:2]], ['Ann', 'Bob'])
+        self.assertEqual(types[:2], ['player_joined', 'player_joined'])
+        self.assertIn('betting_opened', types[2:])
+
+    def test_unacked_commands_redelivered_after_restart(self):
+        game_id = self.casino.new_game()
+        entry_id = self.stream.add(self._join(game_id))
+        # A previous casino process read it but died before acknowledging
+        self.stream.delivered[COMMAND_STREAM] = 1
+        self.stream.pending[(COMMAND_STREAM, entry_id)] = SHARD_ID
+        self._serve_until_acked()
+        game = self.casino.games[game_id]
+        self.assertEqual([p.name for p in game.players + game.players_waiting], ['Human'])
+
+    def test_duplicate_command_applied_once(self):
+        game_id = self.casino.new_game()
+        message = dict(self._join(game_id), command_id='cmd-1')
+        self.stream.add(message)
+        self.stream.add(message)
+        with patch.object(self.casino, '_process_message') as process:
+            self._serve_until_acked()
+        process.assert_called_once()
+
+    def test_command_applied_before_restart_skipped(self):
+        game_id = self.casino.new_game()
+        self.stream.keys['casino_command_done:cmd-1'] = 1
+        self.stream.add(dict(self._join(game_id), command_id='cmd-1'))
+        with patch.object(self.casino, '_process_message') as process:
+            self._serve_until_acked()
+        process.assert_not_called()
+
+    def test_unreadable_and_failing_commands_acked(self):
+        self.stream.add(fields={b'data': b'not json'})
+        self.stream.add({'event_type': 'casino_action'})  # KeyError on 'action'
+        self._serve_until_acked()
+        self.assertEqual(self.stream.pending, {})
+
+    def test_stream_reset_recreates_group(self):
+        game_id = self.casino.new_game()
+        self.stream.add(self._join(game_id))
+        self.stream.fail_next_read = redis.exceptions.ResponseError("NOGROUP No such key")
+        with patch.object(self.casino, '_ensure_command_group') as ensure:
+            self._serve_until_acked()
+        ensure.assert_called_once()
+        game = self.casino.games[game_id]
+        self.assertEqual(len(game.players + game.players_waiting), 1)
+
+    def test_npc_decision_wakes_table(self):
+        game_id = self.casino.new_game()
+        game = self.casino.games[game_id]
+        npc = SimpleBlackjackNPC("Bot")
+        game.players.append(npc)
+        decision = Future()
+        with patch.object(SimpleBlackjackNPC, 'pending_decision', decision):
+
+            async def scenario():
+                self.casino._loop = asyncio.get_running_loop()
+                self.casino._wakeup = asyncio.Event()
+                self.casino._pop_due_games(time.time() + 1)
+                self.casino._watch_npc_decisions(game_id, game)
+                self.casino._watch_npc_decisions(game_id, game)  # only hooked once
+                threading.Thread(target=decision.set_result, args=('stand',)).start()
+                await asyncio.wait_for(self.casino._wakeup.wait(), timeout=5)
+
+            asyncio.run(scenario())
+        self.assertIn(game_id, self.casino._pop_due_games(time.time()))
+        self.assertEqual(len(decision._done_callbacks), 1)
+
+    def test_chores_run_in_background(self):
+        self.casino._last_wallet_replenish = 0
+        ran_on = []
+        self.casino._credit_idle_npc_wallets = lambda: ran_on.append(threading.current_thread())
+
+        async def scenario():
+            self.casino._loop = asyncio.get_running_loop()
+            self.casino._db_executor = ThreadPoolExecutor(max_workers=1)
+            self.casino._start_chores()
+            self.assertIn('replenish', self.casino._chores)
+            self.casino._start_chores()  # already running: not started twice
+            await self.casino._chores['replenish']
+            await asyncio.sleep(0)
+            self.casino._db_executor.shutdown(wait=True)
+
+        asyncio.run(scenario())
+        self.assertEqual(len(ran_on), 1)
+        self.assertNotEqual(ran_on[0], threading.main_thread())
+        self.assertNotIn('replenish', self.casino._chores)
+
+
+class TestCasinoSharding(CasinoServeHarness):
+    """Several casino shards splitting the games between them by lease."""
+
+    def setUp(self):
+        super().setUp()
+        self.casino.shard_id = 'shard-a'
+        self.casino.leases = FakeLeases('shard-a')
+        self.casino._last_lease_renewal = time.time()
+        self.other = FakeLeases('shard-b', self.casino.leases.lease_owners, self.casino.leases.loads)
+
+    def _saved_game(self):
+        """Serialized state of a game some other shard was running."""
+        elsewhere = Casino(redis_host="localhost", redis_port=6379)
+        game_id = elsewhere.new_game()
+        return game_id, elsewhere.games[game_id].to_dict()
+
+    def test_game_command_forwarded_to_owning_shard(self):
+        game_id, _ = self._saved_game()
+        asyncio.run(self.other.claim([game_id]))
+        self.stream.add(self._join(game_id))
+        with patch.object(self.casino, '_process_message') as process:
+            self._serve_until_acked()
+        process.assert_not_called()
+        [forwarded] = self.stream.messages(shard_stream('shard-b'))
+        self.assertEqual(forwarded['game_id'], game_id)
+        self.assertEqual(forwarded['hops'], 1)
+
+    def test_new_game_routed_to_least_loaded_shard(self):
+        self.casino.leases.loads.update({'shard-a': 5, 'shard-b': 2})
+        request = {'event_type': 'casino_action', 'action': 'new_game', 'request_id': 'r1'}
+        self.stream.add(request)
+        self._serve_until_acked()
+        self.assertEqual(self.casino.games, {})
+        self.assertEqual(self.stream.messages(shard_stream('shard-b'))[0]['request_id'], 'r1')
+
+        # Arriving on its own stream, the shard creates the game and takes its lease
+        self.casino.leases.loads['shard-b'] = 10
+        self.stream.add(request, stream=shard_stream('shard-a'))
+        self._serve_until_acked()
+        [game_id] = self.casino.games
+        self.assertEqual(self.casino.leases.lease_owners[game_id], 'shard-a')
+
+    def test_command_for_orphaned_game_adopts_it(self):
+        game_id, game_data = self._saved_game()
+        self.casino.db.load_games.return_value = [game_data]
+        self.stream.add(self._join(game_id))
+        self._serve_until_acked()
+        game = self.casino.games[game_id]
+        self.assertEqual([p.name for p in game.players + game.players_waiting], ['Human'])
+        self.assertEqual(self.casino.leases.lease_owners[game_id], 'shard-a')
+
+    def test_unknown_game_lease_handed_back(self):
+        self.casino.db.load_games.return_value = []
+        self.stream.add(self._join('no-such-game'))
+        self._serve_until_acked()
+        self.assertEqual(self.casino.games, {})
+        self.assertEqual(self.casino.leases.lease_owners, {})
+
+    def test_lost_lease_drops_game_without_deleting_it(self):
+        game_id = self.casino.new_game()
+        asyncio.run(self.other.claim([game_id]))  # lapsed and taken while we stalled
+
+        async def maintain():
+            self.casino._loop = asyncio.get_running_loop()
+            self.casino._db_executor = ThreadPoolExecutor(max_workers=1)
+            await self.casino._maintain_leases()
+            self.casino._db_executor.shutdown(wait=True)
+
+        asyncio.run(maintain())
+        self.assertNotIn(game_id, self.casino.games)
+        self.casino.db.delete_game.assert_not_called()
+        self.assertEqual(self.casino.leases.loads['shard-a'], 0)
+
+    def test_sweep_takes_fair_share_of_orphans(self):
+        orphans = [self._saved_game() for _ in range(4)]
+        data = dict(orphans)
+        self.casino.db.list_game_ids.return_value = list(data)
+        self.casino.db.load_games.side_effect = lambda game_ids: [data[game_id] for game_id in game_ids]
+
+        async def sweep(loads):
+            self.casino.leases.loads.update(loads)
+            self.casino._last_lease_sweep = 0
+            self.casino._loop = asyncio.get_running_loop()
+            self.casino._db_executor = ThreadPoolExecutor(max_workers=1)
+            await self.casino._maintain_leases()
+            self.casino._db_executor.shutdown(wait=True)
+
+        asyncio.run(sweep({'shard-b': 0}))  # two live shards: half each
+        self.assertEqual(len(self.casino.games), 2)
+        asyncio.run(sweep({'shard-b': 1}))  # now more loaded than shard-b: leave the rest
+        self.assertEqual(len(self.casino.games), 2)
+        asyncio.run(sweep({'shard-b': 3}))  # least loaded again: half of what's left
+        self.assertEqual(len(self.casino.games), 3)
+
+    def test_dead_shard_commands_taken_over(self):
+        game_id = self.casino.new_game()
+        dead_stream = shard_stream('shard-c')
+        pending = self.stream.add(self._join(game_id, 'Read'), stream=dead_stream)
+        self.stream.pending[(dead_stream, pending)] = 'shard-c'
+        self.stream.delivered[dead_stream] = 1
+        self.stream.add(self._join(game_id, 'Unread'), stream=dead_stream)
+        self.casino.leases.dead.append('shard-c')
+        self.casino._dead_shards.add('shard-c')
+        asyncio.run(self._serve(until=lambda: not self.casino._dead_shards and self.stream.all_acked()))
+        game = self.casino.games[game_id]
+        self.assertEqual(sorted(p.name for p in game.players + game.players_waiting), ['Read', 'Unread'])
+        self.assertEqual(self.casino.leases.dead, [])
+
+
+class TestBlackjackNextDeadline(unittest.TestCase):
+    def setUp(self):
+        mock_casino = MagicMock()
+        mock_casino.get_wallet.return_value = 100000
+        mock_casino.update_wallet.return_value = True
+        self.game = Blackjack(game_id="test_game", casino=mock_casino)
+
+    def test_empty_waiting_table_has_no_deadline(self):
+        self.assertIsNone(self.game.next_deadline())
+
+    def test_waiting_for_players_deadline(self):
+        self.game.join(Player("Human"))
+        with patch('cardgames.blackjack.time.time', return_value=1000.0):
+            self.assertEqual(self.game.next_deadline(), 1000.0)  # first tick starts the clock
+            self.game.time_first_player_joined = 990.0
+            self.assertEqual(self.game.next_deadline(), 990.0 + self.game.TIME_WAIT_FOR_PLAYERS)
+
+    def test_betting_deadline_is_betting_timeout(self):
+        self.game.join(Player("Human"))
+        self.game.start_betting()
+        self.assertEqual(self.game.next_deadline(),
+                         self.game.time_betting_started + self.game.TIME_FOR_BETTING)
+
+    def test_npc_owing_a_bet_is_due_now(self):
+        self.game.join(Player("Human"))
+        self.game.join(SimpleBlackjackNPC("Bot"))
+        self.game.start_betting()
+        with patch('cardgames.blackjack.time.time', return_value=1000.0):
+            self.assertEqual(self.game.next_deadline(), 1000.0)
+
+    def test_pending_npc_bet_is_not_polled(self):
+        npc = SimpleBlackjackNPC("Bot")
+        self.game.join(Player("Human"))
+        self.game.join(npc)
+        self.game.start_betting()
+        with patch.object(SimpleBlackjackNPC, 'pending_decision', Future()):
+            self.assertEqual(self.game.next_deadline(),
+                             self.game.time_betting_started + self.game.TIME_FOR_BETTING)
+
+    def test_pending_npc_turn_has_no_deadline(self):
+        self.game.deck = [Card("S", 10), Card("H", 9), Card("H", 10), Card("D", 6), Card("D", 10)]
+        npc = SimpleBlackjackNPC("Bot")
+        self.game.join(npc)
+        self.game.start_betting()
+        self.game.bet(npc, self.game.MIN_BET)
+        self.game.new_hand()
+        self.assertEqual(self.game.state, HandState.PLAYING)
+        with patch.object(SimpleBlackjackNPC, 'pending_decision', Future()):
+            self.assertIsNone(self.game.next_deadline())
+
+    def test_human_turn_deadline_is_reminder(self):
+        # Player: 10+9=19, dealer: 10+6=16 — nobody's dealt blackjack
+        self.game.deck = [Card("S", 10), Card("H", 9), Card("H", 10), Card("D", 6), Card("D", 10)]
+        player = Player("Human")
+        self.game.join(player)
+        self.game.start_betting()
+        self.game.bet(player, self.game.MIN_BET)
+        self.game.new_hand()
+        self.assertEqual(self.game.state, HandState.PLAYING)
+        self.assertEqual(self.game.next_deadline(),
+                         self.game.time_last_event + self.game.PERIOD_REMINDER_PLAYER_TURN)
+
+    def test_between_hands_deadline(self):
+        self.game.state = HandState.BETWEEN_HANDS
+        self.game.time_last_hand_ended = 1000.0
+        self.game.time_between_hands_duration = 200.0
+        self.assertEqual(self.game.next_deadline(), 1200.0)
+
+    def test_pending_continuation_takes_precedence(self):
+        self.game.state = HandState.DEALER_TURN
+        self.game._continuation = iter(())
+        self.game._continuation_at = 1234.0
+        self.assertEqual(self.game.next_deadline(), 1234.0)
+
+
 class TestSerialization(unittest.TestCase):
     """Tests for game state serialization/deserialization."""
 
@@ -1059,6 +2129,39 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(deserialized.hand[0].suit, "H")
         self.assertEqual(deserialized.hand[0].value, 10)
 
+    def test_restore_mid_resolution_settles_only_unsettled_players(self):
+        """A snapshot saved between two results restores in RESOLVING with no
+        continuation; resolving again settles only who still has a bet."""
+        mock_casino = MagicMock()
+        mock_casino.get_wallet.return_value = 1000
+        game = Blackjack(game_id="test_game", casino=mock_casino)
+        alice, bob = Player("Alice"), Player("Bob")
+        game.join(alice)
+        game.join(bob)
+        game.players, game.players_waiting = [alice, bob], []
+        game.bets = {"Alice": 2000, "Bob": 3000}
+        alice.hand = [Card("H", 10), Card("S", 10)]
+        bob.hand = [Card("D", 10), Card("C", 9)]
+        game.dealer.hand = [Card("H", 8), Card("S", 8), Card("C", 10)]
+        game.state = HandState.RESOLVING
+        game.RESULT_PAUSE = 0.8
+        game.end_hand()
+        game._run_steps(game._continuation)  # Alice settled; paused before Bob
+        self.assertEqual(game.bets, {"Bob": 3000})
+
+        restored_casino = MagicMock()
+        restored_casino.get_wallet.return_value = 1000
+        restored = Blackjack.from_dict(game.to_dict(), restored_casino)
+        self.assertEqual(restored.state, HandState.RESOLVING)
+        restored.end_hand()
+        [bob_again] = [p for p in restored.players if p.name == "Bob"]
+        restored_casino.update_wallet.assert_called_once_with(bob_again, 6000)
+        restored_casino.record_hand_result.assert_called_once_with(bob_again, 3000, 0)
+        results = [call.args[1] for call in restored_casino.game_output.call_args_list
+                   if call.args[1]['type'] == 'hand_result']
+        self.assertEqual([r['player'] for r in results], ["Bob"])
+        self.assertEqual(restored.state, HandState.BETWEEN_HANDS)
+
     def test_game_serialization_roundtrip(self):
         """Test full game state serialization and deserialization."""
         mock_casino = MagicMock()
@@ -1388,6 +2491,54 @@ class TestCasinoNPCManagement(unittest.TestCase):
         self.assertEqual(len(npcs), 1)
         self.assertTrue(npcs[0].is_npc)
 
+    def _serving(self, scenario):
+        """Run scenario() with the casino as serve() leaves it: on a loop."""
+        async def run():
+            self.casino._loop = asyncio.get_running_loop()
+            self.casino._wakeup = asyncio.Event()
+            try:
+                return await scenario()
+            finally:
+                self.casino._loop = None
+        return asyncio.run(run())
+
+    def test_spawn_drafts_npcs_off_the_loop(self):
+        self.casino.db = self.mock_db
+        self.mock_db.get_available_npcs.return_value = [
+            {'id': 7, 'name': "Dusty", 'personality_name': "The Card Sharp", 'backstory': '', 'wallet_cents': 400}]
+        self.mock_db.get_recent_npc_memories.return_value = {}
+        threads = []
+        self.mock_db.set_npc_game.side_effect = lambda *args: threads.append(threading.current_thread())
+        game_id = self.casino.new_game()
+        game = self.casino.games[game_id]
+
+        async def scenario():
+            self.casino.add_npc(game_id, 1)
+            self.assertEqual(game.players_waiting, [])  # still being drafted
+            self.assertEqual(self.casino._spawning, {game_id: 1})
+            await asyncio.gather(*self.casino._spawns)
+        self._serving(scenario)
+        self.assertNotIn(threading.main_thread(), threads)
+        [npc] = game.players_waiting
+        self.assertEqual((npc.name, npc.npc_db_id), ("Dusty", 7))
+        self.assertEqual(self.casino._spawning, {})
+        self.assertIn(game_id, self.casino._dirty_games)
+
+    def test_npcs_drafted_for_a_gone_game_return_to_the_roster(self):
+        self.casino.db = self.mock_db
+        self.mock_db.get_available_npcs.return_value = [
+            {'id': 7, 'name': "Dusty", 'personality_name': "The Card Sharp", 'backstory': '', 'wallet_cents': 400}]
+        self.mock_db.get_recent_npc_memories.return_value = {}
+        game_id = self.casino.new_game()
+
+        async def scenario():
+            self.casino.add_npc(game_id, 1)
+            self.casino._drop_game(game_id)
+            await asyncio.gather(*self.casino._spawns)
+        self._serving(scenario)
+        self.mock_db.set_npc_game.assert_called_once_with(7, game_id)
+        self.mock_db.clear_npc_game.assert_called_once_with(7)
+
     def test_add_npc_batch_gets_combined_intro_message(self):
         """Adding NPCs together produces one combined 'New arrivals' intro
         message instead of a per-NPC 'pulls up a chair' line."""
@@ -1395,7 +2546,7 @@ class TestCasinoNPCManagement(unittest.TestCase):
         game_id = self.casino.new_game()
         self.casino.game_output = MagicMock()
         self.casino.add_npc(game_id, 2)
-        messages = [call.args[1] for call in self.casino.game_output.call_args_list]
+        messages = rendered_output(self.casino.game_output)
         arrival_msgs = [m for m in messages if "New arrivals" in m]
         self.assertEqual(len(arrival_msgs), 1)
         self.assertEqual(len([m for m in messages if "pulls up a chair" in m]), 0)
@@ -1511,12 +2662,15 @@ class TestCasinoNPCManagement(unittest.TestCase):
         self.assertEqual(game.current_player_idx, 1)
         self.assertEqual(game.state, HandState.PLAYING)
 
-        self.mock_db.save_game.reset_mock()
+        self.mock_db.save_games.reset_mock()
         self.casino._tick_games()             # NPC stands; idx advances to 2 (human2), still PLAYING
+        self.casino._flush_dirty_games()
 
         self.assertEqual(game.state, HandState.PLAYING)
         self.assertEqual(game.current_player_idx, 2)
-        self.mock_db.save_game.assert_called_once_with(game_id, game.to_dict())
+        [(saved_id, changes, writes)] = self.mock_db.save_games.call_args.args[0]
+        self.assertEqual(saved_id, game_id)
+        self.assertEqual(changes['current_player_idx'], 2)
 
     def test_delete_game_shuts_down_llm_npcs(self):
         """_delete_game() must call shutdown() on LLM NPC executors to prevent thread leaks."""
@@ -1546,12 +2700,15 @@ class TestCasinoNPCManagement(unittest.TestCase):
         game.tick()  # WAITING -> BETTING
         self.assertEqual(game.state, HandState.BETTING)
 
-        self.mock_db.save_game.reset_mock()
+        self.mock_db.save_games.reset_mock()
         self.casino._tick_games()  # NPC auto-bets; human hasn't; state stays BETTING
+        self.casino._flush_dirty_games()
 
         self.assertIn('BotPlayer', game.bets)
         self.assertEqual(game.state, HandState.BETTING)
-        self.mock_db.save_game.assert_called_once_with(game_id, game.to_dict())
+        [(saved_id, changes, writes)] = self.mock_db.save_games.call_args.args[0]
+        self.assertEqual(saved_id, game_id)
+        self.assertEqual(changes['bets'], game.to_dict()['bets'])
         self.assertFalse(game._dirty)
 
 
@@ -1753,7 +2910,7 @@ class TestLLMNPCBlackjackIntegration(unittest.TestCase):
         self.assertEqual(self.game.state, HandState.PLAYING)
 
     def _get_output_messages(self):
-        return [call[0][1] for call in self.mock_casino.game_output.call_args_list]
+        return rendered_output(self.mock_casino.game_output)
 
     def test_tick_playing_skips_when_decide_action_returns_none(self):
         """When decide_action returns None, playing tick should not advance state."""
@@ -2274,7 +3431,7 @@ class TestNPCAutofill(unittest.TestCase):
     def test_load_npc_limits_defaults_when_no_settings(self):
         db = SqliteDatabase(':memory:')
         casino = self._make_casino(db=db)
-        casino._load_npc_limits()
+        casino._set_npc_limits(casino._load_npc_limits())
         self.assertEqual(casino.npc_min, DEFAULT_NPC_AUTOFILL_MIN)
         self.assertEqual(casino.npc_max, DEFAULT_NPC_AUTOFILL_MAX)
         db.close()
@@ -2284,7 +3441,7 @@ class TestNPCAutofill(unittest.TestCase):
         db.set_setting('npc_autofill_min', '2')
         db.set_setting('npc_autofill_max', '5')
         casino = self._make_casino(db=db)
-        casino._load_npc_limits()
+        casino._set_npc_limits(casino._load_npc_limits())
         self.assertEqual(casino.npc_min, 2)
         self.assertEqual(casino.npc_max, 5)
         db.close()
@@ -2294,7 +3451,7 @@ class TestNPCAutofill(unittest.TestCase):
         db.set_setting('npc_autofill_min', '99')
         db.set_setting('npc_autofill_max', '99')
         casino = self._make_casino(db=db)
-        casino._load_npc_limits()
+        casino._set_npc_limits(casino._load_npc_limits())
         self.assertEqual(casino.npc_min, MAX_NPCS_PER_TABLE)
         self.assertEqual(casino.npc_max, MAX_NPCS_PER_TABLE)
         db.close()
@@ -2304,7 +3461,7 @@ class TestNPCAutofill(unittest.TestCase):
         db.set_setting('npc_autofill_min', '-5')
         db.set_setting('npc_autofill_max', '-1')
         casino = self._make_casino(db=db)
-        casino._load_npc_limits()
+        casino._set_npc_limits(casino._load_npc_limits())
         self.assertEqual(casino.npc_min, 0)
         self.assertEqual(casino.npc_max, 0)
         db.close()
@@ -2314,7 +3471,7 @@ class TestNPCAutofill(unittest.TestCase):
         db.set_setting('npc_autofill_min', '5')
         db.set_setting('npc_autofill_max', '2')
         casino = self._make_casino(db=db)
-        casino._load_npc_limits()
+        casino._set_npc_limits(casino._load_npc_limits())
         # min > max: min is clamped down to max
         self.assertLessEqual(casino.npc_min, casino.npc_max)
         db.close()
@@ -2418,6 +3575,442 @@ class TestNPCAutofill(unittest.TestCase):
         casino._spawn_npcs_into_game.assert_not_called()
 
 
+class TestWalletCache(unittest.TestCase):
+    """Casino caches wallet balances and keeps them in step with its writes."""
+
+    def setUp(self):
+        self.sqlite = SqliteDatabase(':memory:')
+        self.sqlite.add_user("Ann")  # starts with the default wallet
+        self.db = MagicMock(wraps=self.sqlite)
+        with patch('cardgames.casino.redis.Redis'):
+            self.casino = Casino(redis_host='localhost', redis_port=6379, db=self.db)
+        self.ann = Player("Ann")
+        self.start = self.sqlite.get_user_wallet("Ann")
+
+    def tearDown(self):
+        self.sqlite.close()
+
+    def test_repeat_reads_hit_the_cache(self):
+        for _ in range(3):
+            self.assertEqual(self.casino.get_wallet(self.ann), self.start)
+        self.assertEqual(self.db.get_user_wallet.call_count, 1)
+        self.assertEqual(self.casino._wallet_stats, {'hits': 2, 'misses': 1, 'invalidations': 0})
+
+    def test_update_wallet_keeps_cached_balance_current(self):
+        self.casino.get_wallet(self.ann)
+        self.assertTrue(self.casino.update_wallet(self.ann, -2500))
+        self.assertTrue(self.casino.update_wallet(self.ann, 5000))
+        self.assertEqual(self.casino.get_wallet(self.ann), self.start + 2500)
+        self.assertEqual(self.db.get_user_wallet.call_count, 1)
+
+    def test_refused_overdraft_invalidates(self):
+        self.casino.get_wallet(self.ann)
+        self.sqlite.set_user_wallet("Ann", 100)  # changed behind the cache's back
+        self.assertFalse(self.casino.update_wallet(self.ann, -500))
+        self.assertEqual(self.casino.get_wallet(self.ann), 100)
+
+    def test_admin_set_wallet_invalidates(self):
+        self.casino.get_wallet(self.ann)
+        asyncio.run(self.casino._handle_set_wallet({'target': 'Ann', 'mode': 'set', 'amount': 12345}))
+        self.assertEqual(self.casino.get_wallet(self.ann), 12345)
+        reply = asyncio.run(self.casino._handle_set_wallet({'target': 'Ann', 'mode': 'adjust', 'amount': 55}))
+        self.assertEqual(reply['new_balance_cents'], 12400)
+        self.assertEqual(self.casino.get_wallet(self.ann), 12400)
+
+    def test_stale_entry_expires(self):
+        self.casino.get_wallet(self.ann)
+        self.sqlite.set_user_wallet("Ann", 100)
+        with patch('cardgames.casino.time.monotonic', return_value=time.monotonic() + WALLET_CACHE_TTL + 1):
+            self.assertEqual(self.casino.get_wallet(self.ann), 100)
+
+
+class TestUnitOfWork(unittest.TestCase):
+    """A table's credits and stats commit with its snapshot in one transaction."""
+
+    def setUp(self):
+        self.sqlite = SqliteDatabase(':memory:')
+        self.sqlite.add_user("Ann")
+        self.db = MagicMock(wraps=self.sqlite)
+        with patch('cardgames.casino.redis.Redis'):
+            self.casino = Casino(redis_host='localhost', redis_port=6379, db=self.db)
+        self.game_id = self.casino.new_game()
+        self.db.reset_mock()
+        self.ann = Player("Ann")
+        self.start = self.sqlite.get_user_wallet("Ann")
+
+    def tearDown(self):
+        self.sqlite.close()
+
+    def test_credits_and_stats_wait_for_the_snapshot(self):
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+            self.casino.record_hand_result(self.ann, won_cents=1000, lost_cents=0)
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start)
+        self.assertEqual(self.casino.get_wallet(self.ann), self.start + 2000)
+        self.db.update_wallet.assert_not_called()
+        self.db.update_player_stats.assert_not_called()
+
+        self.casino._flush_dirty_games()
+        self.db.save_games.assert_called_once()
+        self.db.save_game.assert_not_called()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start + 2000)
+        self.assertEqual(self.sqlite.get_player_stats("Ann")['total_won_cents'], 1000)
+        self.assertEqual(self.casino._unflushed_credits, {})
+
+    def test_set_wallet_replaces_deferred_credits(self):
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+        reply = asyncio.run(self.casino._handle_set_wallet({'target': "Ann", 'mode': 'set', 'amount': 5000}))
+        self.assertEqual(reply['new_balance_cents'], 5000)
+        self.assertEqual(self.casino.get_wallet(self.ann), 5000)
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), 5000)
+        self.casino._wallets.clear()
+        self.assertEqual(self.casino.get_wallet(self.ann), 5000)
+
+    def test_failed_set_wallet_keeps_deferred_credits(self):
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+        self.db.set_user_wallet.side_effect = Exception("DB down")
+        reply = asyncio.run(self.casino._handle_set_wallet({'target': "Ann", 'mode': 'set', 'amount': 5000}))
+        self.assertFalse(reply['ok'])
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start + 2000)
+
+    def test_debits_stay_immediate(self):
+        with self.casino._table_writes(self.game_id):
+            self.assertTrue(self.casino.update_wallet(self.ann, -500))
+            self.assertFalse(self.casino.update_wallet(self.ann, -10 ** 9))
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start - 500)
+
+    def test_failed_commit_retried_with_next_snapshot(self):
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+        self.db.save_games.side_effect = [Exception("DB down"), DEFAULT]
+        self.casino._flush_dirty_games()
+        self.casino._wallets.clear()  # a cold read still sees the credit
+        self.assertEqual(self.casino.get_wallet(self.ann), self.start + 2000)
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start + 2000)
+        self.assertEqual(self.casino._write_stats['failed_commits'], 1)
+
+    def test_writes_of_a_stopped_table_still_land(self):
+        game = self.casino.games[self.game_id]
+        game.join(self.ann)
+        game.tick()
+        game.bet(self.ann, game.MIN_BET)
+        self.casino._process_message({'event_type': 'casino_action', 'action': 'stop_game',
+                                      'game_id': self.game_id})
+        self.assertNotIn(self.game_id, self.casino.games)
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start)
+        self.assertIsNone(self.sqlite.load_game(self.game_id))
+
+    def test_uncommitted_credits_cant_be_staked(self):
+        self.sqlite.set_user_wallet("Ann", 500)
+        game = self.casino.games[self.game_id]
+        game.join(self.ann)
+        game.tick()
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+        self.db.save_games.side_effect = [Exception("DB down"), DEFAULT]
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.casino.get_wallet(self.ann), 2500)
+
+        with self.assertRaises(InsufficientFundsError) as raised:
+            game.bet(self.ann, 1000)
+        self.assertEqual(raised.exception.balance_cents, 500)
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), 500)
+
+        self.casino._flush_dirty_games()
+        game.bet(self.ann, 1000)
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), 1500)
+
+    def test_npc_waits_for_its_winnings_to_commit_before_betting(self):
+        npc_id = self.sqlite.create_npc("Dusty", "The Grizzled Prospector", 0)
+        npc = SimpleBlackjackNPC("Dusty", npc_db_id=npc_id)
+        game = self.casino.games[self.game_id]
+        game.join(npc)
+        game.tick()
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(npc, 2000)
+        self.db.save_games.side_effect = [Exception("DB down"), DEFAULT]
+        self.casino._flush_dirty_games()
+
+        game.tick()
+        self.assertNotIn("Dusty", game.bets)
+        self.assertIn(npc, game.players)  # not dropped as broke
+
+        self.casino._flush_dirty_games()
+        game.tick()
+        self.assertIn("Dusty", game.bets)
+
+    def test_lost_table_drops_its_unflushed_credits(self):
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+        self.casino._drop_game(self.game_id)  # the new owner replays from the last snapshot
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start)
+        self.assertEqual(self.casino.get_wallet(self.ann), self.start)
+
+    def test_table_lost_during_a_failed_flush_drops_its_credits(self):
+        with self.casino._table_writes(self.game_id):
+            self.casino.update_wallet(self.ann, 2000)
+
+        def lose_lease_then_fail(snapshots):
+            self.db.save_games.side_effect = None
+            self.casino._drop_game(self.game_id)
+            raise Exception("DB down")
+
+        self.db.save_games.side_effect = lose_lease_then_fail
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.casino._write_stats['failed_commits'], 1)
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.get_user_wallet("Ann"), self.start)
+        self.assertEqual(self.casino._unflushed_credits, {})
+
+
+class TestSnapshotCodec(unittest.TestCase):
+    """Cards, seats and bets packed into one BLOB; legacy JSON rows still load."""
+
+    def _snapshot(self):
+        game = Blackjack(game_id="packed", casino=MagicMock())
+        for name in ("Ann", "Bob"):
+            player = Player(name)
+            game.players.append(player)
+            game.bets[name] = 1250
+        npc = SimpleBlackjackNPC("Dusty")
+        npc.npc_db_id = 300
+        game.players.append(npc)
+        game.bets["Dusty"] = 10 ** 7
+        game.new_hand()
+        game_data = game.to_dict()
+        game_data['players_waiting'] = [{'name': "Señor Ñ", 'hand': [], 'is_npc': True, 'npc_type': 'llm',
+                                         'npc_personality': "The Grizzled Prospector", 'npc_db_id': None}]
+        game_data['departed_players'] = [{'name': "Cal", 'hand': [], 'is_npc': False, 'npc_type': None,
+                                          'npc_personality': None, 'npc_db_id': None}]
+        return game_data
+
+    def test_round_trip(self):
+        game_data = self._snapshot()
+        unpacked = unpack_snapshot(pack_snapshot(game_data))
+        self.assertEqual(unpacked, {key: game_data[key] for key in PACKED_FIELDS})
+
+    def test_smaller_than_json(self):
+        game_data = self._snapshot()
+        as_json = sum(len(json.dumps(game_data[key])) for key in PACKED_FIELDS)
+        self.assertLess(len(pack_snapshot(game_data)) * 3, as_json)
+
+    def test_unknown_version_rejected(self):
+        packed = pack_snapshot(self._snapshot())
+        with self.assertRaises(ValueError):
+            unpack_snapshot(bytes([SNAPSHOT_VERSION + 1]) + packed[1:])
+
+    def test_version_1_has_no_departed_players(self):
+        game_data = dict(self._snapshot(), departed_players=[])
+        packed = pack_snapshot(game_data)
+        self.assertEqual(packed[-1], 0)  # the empty departed seat list
+        unpacked = unpack_snapshot(bytes([1]) + packed[1:-1])
+        self.assertEqual(unpacked, {key: game_data[key] for key in PACKED_FIELDS})
+
+    def test_legacy_json_row_loads(self):
+        legacy_fields = ('deck', 'discards', 'dealer_hand', 'players', 'players_waiting', 'bets')
+        db = SqliteDatabase(":memory:")
+        try:
+            game_data = self._snapshot()
+            db.connection.execute(
+                "INSERT INTO games (game_id, state, time_last_event, deck_json, discards_json, dealer_hand_json,"
+                " players_json, players_waiting_json, bets_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ("legacy", game_data['state'], game_data['time_last_event'])
+                + tuple(json.dumps(game_data[key]) for key in legacy_fields))
+            loaded = db.load_game("legacy")
+            self.assertEqual(loaded['players'], game_data['players'])
+            self.assertEqual(loaded['bets'], game_data['bets'])
+            self.assertEqual(loaded['departed_players'], [])
+
+            db.save_game("legacy", dict(game_data, game_id="legacy"))
+            row = db.connection.execute("SELECT deck_json, packed_state FROM games").fetchone()
+            self.assertEqual(row['deck_json'], '')
+            self.assertIsNotNone(row['packed_state'])
+            self.assertEqual(db.load_all_active_games()[0]['deck'], game_data['deck'])
+        finally:
+            db.close()
+
+
+class TestDeltaSnapshots(unittest.TestCase):
+    """A flush journals only what a table changed since its last save, and
+    a restore replays the journal onto the last checkpoint."""
+
+    def setUp(self):
+        self.sqlite = SqliteDatabase(':memory:')
+        self.db = MagicMock(wraps=self.sqlite)
+        with patch('cardgames.casino.redis.Redis'):
+            self.casino = Casino(redis_host='localhost', redis_port=6379, db=self.db)
+        self.game_id = self.casino.new_game()
+        self.game = self.casino.games[self.game_id]
+        self.casino._flush_dirty_games()  # a new game is saved by the next flush
+        self.db.reset_mock()
+
+    def tearDown(self):
+        self.sqlite.close()
+
+    def _flush(self):
+        self.casino._mark_dirty(self.game_id)
+        self.casino._flush_dirty_games()
+
+    def _restored(self):
+        [(game_data, npcs)] = self.casino._load_game_pages([self.game_id])
+        return game_data
+
+    def test_new_game_saved_by_the_next_flush(self):
+        game_id = self.casino.new_game(guild_id=1, channel_id=2)
+        self.assertIsNone(self.sqlite.load_game(game_id))
+        self.casino._flush_dirty_games()
+        self.assertEqual(self.sqlite.load_game(game_id)['game_id'], game_id)
+        self.assertEqual([c['game_id'] for c in self.sqlite.load_game_channels()], [game_id])
+
+    def test_unchanged_table_not_written(self):
+        self._flush()
+        self.db.save_games.assert_not_called()
+        self.assertEqual(self.casino._write_stats['skipped_snapshots'], 1)
+
+    def test_only_changed_fields_journaled(self):
+        checkpoint = self.sqlite.load_game(self.game_id)
+        self.game.time_last_event += 1
+        self._flush()
+        [(game_id, changes, writes)] = self.db.save_games.call_args.args[0]
+        self.assertEqual(changes, {'time_last_event': self.game.time_last_event})
+        self.assertEqual(self.sqlite.load_game(self.game_id), checkpoint)
+        self.assertEqual(self.sqlite.load_journal([self.game_id]),
+                         {self.game_id: [{'time_last_event': self.game.time_last_event}]})
+        self.assertEqual(self._restored()['time_last_event'], self.game.time_last_event)
+
+    def test_packed_fields_written_together(self):
+        self.game.join(Player("Ann"))
+        self._flush()
+        [(game_id, changes, writes)] = self.db.save_games.call_args.args[0]
+        self.assertNotIn('state', changes)
+        self.assertTrue(set(PACKED_FIELDS) <= changes.keys())
+        restored = self._restored()
+        self.assertEqual(restored['players_waiting'], self.game.to_dict()['players_waiting'])
+        self.assertEqual(restored['deck'], self.game.to_dict()['deck'])
+
+    def test_failed_save_retried_with_next_snapshot(self):
+        self.game.join(Player("Ann"))
+        self.casino._mark_dirty(self.game_id)
+        self.db.save_games.side_effect = [Exception("DB down"), DEFAULT]
+        self.casino._flush_dirty_games()
+        self.assertIn(self.game_id, self.casino._dirty_games)
+        self.casino._flush_dirty_games()
+        [(game_id, changes, writes)] = self.db.save_games.call_args.args[0]
+        self.assertIn('players_waiting', changes)
+        self.assertEqual(self._restored()['players_waiting'], self.game.to_dict()['players_waiting'])
+
+    def test_restart_replays_the_journal(self):
+        self.game.join(Player("Ann"))
+        self._flush()
+        self.game.time_last_event += 1
+        self._flush()
+        with patch('cardgames.casino.redis.Redis'):
+            restarted = Casino(redis_host='localhost', redis_port=6379, db=self.sqlite)
+        restarted._load_games_from_db()
+        game = restarted.games[self.game_id]
+        self.assertEqual([p.name for p in game.players_waiting], ["Ann"])
+        self.assertEqual(game.to_dict()['deck'], self.game.to_dict()['deck'])
+
+    def test_checkpoint_replaces_the_journal(self):
+        with patch('cardgames.casino.JOURNAL_CHECKPOINT_ENTRIES', 2):
+            for _ in range(3):
+                self.game.time_last_event += 1
+                self._flush()
+        [(game_id, changes, writes)] = self.db.save_games.call_args.args[0]
+        self.assertEqual(changes, self.game.to_dict())
+        self.assertEqual(self.sqlite.load_journal(), {})
+        self.assertEqual(self.sqlite.load_game(self.game_id)['time_last_event'], self.game.time_last_event)
+        self.assertEqual(self.casino._journal_lengths[self.game_id], 0)
+
+    def test_delete_game_drops_its_journal(self):
+        self.game.time_last_event += 1
+        self._flush()
+        self.sqlite.delete_game(self.game_id)
+        self.assertEqual(self.sqlite.load_journal(), {})
+
+
+class TestLazyRestore(unittest.TestCase):
+    """Startup restore: games paged in, seated NPCs batched, tables without
+    humans rebuilt on first use."""
+
+    def setUp(self):
+        self.sqlite = SqliteDatabase(':memory:')
+        with patch('cardgames.casino.redis.Redis'):
+            casino = Casino(redis_host='localhost', redis_port=6379, db=self.sqlite)
+        self.npc_id = self.sqlite.create_npc("Dusty", "The Grizzled Prospector", 20000)
+        for i in range(3):
+            self.sqlite.add_npc_memory(self.npc_id, None, f"night {i}", 10)
+        self.human_game = casino.new_game()
+        casino.games[self.human_game].players_waiting.append(Player("Ann"))
+        self.npc_game = casino.new_game()
+        casino.games[self.npc_game].players_waiting.append(SimpleBlackjackNPC("Dusty", npc_db_id=self.npc_id))
+        # Left mid-hand, their bet still to be settled
+        self.departed_id = self.sqlite.create_npc("Slim", "The Card Sharp", 20000)
+        casino.games[self.npc_game].departed_players.append(SimpleBlackjackNPC("Slim", npc_db_id=self.departed_id))
+        for game_id in (self.human_game, self.npc_game):
+            casino._save_game(game_id)
+
+        self.db = MagicMock(wraps=self.sqlite)
+        with patch('cardgames.casino.redis.Redis'):
+            self.casino = Casino(redis_host='localhost', redis_port=6379, db=self.db)
+        self.casino._llm_client_tried = True
+        self.casino._llm_client = MagicMock()
+
+    def tearDown(self):
+        self.sqlite.close()
+
+    def test_tables_without_humans_left_dormant(self):
+        self.casino._load_games_from_db()
+        self.assertEqual(list(self.casino.games), [self.human_game])
+        self.assertEqual(list(self.casino._dormant_games), [self.npc_game])
+        games = asyncio.run(self.casino._handle_list_games({}))['games']
+        self.assertEqual({g['game_id'] for g in games}, {self.human_game, self.npc_game})
+
+    def test_seated_npcs_loaded_in_one_batch(self):
+        with patch('cardgames.casino.SALOON_DETAIL_LEVEL', 'high'):
+            self.casino._load_games_from_db()
+        self.db.get_npcs_by_ids.assert_called_once()
+        self.assertEqual(set(self.db.get_npcs_by_ids.call_args.args[0]), {self.npc_id, self.departed_id})
+        self.db.get_recent_npc_memories.assert_called_once()
+        self.casino._hydrate_game(self.npc_game)
+        self.db.get_npc_by_id.assert_not_called()
+        self.db.get_npc_memories.assert_not_called()
+        [npc] = self.casino.games[self.npc_game].players_waiting
+        self.assertEqual(npc.npc_db_id, self.npc_id)
+        self.assertEqual(npc._memories, ["night 2", "night 1", "night 0"])
+        [departed] = self.casino.games[self.npc_game].departed_players
+        self.assertEqual((departed.name, departed.npc_db_id), ("Slim", self.departed_id))
+
+    def test_dormant_table_rebuilt_on_first_tick(self):
+        self.casino._load_games_from_db()
+        self.assertEqual(sorted(self.casino._pop_due_games(time.time())),
+                         sorted([self.human_game, self.npc_game]))
+        self.assertIn(self.npc_game, self.casino.games)
+        self.assertEqual(self.casino._dormant_games, {})
+
+    def test_dormant_table_rebuilt_on_command(self):
+        self.casino._load_games_from_db()
+        self.casino._process_message({'event_type': 'player_action', 'game_id': self.npc_game,
+                                      'player': "Bob", 'action': 'join'})
+        game = self.casino.games[self.npc_game]
+        self.assertIn("Bob", [p.name for p in game.players + game.players_waiting])
+
+    def test_recent_memories_limited_per_npc(self):
+        other = self.sqlite.create_npc("Belle", "The Grizzled Prospector", 20000)
+        self.sqlite.add_npc_memory(other, None, "only night", 10)
+        memories = self.sqlite.get_recent_npc_memories([self.npc_id, other, 999], 2)
+        self.assertEqual([m['session_summary'] for m in memories[self.npc_id]], ["night 2", "night 1"])
+        self.assertEqual([m['session_summary'] for m in memories[other]], ["only night"])
+        self.assertNotIn(999, memories)
+
+
 class TestNPCWalletReplenishment(unittest.TestCase):
     """M5: idle NPC wallet replenishment (_replenish_npc_wallets)."""
 
@@ -2492,6 +4085,55 @@ class TestNPCWalletReplenishment(unittest.TestCase):
                 casino._replenish_npc_wallets()
         self.assertLessEqual(self.db.get_npc_wallet(npc_id), 15000)
 
+    def test_whole_roster_credited_in_one_bulk_update(self):
+        casino = self._make_casino(db=self.db)
+        npc_ids = [self.db.create_npc(f"Pete {i}", "The Grizzled Prospector", 100) for i in range(1200)]
+        with patch('cardgames.casino.random.random', return_value=0.0), \
+                patch.object(self.db, 'update_npc_wallet') as per_npc, \
+                patch.object(self.db, 'get_all_npcs') as full_scan, \
+                self.assertLogs(level='INFO') as logs:
+            casino._replenish_npc_wallets()
+        per_npc.assert_not_called()
+        full_scan.assert_not_called()
+        self.assertEqual({self.db.get_npc_wallet(npc_id) for npc_id in npc_ids}, {100 + 2980})
+        replenished = [line for line in logs.output if "Wallet replenishment" in line]
+        self.assertEqual(len(replenished), 1)
+        self.assertIn("topped up 1200 of 1200", replenished[0])
+
+    def test_chore_touches_the_wallet_cache_only_on_the_loop(self):
+        casino = self._make_casino(db=self.db)
+        npc_id = self.db.create_npc("Lucky Pete", "The Grizzled Prospector", 100)
+        casino._wallets[('npc', npc_id)] = (100, time.monotonic() + 60)
+        db_threads, cache_threads = [], []
+        credit = casino._credit_idle_npc_wallets
+        casino._credit_idle_npc_wallets = lambda: db_threads.append(threading.current_thread()) or credit()
+        invalidate = casino.invalidate_wallet
+        casino.invalidate_wallet = lambda *key: cache_threads.append(threading.current_thread()) or invalidate(*key)
+
+        async def scenario():
+            casino._loop = asyncio.get_running_loop()
+            casino._db_executor = ThreadPoolExecutor(max_workers=1)
+            await casino._replenish_npc_wallets_async()
+            casino._db_executor.shutdown(wait=True)
+        with patch('cardgames.casino.random.random', return_value=0.0):
+            asyncio.run(scenario())
+        self.assertNotEqual(db_threads, [threading.main_thread()])
+        self.assertEqual(cache_threads, [threading.main_thread()])
+        self.assertNotIn(('npc', npc_id), casino._wallets)
+        self.assertEqual(self.db.get_npc_wallet(npc_id), 100 + 2980)
+
+    def test_bulk_credit_skips_npcs_seated_since_they_were_picked(self):
+        idle = self.db.create_npc("Idle Ike", "The Grizzled Prospector", 100)
+        seated = self.db.create_npc("Seated Sam", "The Grizzled Prospector", 100)
+        broke = self.db.create_npc("Broke Bo", "The Grizzled Prospector", 0)
+        self.db.create_npc("Flush Fred", "The Grizzled Prospector", 15000)
+        self.db.create_npc("Mystery Man", "Not A Real Personality", 100)
+        below = self.db.get_npcs_below_target({"The Grizzled Prospector": 15000})
+        self.assertEqual(sorted(npc['id'] for npc in below), [idle, seated, broke])
+        self.db.set_npc_game(seated, "some-game-id")
+        self.assertEqual(self.db.credit_idle_npc_wallets({idle: 50, seated: 50, broke: 70}), 2)
+        self.assertEqual([self.db.get_npc_wallet(npc_id) for npc_id in (idle, seated, broke)], [150, 100, 70])
+
 
 class TestLLMHealthCheck(unittest.TestCase):
     """Periodic LLM provider re-check (Casino._check_llm_health)."""
@@ -3160,5 +4802,377 @@ class TestTableEventBuffer(unittest.TestCase):
         self.assertIn("Alice won $20.00", events)
 
 
+class TestConnectionPool(unittest.TestCase):
+    """The MySQL backend's bounded pool, and its per-call checkout."""
+
+    def _pool(self, size, check=None):
+        opened = []
+
+        def connect():
+            opened.append(MagicMock(name=f"conn{len(opened)}"))
+            return opened[-1]
+        return ConnectionPool(connect, size, check=check), opened
+
+    def test_reuses_returned_connections(self):
+        pool, opened = self._pool(2)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(len(opened), 1)
+        stats = pool.stats()
+        self.assertEqual((stats['checkouts'], stats['in_use'], stats['open'], stats['waits']), (2, 1, 1, 0))
+
+    def test_waits_for_a_connection_when_all_are_busy(self):
+        pool, opened = self._pool(1)
+        held = pool.acquire()
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+        waiter.start()
+        deadline = time.monotonic() + 2
+        while pool.stats()['waiters'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(pool.stats()['waiters'], 1)
+        self.assertEqual(got, [])
+        pool.release(held)
+        waiter.join(2)
+        self.assertEqual(got, [held])
+        stats = pool.stats()
+        self.assertEqual((stats['waiters'], stats['waits'], stats['opened']), (0, 1, 1))
+        self.assertGreater(stats['max_wait_seconds'], 0)
+
+    def test_discarded_and_failed_connections_free_their_slot(self):
+        pool, opened = self._pool(1, check=MagicMock(side_effect=Exception("gone away")))
+        conn = pool.acquire()
+        pool.release(conn, discard=True)
+        conn.close.assert_called_once()
+        # The idle one fails its check and is replaced
+        pool.release(pool.acquire())
+        replaced = pool.acquire()
+        self.assertIsNot(replaced, opened[0])
+        self.assertEqual(pool.stats()['discarded'], 2)
+        pool.release(replaced)
+
+        failing = ConnectionPool(MagicMock(side_effect=Exception("refused")), 1)
+        with self.assertRaises(Exception):
+            failing.acquire()
+        self.assertEqual((failing.stats()['open'], failing.stats()['in_use']), (0, 0))
+
+    def test_reset_runs_on_release_and_a_failing_reset_discards(self):
+        reset = MagicMock()
+        pool = ConnectionPool(MagicMock(side_effect=lambda: MagicMock()), 1, reset=reset)
+        conn = pool.acquire()
+        pool.release(conn)
+        reset.assert_called_once_with(conn)
+        self.assertIs(pool.acquire(), conn)
+        reset.side_effect = Exception("gone away")
+        pool.release(conn)
+        conn.close.assert_called_once()
+        self.assertEqual((pool.stats()['open'], pool.stats()['discarded']), (0, 1))
+
+    def test_connections_returned_after_close_are_closed(self):
+        pool, opened = self._pool(2)
+        idle, held = pool.acquire(), pool.acquire()
+        pool.release(idle)
+        pool.close()
+        idle.close.assert_called_once()
+        held.close.assert_not_called()
+        pool.release(held)  # e.g. an NPC worker finishing after shutdown
+        held.close.assert_called_once()
+        self.assertEqual((pool.stats()['open'], pool.stats()['in_use']), (0, 0))
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+        self.assertEqual(len(opened), 2)
+
+    def _database(self, execute=None):
+        from cardgames import database
+        connections = []
+
+        def connect(**kwargs):
+            conn = MagicMock()
+            conn.cursor.return_value.fetchone.return_value = (len(database.MIGRATIONS),)
+            conn.cursor.return_value.rowcount = 1
+            if execute:
+                conn.cursor.return_value.execute.side_effect = execute
+            connections.append(conn)
+            return conn
+        patcher = patch.object(database.mysql.connector, 'connect', side_effect=connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return database.Database("localhost", 3306, "u", "p", "d", pool_size=2), connections
+
+    def test_background_write_does_not_block_reads(self):
+        from cardgames import database
+        release_writer = threading.Event()
+        writer_inside = threading.Event()
+
+        def execute(sql, params=None):
+            if "npc_memories" in sql and not release_writer.is_set():
+                writer_inside.set()
+                release_writer.wait(2)
+        db, connections = self._database(execute)
+        writer = threading.Thread(target=db.add_npc_memory, args=(1, "g", "summary", 5))
+        writer.start()
+        self.assertTrue(writer_inside.wait(2))
+        # The worker holds one connection mid-write; the game loop reads on another
+        self.assertEqual(db.get_user_wallet("Alice"), len(database.MIGRATIONS))
+        self.assertEqual(db.pool_stats()['in_use'], 1)
+        release_writer.set()
+        writer.join(2)
+        self.assertEqual(len(connections), 2)
+        self.assertEqual(db.pool_stats()['in_use'], 0)
+
+    def test_reused_connection_reads_the_latest_commits(self):
+        from cardgames import database
+        committed = {'games': ['g1']}
+
+        class Connection:
+            """Reads see the data as of the transaction's first read, as
+            under InnoDB's REPEATABLE READ, until commit or rollback."""
+            def __init__(self, **kwargs):
+                self.snapshot = None
+
+            def cursor(self):
+                cursor = MagicMock()
+                cursor.fetchone.return_value = (len(database.MIGRATIONS),)
+
+                def execute(sql, params=None):
+                    if sql == "SELECT game_id FROM games":
+                        if self.snapshot is None:
+                            self.snapshot = list(committed['games'])
+                        cursor.fetchall.return_value = [(game_id,) for game_id in self.snapshot]
+                cursor.execute.side_effect = execute
+                return cursor
+
+            def commit(self):
+                self.snapshot = None
+
+            rollback = commit
+
+            def ping(self, reconnect=False):
+                pass
+
+            def close(self):
+                pass
+        with patch.object(database.mysql.connector, 'connect', side_effect=Connection):
+            db = database.Database("localhost", 3306, "u", "p", "d", pool_size=1)
+            self.assertEqual(db.list_game_ids(), ['g1'])
+            # Another shard creates a game through a connection of its own
+            other = Connection()
+            other.cursor().execute("SELECT game_id FROM games")
+            committed['games'].append('g2')
+            other.commit()
+            self.assertEqual(db.list_game_ids(), ['g1', 'g2'])
+            self.assertEqual(db.pool_stats()['opened'], 1)
+
+    def test_deadlock_retries_on_the_calls_connection(self):
+        from cardgames import database
+        attempts = []
+
+        def execute(sql, params=None):
+            if sql.startswith("UPDATE users"):
+                attempts.append(db.connection)
+                if len(attempts) == 1:
+                    raise database.Error(errno=database._DEADLOCK_ERRNO, msg="Deadlock found")
+        db, connections = self._database(execute)
+        with patch.object(database.time, 'sleep'):
+            db.set_user_wallet("Alice", 500)
+        self.assertEqual(len(attempts), 2)
+        self.assertIs(attempts[0], attempts[1])
+        attempts[0].rollback.assert_called()
+        self.assertEqual(db.pool_stats()['in_use'], 0)
+
+
+class TestSqliteWriterThread(unittest.TestCase):
+    """File databases run in WAL mode: queries on reader connections, and
+    writes batched into transactions by one writer thread."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = SqliteDatabase(os.path.join(self.tmp.name, "saloon.db"), readers=2)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_wal_and_read_only_readers(self):
+        self.assertEqual(self.db.connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+        self.db.add_user("Alice")
+        self.assertEqual(self.db.get_user_wallet("Alice"), 20000)
+        reader = self.db._readers.acquire()
+        try:
+            with self.assertRaises(sqlite3.OperationalError):
+                reader.execute("DELETE FROM users")
+        finally:
+            self.db._readers.release(reader)
+        self.assertEqual(self.db._readers.stats()['opened'], 1)
+
+    def test_queued_writes_commit_together(self):
+        batches = []
+        commit_batch = self.db._commit_batch
+        gate = threading.Event()
+
+        def record(batch):
+            batches.append(len(batch))
+            gate.wait(2)
+            commit_batch(batch)
+        self.db.add_user("Alice")
+        with patch.object(self.db, '_commit_batch', side_effect=record):
+            first = threading.Thread(target=self.db.update_wallet, args=("Alice", 1))
+            first.start()
+            deadline = time.monotonic() + 2
+            while not batches and time.monotonic() < deadline:
+                time.sleep(0.001)
+            # Queued while the writer is busy: they go out as the next batch
+            queued = [threading.Thread(target=self.db.update_wallet, args=("Alice", 1)) for _ in range(5)]
+            for thread in queued:
+                thread.start()
+            while self.db._write_queue.qsize() < 5 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            gate.set()
+            for thread in [first] + queued:
+                thread.join(2)
+        self.assertEqual(batches, [1, 5])
+        self.assertEqual(self.db.get_user_wallet("Alice"), 20006)
+
+    def test_failed_write_rolls_back_alone(self):
+        self.db.add_user("Alice")
+        calls = [lambda: self.db.update_wallet("Alice", 500),
+                 lambda: self.db.save_game_channel("no-such-game", 1, 2),  # breaks the foreign key
+                 lambda: self.db.add_user("Bob")]
+        gate, busy = threading.Event(), threading.Event()
+        self.db._write_queue.put((lambda: busy.set() or gate.wait(2), Future()))
+        self.assertTrue(busy.wait(2))
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(call) for call in calls]
+            deadline = time.monotonic() + 2
+            while self.db._write_queue.qsize() < 3 and time.monotonic() < deadline:
+                time.sleep(0.001)
+            gate.set()
+            self.assertTrue(futures[0].result(2))
+            with self.assertRaises(sqlite3.IntegrityError):
+                futures[1].result(2)
+            self.assertTrue(futures[2].result(2))
+        self.assertEqual(self.db.get_user_wallet("Alice"), 20500)
+        self.assertEqual(self.db.get_user_wallet("Bob"), 20000)
+        self.assertEqual(self.db.load_game_channels(), [])
+
+    def test_writes_racing_close_fail_instead_of_hanging(self):
+        gate, busy = threading.Event(), threading.Event()
+        self.db._write_queue.put((lambda: busy.set() or gate.wait(2), Future()))
+        self.assertTrue(busy.wait(2))
+        closer = threading.Thread(target=self.db.close)
+        closer.start()
+        deadline = time.monotonic() + 2
+        while self.db._write_queue.qsize() < 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        # Once close() has queued the stop, new writes are refused...
+        with self.assertRaises(sqlite3.ProgrammingError):
+            self.db.add_user("Alice")
+        # ...and any that slipped in behind it fail when the writer is gone
+        stranded = Future()
+        self.db._write_queue.put((lambda: None, stranded))
+        gate.set()
+        closer.join(2)
+        self.assertFalse(closer.is_alive())
+        with self.assertRaises(sqlite3.ProgrammingError):
+            stranded.result(0)
+
+
+class TestWriteBehind(unittest.TestCase):
+    """Fire-and-forget writes queued for a background thread."""
+
+    def _blocked(self, max_depth=100):
+        """A queue whose thread is stuck writing an add_user() until the
+        returned event is set."""
+        db = MagicMock()
+        gate, busy = threading.Event(), threading.Event()
+        db.add_user.side_effect = lambda username: busy.set() or gate.wait(2)
+        behind = WriteBehindDatabase(db, max_depth=max_depth)
+        self.addCleanup(lambda: gate.set() or behind.close())
+        behind.add_user("Alice")
+        self.assertTrue(busy.wait(2))
+        return behind, db, gate
+
+    def test_batches_usage_rows_into_one_insert(self):
+        behind, db, gate = self._blocked()
+        for tokens in (10, 20, 30):
+            behind.log_llm_usage('decision', 'model', tokens, 1, npc_id=7)
+        behind.update_player_stats("Alice", won_cents=500)
+        self.assertEqual(behind.write_behind_stats()['depth'], 4)
+        gate.set()
+        self.assertTrue(behind.flush(2))
+        db.log_llm_usage_many.assert_called_once_with(
+            [('decision', 'model', tokens, 1, 7, None) for tokens in (10, 20, 30)])
+        db.update_player_stats.assert_called_once_with("Alice", 500, 0)
+        db.log_llm_usage.assert_not_called()
+        stats = behind.write_behind_stats()
+        self.assertEqual((stats['depth'], stats['written'], stats['batches']), (0, 5, 2))
+        self.assertGreater(stats['max_flush_ms'], 0)
+
+    def test_full_queue_drops_usage_and_spills_the_rest(self):
+        behind, db, gate = self._blocked(max_depth=1)
+        behind.increment_games_played("Alice")  # fills the queue
+        behind.log_llm_usage('decision', 'model', 10, 1)
+        behind.add_npc_memory(7, "game", "Lost his boots", 5)
+        # Spilled: written on the caller's thread, before the queue drains
+        db.add_npc_memory.assert_called_once_with(7, "game", "Lost his boots", 5)
+        stats = behind.write_behind_stats()
+        self.assertEqual((stats['dropped'], stats['spilled'], stats['depth']), (1, 1, 1))
+        gate.set()
+        behind.flush(2)
+        db.log_llm_usage_many.assert_not_called()
+        db.increment_games_played.assert_called_once_with("Alice")
+
+    def test_direct_calls_wait_for_queued_users(self):
+        behind, db, gate = self._blocked()
+        results = []
+        reader = threading.Thread(target=lambda: results.append(behind.get_user_wallet("Alice")))
+        reader.start()
+        reader.join(0.05)
+        self.assertTrue(reader.is_alive())  # still waiting on Alice's row
+        db.get_user_wallet.assert_not_called()
+        gate.set()
+        reader.join(2)
+        self.assertEqual(results, [db.get_user_wallet.return_value])
+
+    def test_direct_calls_write_queued_users_without_waiting_for_the_queue(self):
+        db = MagicMock()
+        gate, busy = threading.Event(), threading.Event()
+        db.add_npc_memory.side_effect = lambda *args: busy.set() or gate.wait(2)
+        behind = WriteBehindDatabase(db)
+        self.addCleanup(lambda: gate.set() or behind.close())
+        behind.add_npc_memory(7, "game", "Lost his boots", 5)
+        self.assertTrue(busy.wait(2))
+        behind.log_llm_usage('decision', 'model', 10, 1)
+        behind.add_user("Alice")
+        # The thread is stuck on the memory; the read writes Alice's row itself
+        self.assertEqual(behind.get_user_wallet("Alice"), db.get_user_wallet.return_value)
+        db.add_user.assert_called_once_with("Alice")
+        db.log_llm_usage_many.assert_not_called()
+        self.assertEqual(behind.write_behind_stats()['depth'], 1)
+        gate.set()
+        self.assertTrue(behind.flush(2))
+        db.add_user.assert_called_once_with("Alice")
+        self.assertEqual(behind.write_behind_stats()['written'], 3)
+
+    def test_close_writes_whats_queued(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "saloon.db")
+            behind = WriteBehindDatabase(SqliteDatabase(path))
+            behind.add_user("Alice")
+            self.assertEqual(behind.get_user_wallet("Alice"), 20000)
+            behind.update_player_stats("Alice", won_cents=700)
+            behind.log_llm_usage('decision', 'model', 10, 2)
+            behind.close()
+            self.assertEqual(behind.write_behind_stats()['written'], 3)
+
+            db = SqliteDatabase(path)
+            try:
+                self.assertEqual(db.get_player_stats("Alice")['total_won_cents'], 700)
+                self.assertEqual(db.get_llm_usage_summary()[0]['total_input'], 10)
+            finally:
+                db.close()
+
+
 if __name__ == '__main__':
     unittest.main()
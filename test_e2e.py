@@ -17,6 +17,9 @@ import unittest
 import mysql.connector
 import redis
 
+from cardgames.command_stream import COMMAND_GROUP, COMMAND_STREAM, COMMAND_STREAM_MAXLEN, command_fields
+from cardgames.game_events import render_event
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -166,14 +169,17 @@ class EndToEndTestCase(unittest.TestCase):
 
     @classmethod
     def _wait_for_server_ready(cls, timeout=15):
-        """Wait until the server has subscribed to the Redis 'casino' channel."""
+        """Wait until the server is reading the command stream."""
         deadline = time.time() + timeout
         while time.time() < deadline:
             if cls.server_process.poll() is not None:
                 raise RuntimeError("Server process exited unexpectedly")
-            numsub = dict(cls.redis.pubsub_numsub("casino"))
-            if numsub.get("casino", 0) >= 1:
-                logging.info("Server is ready (subscribed to casino channel)")
+            try:
+                consumers = cls.redis.xinfo_consumers(COMMAND_STREAM, COMMAND_GROUP)
+            except redis.exceptions.ResponseError:
+                consumers = []  # stream or group not created yet
+            if consumers:
+                logging.info("Server is ready (reading the command stream)")
                 return
             time.sleep(0.1)
         raise RuntimeError(f"Server did not become ready within {timeout}s")
@@ -200,6 +206,9 @@ class EndToEndTestCase(unittest.TestCase):
     def setUp(self):
         """Set up for each test."""
         self.redis.flushall()
+        # Recreate the command group straight away rather than racing the
+        # server to it, so no command sent by the test is skipped
+        self.redis.xgroup_create(COMMAND_STREAM, COMMAND_GROUP, id='0', mkstream=True)
 
         cursor = self.db.cursor()
         cursor.execute("DELETE FROM game_channels")
@@ -227,6 +236,11 @@ class EndToEndTestCase(unittest.TestCase):
         except Exception:
             pass
 
+    def send_command(self, message):
+        """Send a command to the casino over the command stream."""
+        self.redis.xadd(COMMAND_STREAM, command_fields(message),
+                        maxlen=COMMAND_STREAM_MAXLEN, approximate=True)
+
     def subscribe_to_game(self, game_id):
         """Create pubsub subscription to a game's updates."""
         pubsub = self.redis.pubsub()
@@ -245,39 +259,40 @@ class EndToEndTestCase(unittest.TestCase):
         while time.time() - start < timeout:
             msg = pubsub.get_message(timeout=0.5)
             if msg and msg['type'] == 'message':
-                text = json.loads(msg['data'])['text']
-                messages.append(text)
-                if any(cond in text for cond in stop_conditions):
+                events = json.loads(msg['data']).get('events', [])
+                lines = [text for text in map(render_event, events) if text is not None]
+                messages.extend(lines)
+                if any(cond in text for text in lines for cond in stop_conditions):
                     break
         return messages
 
     def join_player(self, game_id, player_name):
         """Send a player join action."""
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'player_action',
             'game_id': game_id,
             'player': player_name,
             'action': 'join'
-        }))
+        })
 
     def player_action(self, game_id, player_name, action):
         """Send a player action (hit/stand/etc)."""
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'player_action',
             'game_id': game_id,
             'player': player_name,
             'action': action
-        }))
+        })
 
     def place_bet(self, game_id, player_name, amount):
         """Send a bet action."""
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'player_action',
             'game_id': game_id,
             'player': player_name,
             'action': 'bet',
             'amount': amount
-        }))
+        })
 
     # A deck where dealer gets 16 (no blackjack) and player gets 15.
     # Cards are dealt via pop(), so the last element is dealt first.
@@ -310,7 +325,7 @@ class EndToEndTestCase(unittest.TestCase):
                 message['num_bots'] = num_bots
             if deck is not None:
                 message['deck'] = deck
-            self.redis.publish("casino", json.dumps(message))
+            self.send_command(message)
 
             # Wait for game creation response
             for _ in range(20):  # Increased from 10 to give more time
@@ -328,11 +343,11 @@ class EndToEndTestCase(unittest.TestCase):
         """Stop a game and wait for its game_over confirmation."""
         pubsub = self.subscribe_to_game(game_id)
         try:
-            self.redis.publish("casino", json.dumps({
+            self.send_command({
                 'event_type': 'casino_action',
                 'action': 'stop_game',
                 'game_id': game_id,
-            }))
+            })
             deadline = time.time() + 5
             while time.time() < deadline:
                 msg = pubsub.get_message(timeout=0.5)
@@ -363,7 +378,7 @@ class TestGameCreation(EndToEndTestCase):
                 'action': 'new_game',
                 'request_id': request_id
             }
-            self.redis.publish("casino", json.dumps(message))
+            self.send_command(message)
 
             # Wait for response
             response = None
@@ -576,11 +591,11 @@ class TestServerRestart(EndToEndTestCase):
             pubsub.get_message(timeout=1)  # Skip subscribe confirmation
 
             list_request_id = f"list-request-{time.time()}"
-            self.redis.publish("casino", json.dumps({
+            self.send_command({
                 'event_type': 'casino_action',
                 'action': 'list_games',
                 'request_id': list_request_id,
-            }))
+            })
 
             games_response = None
             for _ in range(20):
@@ -681,7 +696,7 @@ class TestServerRestart(EndToEndTestCase):
                 'guild_id': 12345,
                 'channel_id': 67890
             }
-            self.redis.publish("casino", json.dumps(message))
+            self.send_command(message)
 
             # Wait for game creation response
             game_id = None
@@ -702,7 +717,7 @@ class TestServerRestart(EndToEndTestCase):
                 'action': 'list_games',
                 'request_id': list_request_id
             }
-            self.redis.publish("casino", json.dumps(list_message))
+            self.send_command(list_message)
 
             # Wait for list_games response
             games_response = None
@@ -742,13 +757,13 @@ class TestStopGame(EndToEndTestCase):
 
         game_pubsub = self.subscribe_to_game(game_id)
         try:
-            self.redis.publish("casino", json.dumps({
+            self.send_command({
                 'event_type': 'casino_action',
                 'action': 'stop_game',
                 'game_id': game_id,
-            }))
+            })
 
-            # Collect raw events (game_over has no 'text', so bypass collect_messages)
+            # Collect raw events (game_over has no 'events', so bypass collect_messages)
             deadline = time.time() + 5
             game_over_received = False
             while time.time() < deadline:
@@ -783,11 +798,11 @@ class TestStopGame(EndToEndTestCase):
         )
         self.assertIsNotNone(after_bet, "Wallet should be decremented to 17500 cents after a 2500-cent bet")
 
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'casino_action',
             'action': 'stop_game',
             'game_id': game_id,
-        }))
+        })
 
         # Bet is refunded to the wallet
         after_stop = self.poll_db(
@@ -816,11 +831,11 @@ class TestStopGame(EndToEndTestCase):
         self.assertIsNotNone(result, "Game should exist before stop")
 
         # Stop the game
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'casino_action',
             'action': 'stop_game',
             'game_id': game_id,
-        }))
+        })
 
         # Verify game is removed from database
         deadline = time.time() + 5
@@ -1010,7 +1025,7 @@ class TestAdminWallet(EndToEndTestCase):
             'request_id': request_id,
             **kwargs,
         }
-        self.redis.publish("casino", json.dumps(message))
+        self.send_command(message)
 
         deadline = time.time() + 5
         while time.time() < deadline:
@@ -1139,7 +1154,7 @@ class TestNPCLimits(EndToEndTestCase):
             'request_id': request_id,
             **kwargs,
         }
-        self.redis.publish("casino", json.dumps(message))
+        self.send_command(message)
 
         deadline = time.time() + 5
         while time.time() < deadline:
@@ -1240,23 +1255,23 @@ class TestManualNPC(EndToEndTestCase):
         super().tearDown()
 
     def _npc_action(self, action, game_id, **kwargs):
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'npc_action',
             'action': action,
             'game_id': game_id,
             **kwargs,
-        }))
+        })
 
     def _get_debug(self):
         pubsub = self.redis.pubsub()
         pubsub.subscribe("casino_update")
         pubsub.get_message(timeout=1)
         request_id = f"test-debug-{time.time()}"
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'casino_action',
             'action': 'get_debug',
             'request_id': request_id,
-        }))
+        })
         deadline = time.time() + 5
         while time.time() < deadline:
             msg = pubsub.get_message(timeout=0.5)
@@ -1453,11 +1468,11 @@ class TestNPCSessionMemory(EndToEndTestCase):
         super().tearDown()
 
     def _remove_npc(self, game_id):
-        self.redis.publish("casino", json.dumps({
+        self.send_command({
             'event_type': 'npc_action',
             'action': 'remove_npc',
             'game_id': game_id,
-        }))
+        })
 
     def _play_one_hand(self, game_id, pubsub, player_name):
         """Bet and stand through one hand, returning when the hand resolves."""
@@ -1519,11 +1534,11 @@ class TestNPCSessionMemory(EndToEndTestCase):
 
             # Reseat: the only roster NPC is available again and gets picked up
             # (its prior memory is loaded into the prompt context at seating).
-            self.redis.publish("casino", json.dumps({
+            self.send_command({
                 'event_type': 'npc_action',
                 'action': 'add_npc',
                 'game_id': game_id,
-            }))
+            })
             self._play_one_hand(game_id, pubsub, 'MemHuman')
             self._remove_npc(game_id)
 